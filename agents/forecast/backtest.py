@@ -0,0 +1,210 @@
+"""
+Rolling-origin backtesting and throughput benchmark for the forecast methods.
+
+Runs fully offline: the batch kernels are pure NumPy and the LLM methods are
+replaced by a deterministic stub. Usage:
+
+    python -m agents.forecast.backtest --series 20000 --periods 48 --horizon 3
+"""
+
+import argparse
+import time
+from typing import Dict, List, Optional
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from agents.forecast.batch_kernels import BATCH_METHODS, pad_history, run_batch_method
+from agents.forecast.sales_history import load_sales_history
+
+
+# --------------------------------------
+# ✅ Synthetic Demand
+# --------------------------------------
+
+def generate_synthetic_history(
+    n_series: int,
+    periods: int,
+    level: float = 100.0,
+    trend: float = 0.01,
+    seasonality: float = 0.3,
+    season_length: int = 12,
+    intermittency: float = 0.0,
+    noise: float = 0.15,
+    ragged: bool = True,
+    seed: int = 0
+) -> tuple:
+    """
+    Padded (series × periods) demand with per-series level, linear trend,
+    seasonal amplitude and a share of zero-demand periods. Returns (matrix, lengths).
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(periods, dtype=np.float64)
+
+    base = level * rng.lognormal(0.0, 0.5, n_series)[:, None]
+    slope = trend * rng.normal(1.0, 0.5, n_series)[:, None]
+    amplitude = seasonality * rng.uniform(0.0, 1.0, n_series)[:, None]
+    phase = rng.uniform(0, 2 * np.pi, n_series)[:, None]
+
+    demand = base * (1 + slope * t) * (1 + amplitude * np.sin(2 * np.pi * t / season_length + phase))
+    demand *= rng.lognormal(0.0, noise, (n_series, periods))
+    if intermittency > 0:
+        demand *= rng.random((n_series, periods)) >= intermittency
+    demand = np.maximum(np.round(demand), 0.0)
+
+    if ragged:
+        lengths = rng.integers(max(periods // 2, 1), periods + 1, n_series)
+    else:
+        lengths = np.full(n_series, periods)
+    cols = np.arange(periods)
+    demand[cols >= lengths[:, None]] = 0.0
+    return demand, lengths.astype(np.int64)
+
+
+# --------------------------------------
+# ✅ LLM Stub
+# --------------------------------------
+
+def stub_llm_forecast(matrix: np.ndarray, lengths: np.ndarray, params: dict, horizon: int) -> np.ndarray:
+    """
+    Offline stand-in for the LLM methods: mean of the last `context_window`
+    periods, so benchmarks never call a model.
+    """
+    window = params.get("context_window", 8)
+    rows = np.arange(matrix.shape[0])
+    total = np.zeros(matrix.shape[0])
+    count = np.zeros(matrix.shape[0])
+    for k in range(1, window + 1):
+        idx = lengths - k
+        valid = idx >= 0
+        total += np.where(valid, matrix[rows, np.maximum(idx, 0)], 0.0)
+        count += valid
+    level = np.divide(total, count, out=np.zeros_like(total), where=count > 0)
+    return np.repeat(level[:, None], horizon, axis=1)
+
+
+STUB_METHODS = {"llm": stub_llm_forecast, "custom": stub_llm_forecast}
+
+
+# --------------------------------------
+# ✅ Backtest
+# --------------------------------------
+
+def forecast_errors(forecast: np.ndarray, actual: np.ndarray) -> dict:
+    error = forecast - actual
+    total_actual = np.abs(actual).sum()
+    nonzero = actual != 0
+    return {
+        "mape": float(np.mean(np.abs(error[nonzero]) / np.abs(actual[nonzero]))) if nonzero.any() else None,
+        "wape": float(np.abs(error).sum() / total_actual) if total_actual else None,
+        "bias": float(error.sum() / total_actual) if total_actual else None
+    }
+
+
+def rolling_origin_backtest(
+    matrix: np.ndarray,
+    lengths: np.ndarray,
+    method: str,
+    params: Optional[dict] = None,
+    horizon: int = 3,
+    origins: int = 3,
+    min_train: int = 6
+) -> dict:
+    """
+    Evaluate one method at `origins` forecast origins, each one period earlier
+    than the last, holding out `horizon` periods after every origin.
+    """
+    params = params or {}
+    forecaster = STUB_METHODS.get(method) or (lambda m, l, p, h: run_batch_method(method, m, l, p, h))
+    steps = np.arange(horizon)
+
+    forecasts, actuals = [], []
+    evaluated = 0
+    elapsed = 0.0
+    for origin in range(origins):
+        train_lengths = lengths - horizon - origin
+        valid = train_lengths >= min_train
+        if not valid.any():
+            continue
+        sub_matrix, sub_lengths = matrix[valid], train_lengths[valid]
+
+        started = time.perf_counter()
+        forecast = forecaster(sub_matrix, sub_lengths, params, horizon)
+        elapsed += time.perf_counter() - started
+
+        actual = sub_matrix[np.arange(len(sub_lengths))[:, None], sub_lengths[:, None] + steps]
+        forecasts.append(forecast)
+        actuals.append(actual)
+        evaluated += len(sub_lengths)
+
+    if not evaluated:
+        return {"method": method, "series_evaluated": 0}
+
+    metrics = forecast_errors(np.concatenate(forecasts), np.concatenate(actuals))
+    return {
+        "method": method,
+        "series_evaluated": evaluated,
+        **metrics,
+        "seconds": round(elapsed, 4),
+        "series_per_second": round(evaluated / elapsed, 1) if elapsed else None
+    }
+
+
+def run_backtest(
+    matrix: np.ndarray,
+    lengths: np.ndarray,
+    methods: Optional[List[str]] = None,
+    params: Optional[Dict[str, dict]] = None,
+    horizon: int = 3,
+    origins: int = 3
+) -> List[dict]:
+    methods = methods or list(BATCH_METHODS) + list(STUB_METHODS)
+    params = params or {}
+    return [
+        rolling_origin_backtest(matrix, lengths, method, params.get(method), horizon, origins)
+        for method in methods
+    ]
+
+
+async def backtest_company(db: AsyncSession, company_id: UUID, period_type: str = "month", **kwargs) -> List[dict]:
+    """
+    Backtest every method over the company's bucketed demand history.
+    """
+    history = await load_sales_history(db, company_id, period_type)
+    matrix, lengths = pad_history(history.offsets, history.values, np.arange(len(history)))
+    return run_backtest(matrix, lengths, **kwargs)
+
+
+def print_report(report: List[dict]):
+    print(f"{'method':<24}{'series':>10}{'MAPE':>10}{'WAPE':>10}{'bias':>10}{'series/s':>14}")
+    for row in report:
+        metrics = "".join(
+            f"{row[name]:10.3f}" if row.get(name) is not None else f"{'-':>10}"
+            for name in ("mape", "wape", "bias")
+        )
+        rate = row.get("series_per_second")
+        rate = f"{rate:14,.0f}" if rate else f"{'-':>14}"
+        print(f"{row['method']:<24}{row['series_evaluated']:>10}{metrics}{rate}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline forecast backtest / benchmark")
+    parser.add_argument("--series", type=int, default=10000)
+    parser.add_argument("--periods", type=int, default=48)
+    parser.add_argument("--horizon", type=int, default=3)
+    parser.add_argument("--origins", type=int, default=3)
+    parser.add_argument("--trend", type=float, default=0.01)
+    parser.add_argument("--seasonality", type=float, default=0.3)
+    parser.add_argument("--intermittency", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--methods", nargs="*", default=None)
+    args = parser.parse_args()
+
+    matrix, lengths = generate_synthetic_history(
+        args.series, args.periods,
+        trend=args.trend, seasonality=args.seasonality,
+        intermittency=args.intermittency, seed=args.seed
+    )
+    print(f"🧪 {args.series} synthetic series × {args.periods} periods, horizon {args.horizon}, {args.origins} origins")
+    print_report(run_backtest(matrix, lengths, args.methods, horizon=args.horizon, origins=args.origins))
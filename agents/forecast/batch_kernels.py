@@ -0,0 +1,328 @@
+import numpy as np
+from typing import Callable, Dict, Sequence, Tuple
+
+
+# --------------------------------------
+# ✅ Padding
+# --------------------------------------
+# Every kernel takes a left-aligned padded matrix (series × periods) plus the
+# true length of each row. Cells at or beyond a row's length are zero and are
+# never read.
+
+def pad_history(offsets: np.ndarray, values: np.ndarray, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Build the padded matrix for the given SalesHistory rows. A row of -1 means
+    "no history" and yields an empty series.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    present = rows >= 0
+    safe_rows = np.where(present, rows, 0)
+    starts = offsets[safe_rows]
+    lengths = np.where(present, offsets[safe_rows + 1] - starts, 0)
+
+    width = int(lengths.max()) if len(lengths) else 0
+    cols = np.arange(width)
+    mask = cols < lengths[:, None]
+    matrix = np.zeros((len(rows), width), dtype=np.float64)
+    matrix[mask] = values[(starts[:, None] + cols)[mask]]
+    return matrix, lengths
+
+
+def pad_series(series: Sequence[Sequence[float]]) -> Tuple[np.ndarray, np.ndarray]:
+    lengths = np.array([len(s) for s in series], dtype=np.int64)
+    width = int(lengths.max()) if len(lengths) else 0
+    matrix = np.zeros((len(series), width), dtype=np.float64)
+    for i, s in enumerate(series):
+        matrix[i, :lengths[i]] = s
+    return matrix, lengths
+
+
+def _masked_sum(matrix: np.ndarray, start: np.ndarray, stop: np.ndarray) -> np.ndarray:
+    """
+    Sum of matrix[i, start[i]:stop[i]] for every row, via a zero-prefixed cumulative sum.
+    """
+    csum = np.zeros((matrix.shape[0], matrix.shape[1] + 1), dtype=np.float64)
+    np.cumsum(matrix, axis=1, out=csum[:, 1:])
+    rows = np.arange(matrix.shape[0])
+    return csum[rows, stop] - csum[rows, start]
+
+
+def _safe_mean(total: np.ndarray, count: np.ndarray) -> np.ndarray:
+    # Per-product functions fall back to 0.0 when they would divide by zero
+    return np.divide(total, count, out=np.zeros_like(total), where=count > 0)
+
+
+def _repeat(level: np.ndarray, horizon: int) -> np.ndarray:
+    return np.repeat(level[:, None], horizon, axis=1)
+
+
+# --------------------------------------
+# ✅ Kernels
+# --------------------------------------
+
+def batch_moving_average(matrix: np.ndarray, lengths: np.ndarray, window: int, horizon: int) -> np.ndarray:
+    n = matrix.shape[0]
+    if window <= 0:
+        return np.zeros((n, horizon))
+    short = lengths < window
+    start = np.where(short, 0, lengths - window)
+    total = _masked_sum(matrix, start, lengths)
+    count = np.where(short, lengths, window).astype(np.float64)
+    return _repeat(_safe_mean(total, count), horizon)
+
+
+def batch_linear_regression(matrix: np.ndarray, lengths: np.ndarray, horizon: int) -> np.ndarray:
+    n = lengths.astype(np.float64)
+    cols = np.arange(matrix.shape[1], dtype=np.float64)
+    mask = cols < lengths[:, None]
+
+    sum_x = n * (n - 1) / 2
+    sum_xx = (n - 1) * n * (2 * n - 1) / 6
+    sum_y = np.where(mask, matrix, 0.0).sum(axis=1)
+    sum_xy = np.where(mask, matrix * cols, 0.0).sum(axis=1)
+
+    denom = n * sum_xx - sum_x ** 2
+    fit = lengths >= 2
+    slope = np.divide(n * sum_xy - sum_x * sum_y, denom, out=np.zeros_like(n), where=fit)
+    intercept = np.divide(sum_y - slope * sum_x, n, out=np.zeros_like(n), where=fit)
+
+    steps = np.arange(horizon, dtype=np.float64)
+    fitted = intercept[:, None] + slope[:, None] * (n[:, None] + steps)
+
+    # Fewer than two points: repeat the last value (or 0.0 with no history)
+    last = np.zeros_like(n)
+    if matrix.shape[1]:
+        rows = np.arange(matrix.shape[0])
+        last = np.where(lengths > 0, matrix[rows, np.maximum(lengths - 1, 0)], 0.0)
+    return np.where(fit[:, None], fitted, last[:, None])
+
+
+def batch_exponential_smoothing(matrix: np.ndarray, lengths: np.ndarray, alpha, horizon: int) -> np.ndarray:
+    alpha = np.broadcast_to(np.asarray(alpha, dtype=np.float64), lengths.shape)
+    if matrix.shape[1] == 0:
+        return np.zeros((matrix.shape[0], horizon))
+    level = matrix[:, 0].copy()
+    for t in range(1, matrix.shape[1]):
+        active = t < lengths
+        level = np.where(active, alpha * matrix[:, t] + (1 - alpha) * level, level)
+    level = np.where(lengths > 0, level, 0.0)
+    return _repeat(level, horizon)
+
+
+def batch_seasonal_decomposition(matrix: np.ndarray, lengths: np.ndarray, period: int, horizon: int) -> np.ndarray:
+    n = matrix.shape[0]
+    if period <= 0:
+        return np.zeros((n, horizon))
+    short = lengths < 2 * period
+    zero = np.zeros_like(lengths)
+
+    overall = _safe_mean(_masked_sum(matrix, zero, lengths), lengths.astype(np.float64))
+    recent_start = np.maximum(lengths - period, 0)
+    prior_start = np.maximum(lengths - 2 * period, 0)
+    seasonal = _masked_sum(matrix, recent_start, lengths) / period
+    trend = _masked_sum(matrix, prior_start, recent_start) / period
+
+    level = np.where(short, overall, trend + seasonal)
+    return _repeat(level, horizon)
+
+
+# --------------------------------------
+# ✅ Holt-Winters
+# --------------------------------------
+# Triple exponential smoothing over the whole batch. Series shorter than two
+# seasons have no seasonal initialisation and fall back to simple smoothing.
+
+HOLT_WINTERS_GRID = {
+    "alpha": (0.1, 0.3, 0.5, 0.7),
+    "beta": (0.01, 0.1, 0.2),
+    "gamma": (0.05, 0.2, 0.4),
+}
+
+
+def _holt_winters_init(matrix: np.ndarray, lengths: np.ndarray, period: int, multiplicative: bool):
+    first = matrix[:, :period].mean(axis=1)
+    second = matrix[:, period:2 * period].mean(axis=1)
+    level = first
+    trend = (second - first) / period
+    if multiplicative:
+        season = np.divide(matrix[:, :period], first[:, None], out=np.ones((matrix.shape[0], period)), where=first[:, None] > 0)
+    else:
+        season = matrix[:, :period] - first[:, None]
+    return level, trend, season
+
+
+def _holt_winters_fit(matrix, lengths, period, alpha, beta, gamma, horizon, multiplicative):
+    """
+    Run the recursions for one (alpha, beta, gamma) per row and return the
+    forecast plus the in-sample one-step squared error of every series.
+    """
+    level, trend, season = _holt_winters_init(matrix, lengths, period, multiplicative)
+    sse = np.zeros(matrix.shape[0])
+
+    for t in range(period, matrix.shape[1]):
+        active = t < lengths
+        y = matrix[:, t]
+        s = season[:, t % period]
+        base = level + trend
+        if multiplicative:
+            fitted = base * s
+            deseasoned = np.divide(y, s, out=base.copy(), where=s > 0)
+        else:
+            fitted = base + s
+            deseasoned = y - s
+        new_level = alpha * deseasoned + (1 - alpha) * base
+        new_trend = beta * (new_level - level) + (1 - beta) * trend
+        if multiplicative:
+            new_season = gamma * np.divide(y, new_level, out=s.copy(), where=new_level > 0) + (1 - gamma) * s
+        else:
+            new_season = gamma * (y - new_level) + (1 - gamma) * s
+
+        sse += np.where(active, (y - fitted) ** 2, 0.0)
+        level = np.where(active, new_level, level)
+        trend = np.where(active, new_trend, trend)
+        season[:, t % period] = np.where(active, new_season, s)
+
+    steps = np.arange(1, horizon + 1)
+    rows = np.arange(matrix.shape[0])[:, None]
+    future = season[rows, (lengths[:, None] + steps - 1) % period]
+    base = level[:, None] + trend[:, None] * steps
+    forecast = base * future if multiplicative else base + future
+    return np.maximum(forecast, 0.0), sse
+
+
+def batch_holt_winters(
+    matrix: np.ndarray,
+    lengths: np.ndarray,
+    period: int,
+    horizon: int,
+    alpha=0.3,
+    beta=0.1,
+    gamma=0.2,
+    seasonal: str = "additive",
+    optimize: bool = False
+) -> np.ndarray:
+    """
+    Additive or multiplicative Holt-Winters. With optimize=True every series
+    gets the grid combination with the lowest in-sample one-step error; each
+    combination is a single vectorized pass over the batch.
+    """
+    n = matrix.shape[0]
+    if seasonal not in ("additive", "multiplicative"):
+        raise ValueError(f"Unknown Holt-Winters seasonality '{seasonal}'")
+    if period <= 1 or n == 0:
+        return np.zeros((n, horizon))
+
+    fallback = batch_exponential_smoothing(matrix, lengths, alpha, horizon)
+    seasonal_rows = lengths >= 2 * period
+    if not seasonal_rows.any():
+        return fallback
+
+    sub_matrix, sub_lengths = matrix[seasonal_rows], lengths[seasonal_rows]
+    multiplicative = seasonal == "multiplicative"
+    if optimize:
+        best, best_sse = None, None
+        for a in HOLT_WINTERS_GRID["alpha"]:
+            for b in HOLT_WINTERS_GRID["beta"]:
+                for g in HOLT_WINTERS_GRID["gamma"]:
+                    forecast, sse = _holt_winters_fit(sub_matrix, sub_lengths, period, a, b, g, horizon, multiplicative)
+                    if best is None:
+                        best, best_sse = forecast, sse
+                    else:
+                        better = sse < best_sse
+                        best = np.where(better[:, None], forecast, best)
+                        best_sse = np.where(better, sse, best_sse)
+    else:
+        best, _ = _holt_winters_fit(sub_matrix, sub_lengths, period, alpha, beta, gamma, horizon, multiplicative)
+
+    fallback[seasonal_rows] = best
+    return fallback
+
+
+# --------------------------------------
+# ✅ Intermittent Demand
+# --------------------------------------
+# Croston-family methods smooth demand size and demand timing separately, so
+# mostly-zero series are not dragged towards the occasional spike.
+
+def _croston_sweep(matrix: np.ndarray, lengths: np.ndarray, alpha: float):
+    """
+    Smoothed non-zero demand size and inter-demand interval of every row,
+    updated only in periods with demand. Also returns whether a row ever had demand.
+    """
+    n = matrix.shape[0]
+    size = np.zeros(n)
+    interval = np.zeros(n)
+    since = np.zeros(n)
+    seen = np.zeros(n, dtype=bool)
+
+    for t in range(matrix.shape[1]):
+        active = t < lengths
+        y = matrix[:, t]
+        since = np.where(active, since + 1, since)
+        demand = active & (y > 0)
+        first = demand & ~seen
+        update = demand & seen
+        size = np.where(first, y, np.where(update, alpha * y + (1 - alpha) * size, size))
+        interval = np.where(first, since, np.where(update, alpha * since + (1 - alpha) * interval, interval))
+        since = np.where(demand, 0.0, since)
+        seen |= demand
+    return size, interval, seen
+
+
+def batch_croston(matrix: np.ndarray, lengths: np.ndarray, alpha: float, horizon: int, debias: bool = False) -> np.ndarray:
+    """
+    Croston's method; debias=True applies the Syntetos-Boylan (SBA) correction.
+    """
+    size, interval, seen = _croston_sweep(matrix, lengths, alpha)
+    rate = np.divide(size, interval, out=np.zeros_like(size), where=seen & (interval > 0))
+    if debias:
+        rate *= 1 - alpha / 2
+    return _repeat(rate, horizon)
+
+
+def batch_tsb(matrix: np.ndarray, lengths: np.ndarray, alpha: float, beta: float, horizon: int) -> np.ndarray:
+    """
+    Teunter-Syntetos-Babai: demand probability is smoothed every period, so
+    the forecast decays towards zero for items that stop selling.
+    """
+    n = matrix.shape[0]
+    cols = np.arange(matrix.shape[1])
+    valid = cols < lengths[:, None]
+    occurrences = (valid & (matrix > 0)).sum(axis=1)
+    probability = _safe_mean(occurrences.astype(np.float64), lengths.astype(np.float64))
+    size = np.zeros(n)
+    seen = np.zeros(n, dtype=bool)
+
+    for t in range(matrix.shape[1]):
+        active = t < lengths
+        y = matrix[:, t]
+        demand = active & (y > 0)
+        probability = np.where(active, beta * demand + (1 - beta) * probability, probability)
+        size = np.where(demand & ~seen, y, np.where(demand & seen, alpha * y + (1 - alpha) * size, size))
+        seen |= demand
+    return _repeat(probability * size, horizon)
+
+
+# --------------------------------------
+# ✅ Dispatch
+# --------------------------------------
+# Each entry maps a blueprint method name to fn(matrix, lengths, params, horizon).
+
+BATCH_METHODS: Dict[str, Callable[[np.ndarray, np.ndarray, dict, int], np.ndarray]] = {
+    "moving_average": lambda m, l, p, h: batch_moving_average(m, l, p.get("window", 4), h),
+    "linear_regression": lambda m, l, p, h: batch_linear_regression(m, l, h),
+    "exponential_smoothing": lambda m, l, p, h: batch_exponential_smoothing(m, l, p.get("alpha", 0.3), h),
+    "seasonal_decomposition": lambda m, l, p, h: batch_seasonal_decomposition(m, l, p.get("period", 12), h),
+    "holt_winters": lambda m, l, p, h: batch_holt_winters(
+        m, l, p.get("period", 12), h,
+        alpha=p.get("alpha", 0.3), beta=p.get("beta", 0.1), gamma=p.get("gamma", 0.2),
+        seasonal=p.get("seasonal", "additive"), optimize=p.get("optimize", False)
+    ),
+    "croston": lambda m, l, p, h: batch_croston(m, l, p.get("alpha", 0.1), h),
+    "sba": lambda m, l, p, h: batch_croston(m, l, p.get("alpha", 0.1), h, debias=True),
+    "tsb": lambda m, l, p, h: batch_tsb(m, l, p.get("alpha", 0.1), p.get("beta", 0.1), h),
+}
+
+
+def run_batch_method(method: str, matrix: np.ndarray, lengths: np.ndarray, params: dict, horizon: int) -> np.ndarray:
+    return BATCH_METHODS[method](matrix, lengths, params, horizon)
@@ -0,0 +1,185 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from bisect import bisect_right
+from datetime import date, datetime, timedelta
+from typing import List
+from uuid import UUID
+
+
+# --------------------------------------
+# ✅ Demand Buckets
+# --------------------------------------
+# Sales order lines are aggregated into product × location × period buckets
+# using the `calendar` table. Forecasters read the buckets, never raw lines.
+
+PERIOD_KEYS = {
+    "month": "to_char(make_date(c.year, c.month, 1), 'YYYY-MM')",
+    # ISO year, so a week spanning new year stays one bucket
+    "week": "to_char(c.calendar_date, 'IYYY-\"W\"IW')",
+    "fiscal": "c.fiscal_period",
+}
+
+
+# When a sales line entered the buckets' source; lines without created_at
+# fall back to their order date
+LINE_STAMP_SQL = "COALESCE(s.created_at, s.order_date::timestamp)"
+
+
+def period_key_sql(period_type: str) -> str:
+    if period_type not in PERIOD_KEYS:
+        raise ValueError(f"Unknown period type '{period_type}'")
+    return PERIOD_KEYS[period_type]
+
+
+async def load_period_starts(db: AsyncSession, period_type: str) -> List[date]:
+    """
+    Start date of every calendar period of the given type, in order.
+    """
+    result = await db.execute(text(f"""
+        SELECT MIN(c.calendar_date) AS period_start
+        FROM calendar c
+        WHERE {period_key_sql(period_type)} IS NOT NULL
+        GROUP BY {period_key_sql(period_type)}
+        ORDER BY period_start
+    """))
+    return [r["period_start"] for r in result.mappings().all()]
+
+
+def next_period_start(start: date, period_type: str) -> date:
+    if period_type == "week":
+        return start + timedelta(days=7)
+    year, month = divmod(start.year * 12 + start.month, 12)
+    return date(year, month + 1, min(start.day, 28))
+
+
+def extend_period_starts(starts: List[date], horizon: int, period_type: str) -> List[date]:
+    """
+    `starts` continued a week (or a month) at a time up to `horizon` dates,
+    for forecasts that run past the end of the calendar.
+    """
+    starts = list(starts[:horizon])
+    if not starts:
+        today = date.today()
+        starts = [today - timedelta(days=today.weekday()) if period_type == "week" else today.replace(day=1)]
+    while len(starts) < horizon:
+        starts.append(next_period_start(starts[-1], period_type))
+    return starts
+
+
+def forecast_period_starts(period_starts: List[date], horizon: int, period_type: str, today: date = None) -> List[date]:
+    """
+    Start dates of the `horizon` periods a forecast covers: the current
+    period (the one sales history stops before) and those after it.
+    """
+    current = bisect_right(period_starts, today or date.today()) - 1
+    return extend_period_starts(period_starts[current:] if current >= 0 else [], horizon, period_type)
+
+
+async def refresh_demand_buckets(db: AsyncSession, company_id: UUID, period_type: str = "month", full: bool = False) -> dict:
+    """
+    Upsert demand buckets for the company. Incremental by default: only the
+    buckets touched by sales lines stamped after the last refresh are
+    re-aggregated. When the line count shows lines that the stamp cannot
+    place (deleted, backdated or unstamped), it falls back to a full
+    refresh. Use full=True after calendar changes.
+    """
+    key_sql = period_key_sql(period_type)
+    params = {"company_id": str(company_id), "period_type": period_type}
+
+    since, since_count = None, None
+    if not full:
+        result = await db.execute(text("""
+            SELECT source_watermark, source_count
+            FROM demand_bucket_refresh
+            WHERE company_id = :company_id AND period_type = :period_type
+        """), params)
+        row = result.mappings().first()
+        if row:
+            since, since_count = row["source_watermark"], row["source_count"]
+
+    result = await db.execute(text(f"""
+        SELECT
+            MAX({LINE_STAMP_SQL}) AS source_watermark,
+            COUNT(*) AS source_count,
+            COUNT(*) FILTER (WHERE {LINE_STAMP_SQL} > CAST(:since AS timestamp)) AS new_lines
+        FROM sales_orders s
+        JOIN products p
+          ON p.product_id = s.product_id AND p.location_id = s.location_id
+        WHERE p.company_id = :company_id
+    """), {"company_id": str(company_id), "since": since})
+    source = result.mappings().first()
+    source_watermark, source_count = source["source_watermark"], source["source_count"]
+
+    if since is not None and (since_count is None or since_count + source["new_lines"] != source_count):
+        print(f"⚠️ Sales lines changed behind the {period_type} bucket watermark; running a full refresh")
+        since = None
+    elif since is not None and not source["new_lines"]:
+        return {"period_type": period_type, "mode": "incremental", "buckets_refreshed": 0}
+
+    touched_filter = f"AND {LINE_STAMP_SQL} > :since" if since is not None else ""
+    if since is not None:
+        params["since"] = since
+    else:
+        await db.execute(text("""
+            DELETE FROM demand_buckets
+            WHERE company_id = :company_id AND period_type = :period_type
+        """), params)
+
+    result = await db.execute(text(f"""
+        WITH periods AS (
+            SELECT
+                c.calendar_date,
+                {key_sql} AS period_key,
+                MIN(c.calendar_date) OVER (PARTITION BY {key_sql}) AS period_start
+            FROM calendar c
+            WHERE {key_sql} IS NOT NULL
+        ),
+        touched AS (
+            SELECT DISTINCT s.product_id, s.location_id, c.period_key
+            FROM sales_orders s
+            JOIN products p
+              ON p.product_id = s.product_id AND p.location_id = s.location_id
+            JOIN periods c ON c.calendar_date = s.order_date
+            WHERE p.company_id = :company_id {touched_filter}
+        )
+        INSERT INTO demand_buckets (
+            company_id, product_id, location_id, period_type,
+            period_key, period_start, quantity, order_lines, updated_at
+        )
+        SELECT
+            CAST(:company_id AS uuid), s.product_id, s.location_id, :period_type,
+            c.period_key, MIN(c.period_start), SUM(s.quantity), COUNT(*), now()
+        FROM sales_orders s
+        JOIN periods c ON c.calendar_date = s.order_date
+        JOIN touched t
+          ON t.product_id = s.product_id
+         AND t.location_id = s.location_id
+         AND t.period_key = c.period_key
+        GROUP BY s.product_id, s.location_id, c.period_key
+        ON CONFLICT (company_id, product_id, location_id, period_type, period_key) DO UPDATE SET
+            quantity = EXCLUDED.quantity,
+            order_lines = EXCLUDED.order_lines,
+            updated_at = EXCLUDED.updated_at
+    """), params)
+    refreshed = result.rowcount
+
+    await db.execute(text("""
+        INSERT INTO demand_bucket_refresh (company_id, period_type, source_watermark, source_count, refreshed_at)
+        VALUES (:company_id, :period_type, :source_watermark, :source_count, :refreshed_at)
+        ON CONFLICT (company_id, period_type) DO UPDATE SET
+            source_watermark = EXCLUDED.source_watermark,
+            source_count = EXCLUDED.source_count,
+            refreshed_at = EXCLUDED.refreshed_at
+    """), {
+        "company_id": str(company_id),
+        "period_type": period_type,
+        "source_watermark": source_watermark,
+        "source_count": source_count,
+        "refreshed_at": datetime.utcnow()
+    })
+
+    return {
+        "period_type": period_type,
+        "mode": "incremental" if since is not None else "full",
+        "buckets_refreshed": refreshed
+    }
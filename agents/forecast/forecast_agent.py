@@ -1,24 +1,86 @@
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
-from datetime import datetime, timedelta
+from datetime import date, datetime
 from uuid import UUID
 import uuid
-import math
-from typing import List, Dict
+import json
+from collections import defaultdict
+from typing import List, Dict, Optional
+import asyncio
 import numpy as np
-from sklearn.linear_model import LinearRegression
-from openai import OpenAI
 from core.config import settings
+from services.llm_client import AsyncLLMClient
+from services.llm_batching import BatchedPrompter
+from services.llm_cache import LLMResponseCache
+from agents.forecast.sales_history import SalesHistory, load_sales_history
+from agents.forecast.forecast_writer import ForecastWriter
+from agents.forecast.batch_kernels import BATCH_METHODS, pad_history, pad_series, run_batch_method
+from agents.forecast.sharded_engine import ShardedForecastEngine
+from agents.forecast.demand_buckets import extend_period_starts, forecast_period_starts, load_period_starts, refresh_demand_buckets
+from agents.forecast.watermarks import clear_forecast_watermark, load_forecast_watermarks, load_sales_watermarks, save_forecast_watermarks
+from agents.forecast.intervals import prediction_intervals
+from agents.forecast.forecast_runs import carry_forward_forecasts, create_forecast_run, current_forecast_run, prune_forecast_runs, publish_forecast_run, touch_forecast_run
+from agents.utility.policy_cache import PolicyCache
 
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
+# Batch method whose residuals size the intervals of LLM / custom forecasts
+INTERVAL_REFERENCE_METHOD = "exponential_smoothing"
+
+# Bump when a prompt template changes so cached responses are not reused
+LLM_FORECAST_PROMPT_VERSION = "llm-forecast-v1"
+LLM_BATCH_PROMPT_VERSION = "llm-forecast-batch-v1"
+CUSTOM_LOGIC_PROMPT_VERSION = "custom-logic-v1"
+
+# How prompts name the forecast periods of each period type
+PERIOD_NAMES = {"week": "weeks", "month": "months", "fiscal": "fiscal periods"}
+
+LLM_BATCH_PROMPT = """
+You are a demand planner. For each item, forecast the next {horizon} {periods}
+from its sales history. Each result is a list of {horizon} numbers like [100, 105, 110].
+"""
 
 # --------------------------------------
 # ✅ Utilities
 # --------------------------------------
 
+# Methods added after the stored forecasting blueprints were written. Used only
+# when the company blueprint does not define the method itself.
+BUILTIN_METHODS = [
+    {
+        "name": "holt_winters",
+        "parameters": {
+            "period": {"default": 12, "overridable": True},
+            "alpha": {"default": 0.3, "overridable": True},
+            "beta": {"default": 0.1, "overridable": True},
+            "gamma": {"default": 0.2, "overridable": True},
+            "seasonal": {"default": "additive", "overridable": True},
+            "optimize": {"default": True, "overridable": True},
+        },
+        "max_horizon": 24
+    },
+    {
+        "name": "croston",
+        "parameters": {"alpha": {"default": 0.1, "overridable": True}},
+        "max_horizon": 12
+    },
+    {
+        "name": "sba",
+        "parameters": {"alpha": {"default": 0.1, "overridable": True}},
+        "max_horizon": 12
+    },
+    {
+        "name": "tsb",
+        "parameters": {
+            "alpha": {"default": 0.1, "overridable": True},
+            "beta": {"default": 0.1, "overridable": True},
+        },
+        "max_horizon": 12
+    },
+]
+
+
 def merge_forecasting_policy(method_name: str, blueprint: dict, segment_policy: dict, product_policy: dict) -> tuple[dict, int]:
-    method = next((m for m in blueprint["methods"] if m["name"] == method_name), None)
+    method = next((m for m in blueprint["methods"] + BUILTIN_METHODS if m["name"] == method_name), None)
     if not method:
         raise ValueError(f"Method '{method_name}' not found in blueprint")
 
@@ -45,65 +107,513 @@ def parse_forecast_response(text: str) -> List[float]:
         print(f"❌ LLM output parse error: {e}")
         return []
 
+def policy_key(params: dict) -> str:
+    return json.dumps(params, sort_keys=True, default=str)
+
+
+def split_quantiles(quantiles) -> list:
+    """
+    (p10, p50, p90) arrays of a batch -> one (p10, p50, p90) tuple of lists per series.
+    """
+    p10, p50, p90 = (q.tolist() for q in quantiles)
+    return list(zip(p10, p50, p90))
+
+
+def valid_forecast(result, horizon: int) -> Optional[List[float]]:
+    if not isinstance(result, list) or not result:
+        return None
+    try:
+        return [float(x) for x in result][:horizon]
+    except (TypeError, ValueError):
+        return None
+
 # --------------------------------------
 # ✅ Forecasting Agent
 # --------------------------------------
 
 class ForecastingAgent:
-    def __init__(self, company_id: UUID, db: AsyncSession, blueprint: dict):
+    def __init__(self, company_id: UUID, db: AsyncSession, blueprint: dict, write_batch_size: int = None, write_mode: str = None, batch_series: int = 5000, llm: AsyncLLMClient = None, llm_cache: LLMResponseCache = None, period_type: str = "month", intervals: bool = None, interval_method: str = None, llm_batching: bool = None):
         self.company_id = company_id
+        if period_type not in PERIOD_NAMES:
+            raise ValueError(f"Unknown period type '{period_type}'. Available: {list(PERIOD_NAMES)}")
+        self.period_type = period_type
         self.db = db
         self.blueprint = blueprint
+        self.llm = llm or AsyncLLMClient()
+        self.llm_cache = llm_cache or LLMResponseCache(db)
+        self.llm_batching = settings.LLM_BATCHING if llm_batching is None else llm_batching
+        self.llm_batch_stats = {"items": 0, "calls": 0, "splits": 0, "single_retries": 0}
+        self.batch_series = batch_series
+        self.intervals = settings.FORECAST_INTERVALS if intervals is None else intervals
+        self.interval_method = interval_method or settings.FORECAST_INTERVAL_METHOD
+        self.writer = ForecastWriter(company_id, db, batch_size=write_batch_size, mode=write_mode)
+        self.policy_cache = PolicyCache(company_id, db, merge=self.merge_segment_policy)
+        self.forecast_dates: List[date] = []
+        self.forecasted = set()
+        self.shard_timings: List[dict] = []
+        self.run_summary: dict = {}
 
-    async def run(self, default_horizon: int = 3):
-        products = await self.fetch_products()
+    async def run(self, default_horizon: int = 3, incremental: bool = False):
         results = []
+        async for record in self.iter_run(incremental=incremental):
+            for qty, forecast_month in zip(record["forecast"], record["months"]):
+                results.append({
+                    "product_id": record["product_id"],
+                    "forecast": qty,
+                    "month": forecast_month
+                })
+        return results
 
-        for product in products:
-            segment_policy = await self.get_segment_policy(product["segment"])
-            product_policy = product.get("policy_parameters") or {}
-            method = product_policy.get("method") or segment_policy.get("method") or self.blueprint.get("default_method", "llm")
-
-            merged_params, forecast_horizon = merge_forecasting_policy(method, self.blueprint, segment_policy, product_policy)
-            sales = await self.get_sales_data(product["product_id"], product["location_id"])
-
-            try:
-                if method == "llm":
-                    forecast = await self.run_llm_forecast(product, sales, merged_params, forecast_horizon)
-                elif method == "moving_average":
-                    forecast = self.run_moving_average(sales, merged_params, forecast_horizon)
-                elif method == "linear_regression":
-                    forecast = self.run_linear_regression(sales, forecast_horizon)
-                elif method == "seasonal_decomposition":
-                    forecast = self.run_seasonal_decomposition(sales, merged_params, forecast_horizon)
-                elif method == "exponential_smoothing":
-                    forecast = self.run_exponential_smoothing(sales, merged_params, forecast_horizon)
-                elif method == "custom":
-                    forecast = await self.run_custom_logic(product, sales, merged_params, forecast_horizon)
-                else:
-                    forecast = [0.0] * forecast_horizon
-            except Exception as e:
-                print(f"⚠️ Method '{method}' failed: {e}")
-                forecast = [0.0] * forecast_horizon
+    async def iter_run(self, incremental: bool = False):
+        """
+        Forecast the catalog chunk by chunk, yielding one record per product as
+        soon as its chunk is computed and queued for writing. Nothing is kept
+        after it is yielded, so memory does not grow with the catalog.
+        """
+        products, plans, history, watermarks = await self.prepare_run(incremental)
+
+        for method, merged_params, forecast_horizon, indices in self.group_batch_tasks(plans):
+            for start in range(0, len(indices), self.batch_series):
+                chunk = indices[start:start + self.batch_series]
+                block, quantiles = self.forecast_batch_chunk(method, merged_params, forecast_horizon, [products[i] for i in chunk], history)
+                for i, forecast, q in zip(chunk, block, quantiles):
+                    yield await self.write_forecast(products[i], method, forecast, quantiles=q)
+
+        pending = [i for i, (method, _, _) in enumerate(plans) if method not in BATCH_METHODS]
+        for start in range(0, len(pending), self.batch_series):
+            chunk = pending[start:start + self.batch_series]
+            forecasts = [None] * len(chunk)
+            await self.run_product_forecasts([products[i] for i in chunk], [plans[i] for i in chunk], history, forecasts)
+            quantiles = self.reference_intervals([products[i] for i in chunk], history, forecasts)
+            for i, forecast, q in zip(chunk, forecasts, quantiles):
+                yield await self.write_forecast(products[i], plans[i][0], forecast, quantiles=q)
+
+        await self.finish_run(watermarks)
+        print(f"📦 Policy cache: {self.policy_cache.stats()}")
+        print(f"💾 Forecast writer: {self.writer.stats()}")
+        print(f"📊 Run summary: {self.run_summary}")
+
+    async def run_sharded(self, workers: int = None, shard_size: int = None, incremental: bool = False):
+        """
+        Same as run(), but batch-kernel methods are computed across a process
+        pool and written as each shard completes.
+        """
+        products, plans, history, watermarks = await self.prepare_run(incremental)
+        engine = ShardedForecastEngine(
+            workers=workers or settings.FORECAST_WORKERS or None,
+            shard_size=shard_size or settings.FORECAST_SHARD_SIZE,
+            intervals=(settings.FORECAST_INTERVAL_ORIGINS, self.interval_method) if self.intervals else None
+        )
+        results = []
 
-            for i, qty in enumerate(forecast):
-                forecast_month = (datetime.utcnow() + timedelta(days=30 * i)).replace(day=1).date()
-                await self.save_forecast(
-                    product_id=product["product_id"],
-                    location_id=product["location_id"],
-                    forecast_date=forecast_month,
-                    forecast_qty=qty,
-                    method=method
-                )
+        rows = history.rows_for(products)
+        async for indices, block, quantiles in engine.run(history.offsets, history.values, self.group_batch_tasks(plans), rows):
+            quantiles = split_quantiles(quantiles) if quantiles is not None else [None] * len(indices)
+            for i, forecast, q in zip(indices.tolist(), block.tolist(), quantiles):
+                await self.write_forecast(products[i], plans[i][0], forecast, results, quantiles=q)
+
+        pending = [i for i, (method, _, _) in enumerate(plans) if method not in BATCH_METHODS]
+        forecasts = [None] * len(pending)
+        await self.run_product_forecasts([products[i] for i in pending], [plans[i] for i in pending], history, forecasts)
+        quantiles = self.reference_intervals([products[i] for i in pending], history, forecasts)
+        for i, forecast, q in zip(pending, forecasts, quantiles):
+            await self.write_forecast(products[i], plans[i][0], forecast, results, quantiles=q)
+
+        await self.finish_run(watermarks)
+        self.shard_timings = engine.timings
+        print(f"📦 Policy cache: {self.policy_cache.stats()}")
+        print(f"💾 Forecast writer: {self.writer.stats()}")
+        print(f"🧩 {len(engine.timings)} shards on {engine.workers} workers")
+        print(f"📊 Run summary: {self.run_summary}")
+        return results
+
+    async def prepare_run(self, incremental: bool):
+        """
+        Resolve policies for every product, open a new forecast run and, in
+        incremental mode, drop the product-locations whose sales watermark and
+        fingerprint are unchanged since their last forecast. Their rows are
+        carried forward from the current run. The fingerprint covers the policy,
+        the first forecast period and the last complete sales period, so every
+        series is re-forecast once a new period starts.
+        """
+        products = await self.fetch_products()
+        await self.policy_cache.load()
+        plans = [self.resolve_policy(product) for product in products]
+
+        parent_run_id = await current_forecast_run(self.db, self.company_id)
+        # Nothing published yet means nothing to carry forward
+        incremental = incremental and parent_run_id is not None
+
+        buckets = await refresh_demand_buckets(self.db, self.company_id, self.period_type)
+        history = await load_sales_history(self.db, self.company_id, self.period_type)
+        self.forecast_dates = forecast_period_starts(await load_period_starts(self.db, self.period_type), 36, self.period_type)
+        self.forecasted = set()
+
+        sales_marks = await load_sales_watermarks(self.db, self.company_id)
+        stored_marks = await load_forecast_watermarks(self.db, self.company_id) if incremental else {}
+
+        selected, watermarks = [], []
+        for i, product in enumerate(products):
+            key = (str(product["product_id"]), str(product["location_id"]))
+            sales_watermark, sales_count = sales_marks.get(key, (None, 0))
+            fingerprint = policy_key([*plans[i], product["segment"], self.forecast_dates[0], history.last_period])
+            if incremental and stored_marks.get(key) == (sales_watermark, sales_count, fingerprint):
+                continue
+            selected.append(i)
+            watermarks.append({
+                "product_id": key[0],
+                "location_id": key[1],
+                "sales_watermark": sales_watermark,
+                "sales_count": sales_count,
+                "policy_fingerprint": fingerprint
+            })
+
+        run_id = await create_forecast_run(self.db, self.company_id, "incremental" if incremental else "full", parent_run_id)
+        self.writer.run_id = run_id
+        rows_carried = 0
+        if incremental:
+            refreshed = [(w["product_id"], w["location_id"]) for w in watermarks]
+            rows_carried = await carry_forward_forecasts(self.db, run_id, parent_run_id, refreshed)
+
+        self.run_summary = {
+            "run_id": str(run_id),
+            "parent_run_id": str(parent_run_id) if parent_run_id else None,
+            "incremental": incremental,
+            "series_total": len(products),
+            "series_forecast": len(selected),
+            "series_skipped": len(products) - len(selected),
+            "rows_carried": rows_carried,
+            "demand_buckets": buckets
+        }
+        return [products[i] for i in selected], [plans[i] for i in selected], history, watermarks
+
+    async def finish_run(self, watermarks: List[dict]):
+        """
+        Flush the run, publish it as the company's current forecast in the same
+        transaction, then prune old runs by the retention policy. Watermarks
+        are saved only for series whose forecast was written, so a failed
+        series is retried by the next incremental run.
+        """
+        await self.writer.flush()
+        written = [w for w in watermarks if (w["product_id"], w["location_id"]) in self.forecasted]
+        await save_forecast_watermarks(self.db, self.company_id, written)
+        await publish_forecast_run(
+            self.db, self.company_id, self.writer.run_id,
+            series_forecast=self.run_summary["series_forecast"],
+            series_carried=self.run_summary["series_skipped"],
+            rows_written=self.writer.written + self.run_summary["rows_carried"]
+        )
+        await self.db.commit()
+
+        self.run_summary["runs_pruned"] = await prune_forecast_runs(self.db, self.company_id)
+        await self.db.commit()
+
+    async def write_forecast(self, product, method: str, forecast: List[float], results: list = None, quantiles: tuple = None) -> dict:
+        if len(forecast) > len(self.forecast_dates):
+            self.forecast_dates = extend_period_starts(self.forecast_dates, len(forecast), self.period_type)
+
+        months = self.forecast_dates[:len(forecast)]
+        if len(forecast):
+            self.forecasted.add((str(product["product_id"]), str(product["location_id"])))
+        p10, p50, p90 = quantiles or ([None] * len(forecast),) * 3
+        for qty, forecast_month, low, mid, high in zip(forecast, months, p10, p50, p90):
+            await self.writer.add(
+                product_id=product["product_id"],
+                location_id=product["location_id"],
+                forecast_date=forecast_month,
+                forecast_qty=qty,
+                method=method,
+                p10=low,
+                p50=mid,
+                p90=high
+            )
+            if results is not None:
                 results.append({
                     "product_id": str(product["product_id"]),
                     "forecast": qty,
                     "month": forecast_month
                 })
 
+        record = {
+            "product_id": str(product["product_id"]),
+            "location_id": str(product["location_id"]),
+            "method": method,
+            "forecast": list(forecast),
+            "months": months
+        }
+        if quantiles:
+            record.update({"p10": list(p10), "p50": list(p50), "p90": list(p90)})
+        return record
+
+    async def run_on_single_product(self, product):
+        segment_policy = await self.get_segment_policy(product["segment"])
+        method, merged_params, forecast_horizon = self.resolve_policy(product, segment_policy)
+        await refresh_demand_buckets(self.db, self.company_id, self.period_type)
+        sales = await self.get_sales_data(product["product_id"], product["location_id"])
+        cache_key = self.llm_cache_key(method, sales, merged_params, forecast_horizon)
+        if cache_key:
+            await self.llm_cache.prefetch([cache_key])
+        forecast = await self.forecast_product(product, sales, method, merged_params, forecast_horizon)
+        await self.llm_cache.flush()
+
+        # Single-product runs replace the product's rows in the current run. Its
+        # watermark is cleared so the next incremental run does not carry them.
+        run_id = await current_forecast_run(self.db, self.company_id)
+        if run_id is None:
+            run_id = await create_forecast_run(self.db, self.company_id, "single")
+            await publish_forecast_run(self.db, self.company_id, run_id, 1, 0, len(forecast))
+        await self.db.execute(text("""
+            DELETE FROM forecast
+            WHERE run_id = :run_id AND product_id = :product_id AND location_id = :location_id
+        """), {"run_id": str(run_id), "product_id": str(product["product_id"]), "location_id": str(product["location_id"])})
+
+        p10, p50, p90 = self.series_intervals(method, merged_params, sales, forecast) or ([None] * len(forecast),) * 3
+        dates = forecast_period_starts(await load_period_starts(self.db, self.period_type), len(forecast), self.period_type)
+        results = []
+        for i, (qty, forecast_month) in enumerate(zip(forecast, dates)):
+            await self.save_forecast(
+                run_id=run_id,
+                product_id=product["product_id"],
+                location_id=product["location_id"],
+                forecast_date=forecast_month,
+                forecast_qty=qty,
+                method=method,
+                p10=p10[i],
+                p50=p50[i],
+                p90=p90[i]
+            )
+            results.append({
+                "product_id": str(product["product_id"]),
+                "forecast": qty,
+                "month": forecast_month
+            })
+
+        await clear_forecast_watermark(self.db, self.company_id, product["product_id"], product["location_id"])
+        await touch_forecast_run(self.db, run_id)
         await self.db.commit()
         return results
 
+    def merge_segment_policy(self, row: dict) -> dict:
+        segment_policy = row["policy_parameters"]
+        method = segment_policy.get("method") or self.blueprint.get("default_method", "llm")
+        merged_params, forecast_horizon = merge_forecasting_policy(method, self.blueprint, segment_policy, {})
+        return {
+            "segment_policy": segment_policy,
+            "method": method,
+            "params": merged_params,
+            "horizon": forecast_horizon
+        }
+
+    def resolve_policy(self, product, segment_policy: dict = None) -> tuple[str, dict, int]:
+        product_policy = product.get("policy_parameters") or {}
+
+        if segment_policy is None:
+            if not product_policy:
+                entry = self.policy_cache.get(product["segment"])
+                if entry:
+                    return entry["method"], entry["params"], entry["horizon"]
+                segment_policy = {}
+            else:
+                segment_policy = self.policy_cache.get_raw(product["segment"])
+
+        method = product_policy.get("method") or segment_policy.get("method") or self.blueprint.get("default_method", "llm")
+        merged_params, forecast_horizon = merge_forecasting_policy(method, self.blueprint, segment_policy, product_policy)
+        return method, merged_params, forecast_horizon
+
+    def group_batch_tasks(self, plans) -> List[tuple]:
+        """
+        Group plan indices with a batch kernel by (method, params, horizon).
+        """
+        groups = defaultdict(list)
+        for i, (method, merged_params, forecast_horizon) in enumerate(plans):
+            if method in BATCH_METHODS:
+                groups[(method, policy_key(merged_params), forecast_horizon)].append(i)
+        return [
+            (method, plans[indices[0]][1], forecast_horizon, indices)
+            for (method, _, forecast_horizon), indices in groups.items()
+        ]
+
+    def forecast_batch_chunk(self, method: str, merged_params: dict, forecast_horizon: int, products, history: SalesHistory) -> tuple:
+        """
+        Forecasts of one chunk, plus their (p10, p50, p90) when intervals are on.
+        """
+        rows = history.rows_for(products)
+        matrix, lengths = pad_history(history.offsets, history.values, rows)
+        try:
+            block = run_batch_method(method, matrix, lengths, merged_params, forecast_horizon)
+        except Exception as e:
+            print(f"⚠️ Method '{method}' failed: {e}")
+            return np.zeros((len(products), forecast_horizon)).tolist(), [None] * len(products)
+        return block.tolist(), self.batch_intervals(method, matrix, lengths, merged_params, block)
+
+    def batch_intervals(self, method: str, matrix: np.ndarray, lengths: np.ndarray, params: dict, block: np.ndarray) -> list:
+        if not self.intervals:
+            return [None] * len(block)
+        try:
+            return split_quantiles(prediction_intervals(
+                method, matrix, lengths, params, block,
+                origins=settings.FORECAST_INTERVAL_ORIGINS, interval_method=self.interval_method
+            ))
+        except Exception as e:
+            print(f"⚠️ Intervals for '{method}' failed: {e}")
+            return [None] * len(block)
+
+    def series_intervals(self, method: str, params: dict, sales: np.ndarray, forecast: List[float]):
+        if not self.intervals or not len(forecast):
+            return None
+        matrix = np.asarray(sales, dtype=float)[None, :]
+        lengths = np.array([matrix.shape[1]], dtype=np.int64)
+        if method not in BATCH_METHODS:
+            method, params = INTERVAL_REFERENCE_METHOD, {}
+        quantiles = self.batch_intervals(method, matrix, lengths, params, np.asarray(forecast, dtype=float)[None, :])
+        return quantiles[0]
+
+    def reference_intervals(self, products, history: SalesHistory, forecasts: list) -> list:
+        """
+        Intervals for per-product (LLM) forecasts, which have no in-sample fit
+        of their own: residuals of a reference batch method, centred on the
+        product's own forecast.
+        """
+        if not self.intervals or not products:
+            return [None] * len(products)
+        horizon = max((len(f) for f in forecasts), default=0)
+        point = np.zeros((len(forecasts), horizon))
+        for i, forecast in enumerate(forecasts):
+            point[i, :len(forecast)] = forecast
+        matrix, lengths = pad_history(history.offsets, history.values, history.rows_for(products))
+        quantiles = self.batch_intervals(INTERVAL_REFERENCE_METHOD, matrix, lengths, {}, point)
+        return [
+            tuple(q[:len(forecast)] for q in quantile) if quantile else None
+            for quantile, forecast in zip(quantiles, forecasts)
+        ]
+
+    async def run_product_forecasts(self, products, plans, history: SalesHistory, forecasts: list):
+        """
+        Fill every None slot of `forecasts` with a per-product forecast. The
+        LLM-backed calls run concurrently, bounded by the LLM client's semaphore.
+        """
+        pending = [i for i, forecast in enumerate(forecasts) if forecast is None and plans[i][0] not in BATCH_METHODS]
+        series = {i: history.series(products[i]["product_id"], products[i]["location_id"]) for i in pending}
+
+        keys = {i: self.llm_cache_key(plans[i][0], series[i], plans[i][1], plans[i][2]) for i in pending}
+        batch_keys = {
+            i: self.llm_cache_key("llm", series[i], plans[i][1], plans[i][2], batched=True)
+            for i in pending if self.llm_batching and plans[i][0] == "llm"
+        }
+        await self.llm_cache.prefetch(key for key in [*keys.values(), *batch_keys.values()] if key)
+        if batch_keys:
+            # A batched answer or a single-prompt answer already cached is reused
+            uncached = []
+            for i, key in batch_keys.items():
+                content = self.llm_cache.get(key)
+                if content is not None:
+                    forecasts[i] = valid_forecast(parse_forecast_response(content), plans[i][2])
+                if forecasts[i] is None and self.llm_cache.get(keys[i]) is None:
+                    uncached.append(i)
+            await self.run_llm_forecast_batches(products, plans, series, uncached, forecasts)
+            pending = [i for i in pending if forecasts[i] is None]
+
+        computed = await asyncio.gather(*[
+            self.forecast_product(products[i], series[i], *plans[i])
+            for i in pending
+        ])
+        for i, forecast in zip(pending, computed):
+            forecasts[i] = forecast
+        await self.llm_cache.flush()
+
+        if pending or self.llm_batch_stats["items"]:
+            print(f"🤖 LLM client: {self.llm.stats()}, cache: {self.llm_cache.stats()}, batching: {self.llm_batch_stats}")
+
+    async def run_llm_forecast_batches(self, products, plans, series: dict, indices: List[int], forecasts: list):
+        """
+        Batched mode of run_llm_forecast: products sharing a model, horizon and
+        context window are packed many to a prompt. Products left without a
+        forecast fall through to the per-product call.
+        """
+        groups: Dict[tuple, List[int]] = {}
+        for i in indices:
+            _, params, horizon = plans[i]
+            groups.setdefault((params.get("model", "gpt-4"), horizon, params.get("context_window", 8)), []).append(i)
+
+        async def run_group(model: str, horizon: int, context_window: int, group: List[int]):
+            prompter = BatchedPrompter(
+                self.llm, model,
+                system="You are a forecasting expert.",
+                instructions=LLM_BATCH_PROMPT.format(horizon=horizon, periods=PERIOD_NAMES[self.period_type]),
+                output_tokens=4 * horizon + 8
+            )
+            items = []
+            for i in group:
+                sales = np.asarray(series[i], dtype=np.float64)
+                trimmed_sales = sales[-context_window:] if context_window > 0 else sales
+                items.append({
+                    "id": str(i),
+                    "product_id": str(products[i]["product_id"]),
+                    "location_id": str(products[i]["location_id"]),
+                    "sales_history": trimmed_sales.tolist()
+                })
+            results = await prompter.run(items, validate=lambda result: valid_forecast(result, horizon))
+            for i in group:
+                forecast = results.get(str(i))
+                if forecast is not None:
+                    forecasts[i] = forecast
+                    self.llm_cache.put(self.llm_cache_key("llm", series[i], plans[i][1], horizon, batched=True), json.dumps(forecast), model)
+            for key, value in prompter.stats.items():
+                self.llm_batch_stats[key] += value
+
+        await asyncio.gather(*[run_group(*key, group) for key, group in groups.items()])
+
+    def llm_cache_key(self, method: str, sales: np.ndarray, params: Dict, horizon: int, batched: bool = False) -> Optional[str]:
+        """
+        Cache key of a per-product LLM answer. Answers parsed from a batched
+        prompt are keyed by the batch prompt's version, since they come from a
+        different prompt than the single-product call.
+        """
+        sales = np.asarray(sales, dtype=np.float64)
+        if method == "llm":
+            context_window = params.get("context_window", 8)
+            trimmed_sales = sales[-context_window:] if context_window > 0 else sales
+            version = LLM_BATCH_PROMPT_VERSION if batched else LLM_FORECAST_PROMPT_VERSION
+            return LLMResponseCache.fingerprint(params.get("model", "gpt-4"), f"{version}:{self.period_type}", trimmed_sales, horizon, params)
+        if method == "custom":
+            return LLMResponseCache.fingerprint("gpt-4", f"{CUSTOM_LOGIC_PROMPT_VERSION}:{self.period_type}", sales, horizon, params)
+        return None
+
+    async def cached_completion(self, cache_key: str, model: str, messages: list) -> List[float]:
+        content = self.llm_cache.get(cache_key)
+        if content is not None:
+            return parse_forecast_response(content)
+
+        content = await self.llm.complete(model=model, messages=messages)
+        forecast = parse_forecast_response(content)
+        if forecast:
+            self.llm_cache.put(cache_key, content, model)
+        return forecast
+
+    async def forecast_product(self, product, sales: np.ndarray, method: str, merged_params: dict, forecast_horizon: int) -> List[float]:
+        try:
+            if method == "llm":
+                forecast = await self.run_llm_forecast(product, sales, merged_params, forecast_horizon)
+            elif method == "moving_average":
+                forecast = self.run_moving_average(sales, merged_params, forecast_horizon)
+            elif method == "linear_regression":
+                forecast = self.run_linear_regression(sales, forecast_horizon)
+            elif method == "seasonal_decomposition":
+                forecast = self.run_seasonal_decomposition(sales, merged_params, forecast_horizon)
+            elif method == "exponential_smoothing":
+                forecast = self.run_exponential_smoothing(sales, merged_params, forecast_horizon)
+            elif method in BATCH_METHODS:
+                forecast = self.run_single_series(method, sales, merged_params, forecast_horizon)
+            elif method == "custom":
+                forecast = await self.run_custom_logic(product, sales, merged_params, forecast_horizon)
+            else:
+                forecast = [0.0] * forecast_horizon
+        except Exception as e:
+            print(f"⚠️ Method '{method}' failed: {e}")
+            forecast = [0.0] * forecast_horizon
+
+        return forecast
+
     async def fetch_products(self):
         result = await self.db.execute(text("""
             SELECT p.product_id, p.segment, p.location_id, p.policy_parameters
@@ -121,101 +631,122 @@ class ForecastingAgent:
         row = result.mappings().first()
         return row["policy_parameters"] if row else {}
 
-    async def get_sales_data(self, product_id: UUID, location_id: UUID):
-        result = await self.db.execute(text("""
-            SELECT order_date, quantity
-            FROM sales_orders
-            WHERE product_id = :product_id AND location_id = :location_id
-            ORDER BY order_date ASC
-        """), {"product_id": str(product_id), "location_id": str(location_id)})
-        return [r["quantity"] for r in result.mappings().all()]
-
-    async def run_llm_forecast(self, product, sales: List[float], params: Dict, horizon: int):
+    async def get_sales_data(self, product_id: UUID, location_id: UUID) -> np.ndarray:
+        """
+        Read-only: the product's existing demand buckets. Runs refresh them
+        first; read endpoints use what the last refresh stored.
+        """
+        history = await load_sales_history(
+            self.db, self.company_id, self.period_type,
+            product_id=product_id, location_id=location_id
+        )
+        return history.series(product_id, location_id)
+
+    async def run_llm_forecast(self, product, sales: np.ndarray, params: Dict, horizon: int):
+        sales = np.asarray(sales, dtype=np.float64)
         context_window = params.get("context_window", 8)
         trimmed_sales = sales[-context_window:] if context_window > 0 else sales
 
         prompt = f"""
-        You are a demand planner. Based on this sales history, forecast the next {horizon} months.
+        You are a demand planner. Based on this sales history, forecast the next {horizon} {PERIOD_NAMES[self.period_type]}.
 
         Product ID: {product["product_id"]}
         Location ID: {product["location_id"]}
-        Sales history: {trimmed_sales}
+        Sales history: {trimmed_sales.tolist()}
 
         Return only a list like: [100, 105, 110]
         """
-        response = client.chat.completions.create(
+        forecast = await self.cached_completion(
+            self.llm_cache_key("llm", sales, params, horizon),
             model=params.get("model", "gpt-4"),
             messages=[{"role": "system", "content": "You are a forecasting expert."},
                       {"role": "user", "content": prompt}]
         )
-        return parse_forecast_response(response.choices[0].message.content)[:horizon]
-
-    def run_moving_average(self, sales: List[float], params: Dict, horizon: int) -> List[float]:
-        window = params.get("window", 4)
-        if len(sales) < window:
-            return [sum(sales)/len(sales)] * horizon
-        avg = sum(sales[-window:]) / window
-        return [avg] * horizon
-
-    def run_linear_regression(self, sales: List[float], horizon: int) -> List[float]:
-        if len(sales) < 2:
-            return [sales[-1] if sales else 0.0] * horizon
-        X = np.arange(len(sales)).reshape(-1, 1)
-        y = np.array(sales)
-        model = LinearRegression().fit(X, y)
-        future_X = np.arange(len(sales), len(sales) + horizon).reshape(-1, 1)
-        return model.predict(future_X).tolist()
-
-    def run_exponential_smoothing(self, sales: List[float], params: Dict, horizon: int) -> List[float]:
-        alpha = params.get("alpha", 0.3)
-        if not sales:
-            return [0.0] * horizon
-        forecast = sales[0]
-        for val in sales[1:]:
-            forecast = alpha * val + (1 - alpha) * forecast
-        return [forecast] * horizon
-
-    def run_seasonal_decomposition(self, sales: List[float], params: Dict, horizon: int) -> List[float]:
-        period = params.get("period", 12)
-        if len(sales) < period * 2:
-            return [sum(sales) / len(sales)] * horizon
-        seasonal_component = np.mean(sales[-period:])
-        trend = np.mean(sales[-2*period:-period])
-        return [(trend + seasonal_component) for _ in range(horizon)]
-
-    async def run_custom_logic(self, product, sales: List[float], params: Dict, horizon: int):
+        return forecast[:horizon]
+
+    def run_moving_average(self, sales: np.ndarray, params: Dict, horizon: int) -> List[float]:
+        return self.run_single_series("moving_average", sales, params, horizon)
+
+    def run_linear_regression(self, sales: np.ndarray, horizon: int) -> List[float]:
+        return self.run_single_series("linear_regression", sales, {}, horizon)
+
+    def run_exponential_smoothing(self, sales: np.ndarray, params: Dict, horizon: int) -> List[float]:
+        return self.run_single_series("exponential_smoothing", sales, params, horizon)
+
+    def run_seasonal_decomposition(self, sales: np.ndarray, params: Dict, horizon: int) -> List[float]:
+        return self.run_single_series("seasonal_decomposition", sales, params, horizon)
+
+    def run_single_series(self, method: str, sales: np.ndarray, params: Dict, horizon: int) -> List[float]:
+        matrix, lengths = pad_series([np.asarray(sales, dtype=np.float64)])
+        return run_batch_method(method, matrix, lengths, params, horizon)[0].tolist()
+
+    async def run_custom_logic(self, product, sales: np.ndarray, params: Dict, horizon: int):
+        sales = np.asarray(sales, dtype=np.float64)
         logic = params.get("logic", "")
         prompt = f"""
         You are an intelligent forecasting agent. Use the following logic to predict demand:
 
         Custom Logic: {logic}
-        Sales History: {sales}
+        Sales History: {sales.tolist()}
 
-        Predict for next {horizon} months. Return only list format like: [100, 120, 110]
+        Predict for next {horizon} {PERIOD_NAMES[self.period_type]}. Return only list format like: [100, 120, 110]
         """
-        response = client.chat.completions.create(
+        forecast = await self.cached_completion(
+            self.llm_cache_key("custom", sales, params, horizon),
             model="gpt-4",
             messages=[{"role": "system", "content": "You are a rule interpreter and forecasting expert."},
                       {"role": "user", "content": prompt}]
         )
-        return parse_forecast_response(response.choices[0].message.content)[:horizon]
+        return forecast[:horizon]
 
-    async def save_forecast(self, product_id, location_id, forecast_date, forecast_qty, method):
+    async def save_forecast(self, run_id, product_id, location_id, forecast_date, forecast_qty, method, p10=None, p50=None, p90=None):
         await self.db.execute(text("""
             INSERT INTO forecast (
-                id, company_id, product_id, location_id,
-                forecast_date, forecast_quantity, method, created_at
+                id, run_id, company_id, product_id, location_id,
+                forecast_date, forecast_quantity, method, created_at,
+                forecast_p10, forecast_p50, forecast_p90
             ) VALUES (
-                :id, :company_id, :product_id, :location_id,
-                :forecast_date, :forecast_quantity, :method, :created_at
+                :id, :run_id, :company_id, :product_id, :location_id,
+                :forecast_date, :forecast_quantity, :method, :created_at,
+                :p10, :p50, :p90
             )
+            ON CONFLICT (run_id, product_id, location_id, forecast_date) DO UPDATE SET
+                forecast_quantity = EXCLUDED.forecast_quantity,
+                method = EXCLUDED.method,
+                created_at = EXCLUDED.created_at,
+                forecast_p10 = EXCLUDED.forecast_p10,
+                forecast_p50 = EXCLUDED.forecast_p50,
+                forecast_p90 = EXCLUDED.forecast_p90
         """), {
             "id": str(uuid.uuid4()),
+            "run_id": str(run_id),
             "company_id": str(self.company_id),
             "product_id": str(product_id),
             "location_id": str(location_id),
             "forecast_date": forecast_date,
             "forecast_quantity": forecast_qty,
             "method": method,
-            "created_at": datetime.utcnow()
-      
\ No newline at end of file
+            "created_at": datetime.utcnow(),
+            "p10": p10,
+            "p50": p50,
+            "p90": p90
+        })
+
+
+# --------------------------------------
+# ✅ Forecast Reads
+# --------------------------------------
+
+async def get_forecast_data(db: AsyncSession, product_id, location_id) -> List[float]:
+    """
+    Current forecast of a product-location: the rows of its company's
+    published run, found through forecast_current and the run key index.
+    """
+    result = await db.execute(text("""
+        SELECT f.forecast_date, f.forecast_quantity
+        FROM forecast_current c
+        JOIN forecast f ON f.run_id = c.run_id
+        WHERE f.product_id = :product_id AND f.location_id = :location_id
+        ORDER BY f.forecast_date ASC
+    """), {"product_id": str(product_id), "location_id": str(location_id)})
+    return [float(r["forecast_quantity"]) for r in result.mappings().all()]
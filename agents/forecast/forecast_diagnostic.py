@@ -1,13 +1,30 @@
 
-from openai import OpenAI
-from core.config import settings
+from api.utils.json_parser import safe_json_parse
+from services.llm_batching import BatchedPrompter
+from services.llm_client import AsyncLLMClient
 from typing import List, Dict
 
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
+DIAGNOSTIC_FIELDS = ("method_rationale", "assumptions", "forecast_reliability", "improvement_suggestions")
+
+DIAGNOSTIC_BATCH_PROMPT = """
+You are a forecasting analyst. For each item, explain its forecast result to a
+business user: why the method suits the data, what it assumes, whether the
+forecast pattern is valid and reliable, and what could improve it.
+
+Each result is an object like:
+{"method_rationale": "...", "assumptions": "...", "forecast_reliability": "...", "improvement_suggestions": "..."}
+"""
+
+
+def valid_diagnosis(result) -> Dict:
+    if isinstance(result, dict) and all(field in result for field in DIAGNOSTIC_FIELDS):
+        return {field: result[field] for field in DIAGNOSTIC_FIELDS}
+    return None
 
 class ForecastDiagnosticAgent:
-    def __init__(self):
+    def __init__(self, llm: AsyncLLMClient = None):
         self.model = "gpt-4"
+        self.llm = llm
 
     async def explain_forecast(
         self,
@@ -44,16 +61,19 @@ class ForecastDiagnosticAgent:
         }}
         """
 
+        self.llm = self.llm or AsyncLLMClient()
         try:
-            response = client.chat.completions.create(
+            content = await self.llm.complete(
                 model=self.model,
                 messages=[
                     { "role": "system", "content": "You are a forecast diagnostic expert." },
                     { "role": "user", "content": prompt }
                 ]
             )
-            content = response.choices[0].message.content.strip()
-            return eval(content)  # You can replace with safe_json_parse
+            diagnosis = valid_diagnosis(safe_json_parse(content, verbose=False))
+            if diagnosis is None:
+                raise ValueError("Could not parse LLM response")
+            return diagnosis
         except Exception as e:
             print(f"❌ Diagnostic LLM error: {e}")
             return {
@@ -62,3 +82,24 @@ class ForecastDiagnosticAgent:
                 "forecast_reliability": "Unknown",
                 "improvement_suggestions": "Retry with cleaned data or try another method."
             }
+
+    async def explain_forecasts(self, items: List[Dict]) -> List[Dict]:
+        """
+        Batched explain_forecast. items carry the explain_forecast arguments;
+        results come back in the same order, and any product the batch cannot
+        answer is explained on its own.
+        """
+        self.llm = self.llm or AsyncLLMClient()
+        prompter = BatchedPrompter(
+            self.llm, self.model,
+            system="You are a forecast diagnostic expert.",
+            instructions=DIAGNOSTIC_BATCH_PROMPT,
+            output_tokens=250
+        )
+        answers = await prompter.run(
+            [{"id": str(i), **item} for i, item in enumerate(items)],
+            validate=valid_diagnosis,
+            single=lambda item: self.explain_forecast(**{k: v for k, v in item.items() if k != "id"})
+        )
+        print(f"🩺 Diagnostic batching: {prompter.stats}")
+        return [answers.get(str(i)) for i in range(len(items))]
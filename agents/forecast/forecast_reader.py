@@ -0,0 +1,220 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from datetime import date
+from decimal import Decimal
+from typing import List, Optional, Tuple
+from uuid import UUID
+import base64
+import csv
+import io
+import json
+
+from agents.forecast.forecast_runs import current_forecast_run
+
+try:
+    import pyarrow as pa
+except ImportError:  # Arrow output is optional
+    pa = None
+
+
+# --------------------------------------
+# ✅ Forecast Reads
+# --------------------------------------
+# Pages walk one forecast run in (product_id, location_id, forecast_date)
+# order, the same order as the run key index, so every page is a single index
+# range scan no matter how deep into the run it starts.
+
+READ_COLUMNS = {
+    "product_id": "f.product_id",
+    "location_id": "f.location_id",
+    "forecast_date": "f.forecast_date",
+    "forecast_quantity": "f.forecast_quantity",
+    "forecast_p10": "f.forecast_p10",
+    "forecast_p50": "f.forecast_p50",
+    "forecast_p90": "f.forecast_p90",
+    "method": "f.method",
+    "created_at": "f.created_at",
+    "sku": "p.sku",
+    "segment": "p.segment",
+    "category": "p.category",
+}
+KEY_COLUMNS = ("product_id", "location_id", "forecast_date")
+DEFAULT_COLUMNS = ["product_id", "location_id", "forecast_date", "forecast_quantity", "method"]
+PRODUCT_COLUMNS = {"sku", "segment", "category"}
+MAX_PAGE_SIZE = 10000
+
+
+def encode_cursor(row: dict) -> str:
+    key = [str(row["product_id"]), str(row["location_id"]), row["forecast_date"].isoformat()]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str, date]:
+    try:
+        product_id, location_id, forecast_date = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(UUID(product_id)), str(UUID(location_id)), date.fromisoformat(forecast_date)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def resolve_columns(columns: Optional[List[str]]) -> List[str]:
+    columns = columns or DEFAULT_COLUMNS
+    unknown = [c for c in columns if c not in READ_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown columns {unknown}. Available: {list(READ_COLUMNS)}")
+    return columns
+
+
+async def resolve_forecast_run(db: AsyncSession, company_id: UUID, run_id: Optional[UUID] = None) -> Optional[UUID]:
+    if run_id is None:
+        return await current_forecast_run(db, company_id)
+    result = await db.execute(text("""
+        SELECT run_id FROM forecast_run WHERE run_id = :run_id AND company_id = :company_id
+    """), {"run_id": str(run_id), "company_id": str(company_id)})
+    row = result.mappings().first()
+    if not row:
+        raise ValueError(f"Forecast run {run_id} not found for this company")
+    return row["run_id"]
+
+
+async def read_forecast_page(
+    db: AsyncSession,
+    run_id: UUID,
+    columns: List[str],
+    segment: Optional[str] = None,
+    product_ids: Optional[List[str]] = None,
+    location_id: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    cursor: Optional[str] = None,
+    limit: int = 1000
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    One page of a forecast run with the requested columns, plus the cursor of
+    the next page (None on the last page).
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    selected = list(dict.fromkeys([*KEY_COLUMNS, *columns]))
+    select_sql = ", ".join(f"{READ_COLUMNS[c]} AS {c}" for c in selected)
+
+    join_products = segment is not None or PRODUCT_COLUMNS.intersection(selected)
+    filters = ["f.run_id = :run_id"]
+    params = {"run_id": str(run_id), "limit": limit + 1}
+
+    if cursor:
+        params["cursor_product"], params["cursor_location"], params["cursor_date"] = decode_cursor(cursor)
+        filters.append("(f.product_id, f.location_id, f.forecast_date) > (CAST(:cursor_product AS uuid), CAST(:cursor_location AS uuid), :cursor_date)")
+    if segment is not None:
+        filters.append("p.segment = :segment")
+        params["segment"] = segment
+    if product_ids:
+        filters.append("f.product_id = ANY(CAST(:product_ids AS uuid[]))")
+        params["product_ids"] = [str(p) for p in product_ids]
+    if location_id:
+        filters.append("f.location_id = :location_id")
+        params["location_id"] = str(location_id)
+    if date_from:
+        filters.append("f.forecast_date >= :date_from")
+        params["date_from"] = date_from
+    if date_to:
+        filters.append("f.forecast_date <= :date_to")
+        params["date_to"] = date_to
+
+    join_sql = "JOIN products p ON p.product_id = f.product_id AND p.location_id = f.location_id" if join_products else ""
+    result = await db.execute(text(f"""
+        SELECT {select_sql}
+        FROM forecast f
+        {join_sql}
+        WHERE {" AND ".join(filters)}
+        ORDER BY f.product_id, f.location_id, f.forecast_date
+        LIMIT :limit
+    """), params)
+    rows = [dict(r) for r in result.mappings().all()]
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1])
+    return [{c: row[c] for c in columns} for row in rows], next_cursor
+
+
+async def iter_forecast_pages(db: AsyncSession, run_id: UUID, columns: List[str], page_size: int = MAX_PAGE_SIZE, **filters):
+    cursor = None
+    while True:
+        rows, cursor = await read_forecast_page(db, run_id, columns, cursor=cursor, limit=page_size, **filters)
+        if rows:
+            yield rows
+        if cursor is None:
+            return
+
+
+# --------------------------------------
+# ✅ Export Formats
+# --------------------------------------
+
+async def stream_csv(pages, columns: List[str]):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    async for rows in pages:
+        for row in rows:
+            writer.writerow([row[c] for c in columns])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _arrow_value(value):
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def arrow_schema(columns: List[str]):
+    """
+    Fixed Arrow schema of the requested columns, so every page has the same
+    types even when a column is NULL on a whole page (e.g. runs written
+    without intervals).
+    """
+    types = {
+        "product_id": pa.string(),
+        "location_id": pa.string(),
+        "forecast_date": pa.date32(),
+        "forecast_quantity": pa.float64(),
+        "forecast_p10": pa.float64(),
+        "forecast_p50": pa.float64(),
+        "forecast_p90": pa.float64(),
+        "method": pa.string(),
+        "created_at": pa.timestamp("us"),
+        "sku": pa.string(),
+        "segment": pa.string(),
+        "category": pa.string(),
+    }
+    return pa.schema([(c, types[c]) for c in columns])
+
+
+async def stream_arrow(pages, columns: List[str]):
+    """
+    Arrow IPC stream, one record batch per page. An empty result is still a
+    valid stream (schema only).
+    """
+    if pa is None:
+        raise RuntimeError("pyarrow is not installed")
+    schema = arrow_schema(columns)
+    sink = io.BytesIO()
+    writer = pa.ipc.new_stream(sink, schema)
+    async for rows in pages:
+        batch = pa.RecordBatch.from_pylist([
+            {c: _arrow_value(row[c]) for c in columns}
+            for row in rows
+        ], schema=schema)
+        writer.write_batch(batch)
+        yield sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+    writer.close()
+    yield sink.getvalue()
@@ -0,0 +1,152 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from datetime import datetime
+from typing import List, Optional, Tuple
+from uuid import UUID
+import uuid
+
+from core.config import settings
+
+
+# --------------------------------------
+# ✅ Forecast Runs
+# --------------------------------------
+# Every catalog run writes its rows under a new `forecast_run`. The company's
+# `forecast_current` row points at the published run and is swapped in the
+# run's own transaction, so readers see either the old or the new forecast,
+# never a mix. Reads go through the pointer and the (run, product, location,
+# date) key, so they do not slow down as runs pile up.
+
+async def current_forecast_run(db: AsyncSession, company_id: UUID) -> Optional[UUID]:
+    result = await db.execute(text("""
+        SELECT run_id FROM forecast_current WHERE company_id = :company_id
+    """), {"company_id": str(company_id)})
+    row = result.mappings().first()
+    return row["run_id"] if row else None
+
+
+async def create_forecast_run(db: AsyncSession, company_id: UUID, mode: str, parent_run_id: Optional[UUID] = None) -> UUID:
+    run_id = uuid.uuid4()
+    await db.execute(text("""
+        INSERT INTO forecast_run (run_id, company_id, mode, parent_run_id, created_at)
+        VALUES (:run_id, :company_id, :mode, :parent_run_id, :created_at)
+    """), {
+        "run_id": str(run_id),
+        "company_id": str(company_id),
+        "mode": mode,
+        "parent_run_id": str(parent_run_id) if parent_run_id else None,
+        "created_at": datetime.utcnow()
+    })
+    return run_id
+
+
+async def carry_forward_forecasts(db: AsyncSession, run_id: UUID, parent_run_id: UUID, refreshed: List[Tuple[str, str]]) -> int:
+    """
+    Copy the parent run's rows for every product-location that this run did
+    not re-forecast, so an incremental run still publishes a complete forecast.
+    """
+    result = await db.execute(text("""
+        INSERT INTO forecast (
+            id, run_id, company_id, product_id, location_id,
+            forecast_date, forecast_quantity, forecast_p10, forecast_p50, forecast_p90,
+            method, created_at
+        )
+        SELECT
+            gen_random_uuid(), CAST(:run_id AS uuid), f.company_id, f.product_id, f.location_id,
+            f.forecast_date, f.forecast_quantity, f.forecast_p10, f.forecast_p50, f.forecast_p90,
+            f.method, f.created_at
+        FROM forecast f
+        WHERE f.run_id = :parent_run_id
+          AND NOT EXISTS (
+              SELECT 1
+              FROM unnest(CAST(:product_ids AS uuid[]), CAST(:location_ids AS uuid[])) AS r(product_id, location_id)
+              WHERE r.product_id = f.product_id AND r.location_id = f.location_id
+          )
+    """), {
+        "run_id": str(run_id),
+        "parent_run_id": str(parent_run_id),
+        "product_ids": [p for p, _ in refreshed],
+        "location_ids": [l for _, l in refreshed]
+    })
+    return result.rowcount
+
+
+async def publish_forecast_run(db: AsyncSession, company_id: UUID, run_id: UUID, series_forecast: int, series_carried: int, rows_written: int):
+    """
+    Record the run's totals and point `forecast_current` at it. Takes effect
+    when the caller commits.
+    """
+    now = datetime.utcnow()
+    await db.execute(text("""
+        UPDATE forecast_run
+        SET series_forecast = :series_forecast,
+            series_carried = :series_carried,
+            rows_written = :rows_written,
+            published_at = :now,
+            updated_at = :now
+        WHERE run_id = :run_id
+    """), {
+        "run_id": str(run_id),
+        "series_forecast": series_forecast,
+        "series_carried": series_carried,
+        "rows_written": rows_written,
+        "now": now
+    })
+    await db.execute(text("""
+        INSERT INTO forecast_current (company_id, run_id, published_at)
+        VALUES (:company_id, :run_id, :now)
+        ON CONFLICT (company_id) DO UPDATE SET
+            run_id = EXCLUDED.run_id,
+            published_at = EXCLUDED.published_at
+    """), {"company_id": str(company_id), "run_id": str(run_id), "now": now})
+
+
+async def touch_forecast_run(db: AsyncSession, run_id: UUID):
+    """
+    Mark a published run's rows as changed, e.g. after a single product is
+    re-forecast in place, so results cached per run version are not reused.
+    """
+    await db.execute(text("""
+        UPDATE forecast_run SET updated_at = :now WHERE run_id = :run_id
+    """), {"run_id": str(run_id), "now": datetime.utcnow()})
+
+
+async def forecast_run_version(db: AsyncSession, run_id: UUID) -> Optional[datetime]:
+    result = await db.execute(text("""
+        SELECT COALESCE(updated_at, published_at) AS version FROM forecast_run WHERE run_id = :run_id
+    """), {"run_id": str(run_id)})
+    row = result.mappings().first()
+    return row["version"] if row else None
+
+
+async def prune_forecast_runs(db: AsyncSession, company_id: UUID, keep: int = None) -> int:
+    """
+    Keep the current run and the `keep` most recent other published runs;
+    delete the rest, along with runs that were never published.
+    """
+    keep = settings.FORECAST_RUNS_RETAINED if keep is None else keep
+    result = await db.execute(text("""
+        SELECT r.run_id
+        FROM forecast_run r
+        LEFT JOIN forecast_current c ON c.run_id = r.run_id
+        WHERE r.company_id = :company_id
+          AND c.run_id IS NULL
+          AND r.run_id NOT IN (
+              SELECT run_id FROM forecast_run
+              WHERE company_id = :company_id AND published_at IS NOT NULL
+                AND run_id NOT IN (SELECT run_id FROM forecast_current WHERE company_id = :company_id)
+              ORDER BY published_at DESC
+              LIMIT :keep
+          )
+    """), {"company_id": str(company_id), "keep": keep})
+    stale = [str(r["run_id"]) for r in result.mappings().all()]
+    if not stale:
+        return 0
+
+    await db.execute(text("""
+        DELETE FROM forecast WHERE run_id = ANY(CAST(:run_ids AS uuid[]))
+    """), {"run_ids": stale})
+    await db.execute(text("""
+        DELETE FROM forecast_run WHERE run_id = ANY(CAST(:run_ids AS uuid[]))
+    """), {"run_ids": stale})
+    return len(stale)
@@ -0,0 +1,133 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from datetime import datetime
+from typing import List
+from uuid import UUID
+import uuid
+
+from core.config import settings
+
+
+FORECAST_COLUMNS = [
+    "id", "run_id", "company_id", "product_id", "location_id",
+    "forecast_date", "forecast_quantity", "method", "created_at",
+    "forecast_p10", "forecast_p50", "forecast_p90"
+]
+
+
+# --------------------------------------
+# ✅ Bulk Forecast Writer
+# --------------------------------------
+
+class ForecastWriter:
+    """
+    Buffers forecast rows of one forecast run and writes them to the
+    `forecast` table in batches.
+
+    mode="insert" sends one multi-row INSERT ... SELECT FROM unnest(...) per
+    batch, upserting on (run_id, product_id, location_id, forecast_date).
+    mode="copy" streams each batch through asyncpg's COPY protocol and
+    expects every key to be new within the run.
+    """
+
+    def __init__(self, company_id: UUID, db: AsyncSession, batch_size: int = None, mode: str = None, run_id: UUID = None):
+        self.company_id = company_id
+        self.company_uuid = UUID(str(company_id))
+        self.run_id = run_id
+        self.db = db
+        self.batch_size = batch_size or settings.FORECAST_WRITE_BATCH_SIZE
+        self.mode = mode or settings.FORECAST_WRITE_MODE
+        if self.mode not in ("insert", "copy"):
+            raise ValueError(f"Unknown forecast write mode '{self.mode}'")
+        self.rows: List[tuple] = []
+        self.written = 0
+        self.batches = 0
+
+    async def add(self, product_id, location_id, forecast_date, forecast_qty, method, p10=None, p50=None, p90=None):
+        if self.run_id is None:
+            raise ValueError("ForecastWriter needs a run_id before rows are added")
+        self.rows.append((
+            uuid.uuid4(),
+            UUID(str(self.run_id)),
+            self.company_uuid,
+            UUID(str(product_id)),
+            UUID(str(location_id)),
+            forecast_date,
+            float(forecast_qty),
+            method,
+            datetime.utcnow(),
+            None if p10 is None else float(p10),
+            None if p50 is None else float(p50),
+            None if p90 is None else float(p90)
+        ))
+        if len(self.rows) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self):
+        if not self.rows:
+            return
+        rows, self.rows = self.rows, []
+
+        if self.mode == "copy":
+            await self._copy(rows)
+        else:
+            await self._insert(rows)
+
+        self.written += len(rows)
+        self.batches += 1
+
+    async def _insert(self, rows: List[tuple]):
+        columns = list(zip(*rows))
+        await self.db.execute(text("""
+            INSERT INTO forecast (
+                id, run_id, company_id, product_id, location_id,
+                forecast_date, forecast_quantity, method, created_at,
+                forecast_p10, forecast_p50, forecast_p90
+            )
+            SELECT * FROM unnest(
+                CAST(:ids AS uuid[]), CAST(:run_ids AS uuid[]), CAST(:company_ids AS uuid[]),
+                CAST(:product_ids AS uuid[]), CAST(:location_ids AS uuid[]),
+                CAST(:forecast_dates AS date[]), CAST(:forecast_quantities AS numeric[]),
+                CAST(:methods AS text[]), CAST(:created_ats AS timestamp[]),
+                CAST(:p10s AS numeric[]), CAST(:p50s AS numeric[]), CAST(:p90s AS numeric[])
+            )
+            ON CONFLICT (run_id, product_id, location_id, forecast_date) DO UPDATE SET
+                forecast_quantity = EXCLUDED.forecast_quantity,
+                method = EXCLUDED.method,
+                created_at = EXCLUDED.created_at,
+                forecast_p10 = EXCLUDED.forecast_p10,
+                forecast_p50 = EXCLUDED.forecast_p50,
+                forecast_p90 = EXCLUDED.forecast_p90
+        """), {
+            "ids": list(columns[0]),
+            "run_ids": list(columns[1]),
+            "company_ids": list(columns[2]),
+            "product_ids": list(columns[3]),
+            "location_ids": list(columns[4]),
+            "forecast_dates": list(columns[5]),
+            "forecast_quantities": list(columns[6]),
+            "methods": list(columns[7]),
+            "created_ats": list(columns[8]),
+            "p10s": list(columns[9]),
+            "p50s": list(columns[10]),
+            "p90s": list(columns[11])
+        })
+
+    async def _copy(self, rows: List[tuple]):
+        # COPY runs on the session's own connection, so it shares the run's transaction
+        connection = await self.db.connection()
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            "forecast",
+            records=rows,
+            columns=FORECAST_COLUMNS
+        )
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "run_id": str(self.run_id) if self.run_id else None,
+            "batch_size": self.batch_size,
+            "rows_written": self.written,
+            "batches": self.batches
+        }
@@ -3,8 +3,13 @@ from openai import OpenAI
 from core.config import settings
 from agents.forecast.forecast_agent import ForecastingAgent
 from agents.forecast.preforecast_agent import PreForecastAgent
+from agents.forecast.batch_kernels import pad_history, pad_series
+from agents.forecast.method_selector import SEASON_LENGTHS, select_methods
+from agents.forecast.sales_history import load_sales_history
 from sqlalchemy.ext.asyncio import AsyncSession
+from collections import Counter
 from uuid import UUID
+import time
 
 client = OpenAI(api_key=settings.OPENAI_API_KEY)
 
@@ -15,16 +20,90 @@ class ForecastPlanningChain:
         self.db = db
         self.blueprint = blueprint
         self.forecasting_agent = ForecastingAgent(company_id, db, blueprint)
-        self.preforecast_agent = PreForecastAgent()
+        self.preforecast_agent = PreForecastAgent(db=db)
+
+    def describe_selection(self, selection: dict, i: int) -> dict:
+        return {
+            "recommended_method": selection["method"][i],
+            "reason": (
+                f"{selection['demand_class'][i]} demand "
+                f"(ADI {selection['adi'][i]:.2f}, CV² {selection['cv2'][i]:.2f}, "
+                f"trend {selection['trend_strength'][i]:.2f}, seasonality {selection['seasonal_strength'][i]:.2f})"
+            ),
+            "recommended_params": {},
+            "source": "selector"
+        }
+
+    async def recommend_method(self, product_id: str, location_id: str, sales_history: list, user_horizon: int = 12, period_type: str = "month") -> dict:
+        """
+        Statistical method selection; the LLM is only asked when the selector
+        flags the series as ambiguous.
+        """
+        matrix, lengths = pad_series([sales_history])
+        selection = select_methods(matrix, lengths, period=SEASON_LENGTHS.get(period_type, 12))
+        if not selection["needs_llm"][0]:
+            return self.describe_selection(selection, 0)
 
-    async def run_chain(self, product_id: str, location_id: str, sales_history: list, user_horizon: int = 12):
-        # 🔹 Step 1: Use PreForecastAgent to get best method
         recommendation = await self.preforecast_agent.recommend_forecasting_policy(
             product_id=product_id,
             location_id=location_id,
             sales_history=sales_history,
             user_horizon=user_horizon
         )
+        return {**recommendation, "source": "llm"}
+
+    async def classify_catalog(self, period_type: str = "month", llm_fallback_limit: int = 0, user_horizon: int = 12) -> dict:
+        """
+        Recommend a method for every product-location of the company in one
+        vectorized pass. At most `llm_fallback_limit` ambiguous series are sent
+        to the PreForecastAgent; the rest keep the selector's backtest pick.
+        """
+        started = time.perf_counter()
+        history = await load_sales_history(self.db, self.company_id, period_type)
+        matrix, lengths = pad_history(history.offsets, history.values, range(len(history)))
+        selection = select_methods(matrix, lengths, period=SEASON_LENGTHS.get(period_type, 12))
+
+        recommendations = [
+            {"product_id": product_id, "location_id": location_id, **self.describe_selection(selection, i)}
+            for i, (product_id, location_id) in enumerate(history.keys)
+        ]
+
+        # Ambiguous series go to the PreForecastAgent together, many per prompt
+        fallback = [int(i) for i in selection["needs_llm"].nonzero()[0][:llm_fallback_limit]]
+        llm_calls = len(fallback)
+        if fallback:
+            answers = await self.preforecast_agent.recommend_forecasting_policies([
+                {
+                    "product_id": history.keys[i][0],
+                    "location_id": history.keys[i][1],
+                    "sales_history": history.series_at(i).tolist()
+                }
+                for i in fallback
+            ], user_horizon=user_horizon)
+            for i, answer in zip(fallback, answers):
+                recommendations[i] = {"product_id": history.keys[i][0], "location_id": history.keys[i][1], **answer, "source": "llm"}
+
+        elapsed = time.perf_counter() - started
+        print(f"🧭 Classified {len(history)} series in {elapsed:.2f}s ({llm_calls} LLM fallbacks)")
+        return {
+            "series": len(history),
+            "seconds": round(elapsed, 3),
+            "methods": dict(Counter(selection["method"])),
+            "demand_classes": dict(Counter(selection["demand_class"])),
+            "ambiguous": int(selection["ambiguous"].sum()),
+            "needs_llm": int(selection["needs_llm"].sum()),
+            "llm_calls": llm_calls,
+            "recommendations": recommendations
+        }
+
+    async def run_chain(self, product_id: str, location_id: str, sales_history: list, user_horizon: int = 12):
+        # 🔹 Step 1: Pick the method locally, falling back to PreForecastAgent for ambiguous series
+        recommendation = await self.recommend_method(
+            product_id=product_id,
+            location_id=location_id,
+            sales_history=sales_history,
+            user_horizon=user_horizon
+        )
 
         # 🔹 Step 2: Update product.policy_parameters manually or return suggestion
         recommended_method = recommendation.get("recommended_method", "moving_average")
@@ -0,0 +1,261 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from collections import OrderedDict
+from datetime import date
+from typing import Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.linalg import splu
+
+from agents.forecast.batch_kernels import run_batch_method
+from agents.forecast.demand_buckets import load_period_starts
+from agents.forecast.forecast_runs import current_forecast_run, forecast_run_version
+from agents.forecast.sales_history import load_sales_history
+
+
+# --------------------------------------
+# ✅ Summing Matrix
+# --------------------------------------
+# Rows are aggregate nodes (total, then every requested level) followed by
+# the bottom product-location series; columns are the bottom series. A level
+# is a product attribute or several joined with "+", e.g. "segment+location".
+
+HIERARCHY_ATTRIBUTES = ("segment", "category", "location")
+RECONCILE_METHODS = ("bottom_up", "top_down", "ols")
+
+
+class Hierarchy:
+    def __init__(self, keys: List[Tuple[str, str]], attributes: Dict[str, np.ndarray], levels: Sequence[str]):
+        self.keys = keys
+        self.levels = list(levels)
+        n = len(keys)
+
+        blocks = [sp.csr_matrix(np.ones((1, n)))]
+        self.nodes: List[Tuple[str, str]] = [("total", "total")]
+        for level in self.levels:
+            parts = level.split("+")
+            unknown = [p for p in parts if p not in attributes]
+            if unknown:
+                raise ValueError(f"Unknown hierarchy attribute(s) {unknown}. Available: {list(attributes)}")
+            labels = attributes[parts[0]].astype(str)
+            for part in parts[1:]:
+                labels = np.char.add(np.char.add(labels, " / "), attributes[part].astype(str))
+            names, inverse = np.unique(labels, return_inverse=True)
+            blocks.append(sp.csr_matrix((np.ones(n), (inverse, np.arange(n))), shape=(len(names), n)))
+            self.nodes.extend((level, name) for name in names.tolist())
+
+        # A: aggregate rows only; S = [A; I]
+        self.A = sp.vstack(blocks).tocsr()
+        self.S = sp.vstack([self.A, sp.identity(n, format="csr")]).tocsr()
+        self._ols_factor = None
+
+    @property
+    def n_bottom(self) -> int:
+        return self.S.shape[1]
+
+    @property
+    def n_aggregate(self) -> int:
+        return self.A.shape[0]
+
+    def aggregate(self, bottom: np.ndarray) -> np.ndarray:
+        """
+        Every node's value from bottom-level values: one sparse multiply.
+        """
+        return self.S @ bottom
+
+    def reconcile(self, base: np.ndarray, method: str, shares: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Coherent forecasts for every node from base forecasts of every node
+        (rows ordered like S).
+        """
+        if method == "bottom_up":
+            return self.aggregate(base[self.n_aggregate:])
+        if method == "top_down":
+            if shares is None:
+                raise ValueError("Top-down reconciliation needs bottom-level shares")
+            return self.aggregate(shares[:, None] * base[0][None, :])
+        if method == "ols":
+            return self.aggregate(self._ols_bottom(base))
+        raise ValueError(f"Unknown reconciliation method '{method}'")
+
+    def _ols_bottom(self, base: np.ndarray) -> np.ndarray:
+        # (SᵀS)⁻¹Sᵀŷ with SᵀS = I + AᵀA, inverted through Woodbury so only the
+        # small (aggregates × aggregates) system I + AAᵀ is ever factorised.
+        if self._ols_factor is None:
+            inner = sp.identity(self.n_aggregate, format="csc") + (self.A @ self.A.T).tocsc()
+            self._ols_factor = splu(inner)
+        x = self.S.T @ base
+        return x - self.A.T @ self._ols_factor.solve(np.asarray(self.A @ x))
+
+
+# --------------------------------------
+# ✅ Aggregate Base Forecasts
+# --------------------------------------
+
+def right_align(offsets: np.ndarray, values: np.ndarray, rows: np.ndarray, width: int) -> np.ndarray:
+    """
+    History rows placed so that their last (most recent complete) period
+    lines up in the last column. Rows of -1 stay zero.
+    """
+    matrix = np.zeros((len(rows), width))
+    present = rows >= 0
+    safe = np.where(present, rows, 0)
+    lengths = np.where(present, offsets[safe + 1] - offsets[safe], 0)
+    cols = np.arange(width)
+    mask = cols >= width - lengths[:, None]
+    source = offsets[safe][:, None] + cols - (width - lengths[:, None])
+    matrix[mask] = values[source[mask]]
+    return matrix
+
+
+def left_align(matrix: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    width = matrix.shape[1]
+    cols = np.arange(width)
+    source = np.clip(cols + (width - lengths[:, None]), 0, max(width - 1, 0))
+    return np.where(cols < lengths[:, None], np.take_along_axis(matrix, source, axis=1), 0.0)
+
+
+def forecast_steps(period_starts: List[date], last_period: Optional[date], dates: List[date]) -> np.ndarray:
+    """
+    Forecast step (1 = the period after `last_period`) of the period holding
+    each date; 0 for dates not after the history.
+    """
+    if last_period is None or not period_starts or not dates:
+        return np.zeros(len(dates), dtype=np.int64)
+    starts = np.array([d.toordinal() for d in period_starts])
+    periods = np.searchsorted(starts, [d.toordinal() for d in dates], side="right") - 1
+    last = np.searchsorted(starts, last_period.toordinal(), side="right") - 1
+    return np.maximum(periods - last, 0).astype(np.int64)
+
+
+def aggregate_base_forecasts(hierarchy: Hierarchy, history: np.ndarray, lengths: np.ndarray, method: str, params: dict, horizon: int) -> np.ndarray:
+    """
+    Forecast each aggregate node from its own summed history with a batch
+    kernel. An aggregate's history starts with its oldest child series.
+    """
+    aggregate_history = np.asarray(hierarchy.A @ history)
+    aggregate_lengths = np.asarray(hierarchy.A.multiply(lengths[None, :]).max(axis=1).todense()).ravel().astype(np.int64)
+    return run_batch_method(method, left_align(aggregate_history, aggregate_lengths), aggregate_lengths, params, horizon)
+
+
+# --------------------------------------
+# ✅ Hierarchy Forecasts
+# --------------------------------------
+# Results are cached per forecast run version: a run's rows only change when
+# a product is re-forecast in place, which bumps forecast_run.updated_at.
+
+hierarchy_cache: "OrderedDict[tuple, dict]" = OrderedDict()
+HIERARCHY_CACHE_SIZE = 32
+
+
+async def load_run_matrix(db: AsyncSession, company_id: UUID, run_id: UUID):
+    """
+    Product master and the run's forecasts as a (product-location × date) matrix.
+    """
+    result = await db.execute(text("""
+        SELECT product_id, location_id, segment, category
+        FROM products
+        WHERE company_id = :company_id
+        ORDER BY product_id, location_id
+    """), {"company_id": str(company_id)})
+    master = result.mappings().all()
+    keys = [(str(r["product_id"]), str(r["location_id"])) for r in master]
+    index = {key: i for i, key in enumerate(keys)}
+    attributes = {
+        "segment": np.array([r["segment"] or "NA" for r in master], dtype=object),
+        "category": np.array([r["category"] or "NA" for r in master], dtype=object),
+        "location": np.array([key[1] for key in keys], dtype=object),
+    }
+
+    stmt = text("""
+        SELECT product_id, location_id, forecast_date, forecast_quantity
+        FROM forecast
+        WHERE run_id = :run_id
+    """).execution_options(yield_per=10_000)
+    stream = await db.stream(stmt, {"run_id": str(run_id)})
+
+    rows, dates, quantities = [], [], []
+    async for partition in stream.partitions():
+        for product_id, location_id, forecast_date, quantity in partition:
+            row = index.get((str(product_id), str(location_id)))
+            if row is not None:
+                rows.append(row)
+                dates.append(forecast_date)
+                quantities.append(float(quantity or 0))
+
+    date_list = sorted(set(dates))
+    date_index = {d: i for i, d in enumerate(date_list)}
+    forecast = np.zeros((len(keys), len(date_list)))
+    if rows:
+        forecast[np.array(rows), np.array([date_index[d] for d in dates])] = quantities
+    return keys, attributes, date_list, forecast
+
+
+async def hierarchy_forecast(
+    db: AsyncSession,
+    company_id: UUID,
+    levels: Sequence[str] = HIERARCHY_ATTRIBUTES,
+    reconcile: str = "bottom_up",
+    method: str = "exponential_smoothing",
+    params: Optional[dict] = None,
+    period_type: str = "month",
+    share_periods: int = 12
+) -> dict:
+    """
+    Current forecast run rolled up to every level. bottom_up sums the stored
+    product forecasts; top_down and ols also forecast each aggregate's own
+    history with `method` and reconcile so every level adds up.
+    """
+    if reconcile not in RECONCILE_METHODS:
+        raise ValueError(f"Unknown reconciliation method '{reconcile}'")
+    params = params or {}
+    run_id = await current_forecast_run(db, company_id)
+    if run_id is None:
+        raise ValueError("No published forecast run for this company")
+
+    version = await forecast_run_version(db, run_id)
+    cache_key = (str(run_id), str(version), tuple(levels), reconcile, method, repr(sorted(params.items())), period_type)
+    if cache_key in hierarchy_cache:
+        hierarchy_cache.move_to_end(cache_key)
+        return hierarchy_cache[cache_key]
+
+    keys, attributes, dates, bottom = await load_run_matrix(db, company_id, run_id)
+    hierarchy = Hierarchy(keys, attributes, levels)
+
+    if reconcile == "bottom_up":
+        values = hierarchy.aggregate(bottom)
+    else:
+        history = await load_sales_history(db, company_id, period_type)
+        width = int(history.lengths.max()) if len(history) else 0
+        rows = np.array([history.index.get(key, -1) for key in keys], dtype=np.int64)
+        aligned = right_align(history.offsets, history.values, rows, width)
+        lengths = np.where(rows >= 0, history.lengths[np.maximum(rows, 0)], 0) if len(history) else np.zeros(len(keys), dtype=np.int64)
+
+        # Aggregate forecasts are stepped by period after the history and
+        # placed on the run's actual dates; dates outside that horizon keep
+        # the bottom-up sums as their base.
+        steps = forecast_steps(await load_period_starts(db, period_type), history.last_period, dates)
+        aggregate = np.asarray(hierarchy.A @ bottom)
+        if width and steps.max(initial=0) > 0:
+            stepped = aggregate_base_forecasts(hierarchy, aligned, lengths, method, params, int(steps.max()))
+            ahead = steps > 0
+            aggregate[:, ahead] = stepped[:, steps[ahead] - 1]
+        base = np.vstack([aggregate, bottom])
+        recent = aligned[:, -share_periods:].sum(axis=1) if width else np.zeros(len(keys))
+        shares = recent / recent.sum() if recent.sum() > 0 else np.full(len(keys), 1.0 / max(len(keys), 1))
+        values = hierarchy.reconcile(base, reconcile, shares=shares)
+
+    result = {
+        "run_id": str(run_id),
+        "reconcile": reconcile,
+        "dates": dates,
+        "nodes": [
+            {"level": level, "key": key, "forecast": values[i].tolist()}
+            for i, (level, key) in enumerate(hierarchy.nodes)
+        ]
+    }
+    hierarchy_cache[cache_key] = result
+    while len(hierarchy_cache) > HIERARCHY_CACHE_SIZE:
+        hierarchy_cache.popitem(last=False)
+    return result
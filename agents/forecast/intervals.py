@@ -0,0 +1,80 @@
+import numpy as np
+from typing import Tuple
+
+from agents.forecast.batch_kernels import run_batch_method
+
+
+# --------------------------------------
+# ✅ Prediction Intervals
+# --------------------------------------
+# One-step residuals come from re-running the method at the last few forecast
+# origins of every series (a horizon-1 kernel call per origin), so the cost is
+# a fixed number of extra batch passes whatever the method. The h-step spread
+# grows with sqrt(h).
+
+Z_90 = 1.2815515655446004  # standard normal 90th percentile
+INTERVAL_METHODS = ("normal", "bootstrap")
+
+
+def holdout_residuals(method: str, matrix: np.ndarray, lengths: np.ndarray, params: dict, origins: int = 3) -> np.ndarray:
+    """
+    (series × origins) actual minus one-step forecast at each of the last
+    `origins` periods; NaN where fewer than two training periods remain.
+    """
+    rows = np.arange(matrix.shape[0])
+    residuals = np.full((matrix.shape[0], origins), np.nan)
+    for k in range(1, origins + 1):
+        train = lengths - k
+        usable = train >= 2
+        if not usable.any():
+            break
+        forecast = run_batch_method(method, matrix, np.maximum(train, 0), params, 1)[:, 0]
+        actual = matrix[rows, np.maximum(train, 0)]
+        residuals[:, k - 1] = np.where(usable, actual - forecast, np.nan)
+    return residuals
+
+
+def _history_std(matrix: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    mask = np.arange(matrix.shape[1]) < lengths[:, None]
+    count = mask.sum(axis=1)
+    mean = np.divide(np.where(mask, matrix, 0.0).sum(axis=1), count, out=np.zeros(len(lengths)), where=count > 0)
+    sq = np.where(mask, (matrix - mean[:, None]) ** 2, 0.0).sum(axis=1)
+    return np.sqrt(np.divide(sq, count, out=np.zeros(len(lengths)), where=count > 0))
+
+
+def prediction_intervals(
+    method: str,
+    matrix: np.ndarray,
+    lengths: np.ndarray,
+    params: dict,
+    point: np.ndarray,
+    origins: int = 3,
+    interval_method: str = "normal"
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    P10 / P50 / P90 around the point forecasts of a batch.
+
+    normal: point ± z·σ·sqrt(h), with σ the RMS one-step residual of each series.
+    bootstrap: residuals standardised by σ are pooled across the batch, and
+    their empirical 10/50/90% quantiles are scaled back by each series' σ.
+    Series without usable residuals fall back to the spread of their history.
+    """
+    if interval_method not in INTERVAL_METHODS:
+        raise ValueError(f"Unknown interval method '{interval_method}'")
+    residuals = holdout_residuals(method, matrix, lengths, params, origins)
+    observed = np.isfinite(residuals)
+    count = observed.sum(axis=1)
+    sigma = np.sqrt((np.where(observed, residuals, 0.0) ** 2).sum(axis=1) / np.maximum(count, 1))
+    sigma = np.where(count > 0, sigma, _history_std(matrix, lengths))
+
+    spread = sigma[:, None] * np.sqrt(np.arange(1, point.shape[1] + 1))[None, :]
+    if interval_method == "bootstrap" and observed.any():
+        scaled = residuals[observed] / np.repeat(np.where(sigma > 0, sigma, 1.0), count)
+        q10, q50, q90 = np.quantile(scaled, [0.1, 0.5, 0.9])
+    else:
+        q10, q50, q90 = -Z_90, 0.0, Z_90
+
+    p10 = np.maximum(point + q10 * spread, 0.0)
+    p50 = np.maximum(point + q50 * spread, 0.0)
+    p90 = np.maximum(point + q90 * spread, 0.0)
+    return p10, p50, p90
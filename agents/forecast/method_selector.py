@@ -0,0 +1,183 @@
+import numpy as np
+from typing import Dict, List, Optional
+
+from agents.forecast.batch_kernels import run_batch_method
+
+
+# --------------------------------------
+# ✅ Demand Features
+# --------------------------------------
+# Computed for every series of a padded matrix at once. Cells at or beyond a
+# row's length are ignored.
+
+ADI_CUTOFF = 1.32    # Syntetos-Boylan average demand interval cut-off
+CV2_CUTOFF = 0.49    # Syntetos-Boylan squared coefficient of variation cut-off
+STRENGTH_CUTOFF = 0.6
+AMBIGUITY_MARGIN = 0.1
+
+SEASON_LENGTHS = {"month": 12, "week": 52, "fiscal": 12}
+
+
+def _row_stats(values: np.ndarray, mask: np.ndarray):
+    count = mask.sum(axis=1)
+    total = np.where(mask, values, 0.0).sum(axis=1)
+    mean = np.divide(total, count, out=np.zeros_like(total), where=count > 0)
+    sq = np.where(mask, (values - mean[:, None]) ** 2, 0.0).sum(axis=1)
+    var = np.divide(sq, count, out=np.zeros_like(sq), where=count > 0)
+    return mean, var, count
+
+
+def demand_features(matrix: np.ndarray, lengths: np.ndarray, period: int = 12) -> Dict[str, np.ndarray]:
+    cols = np.arange(matrix.shape[1])
+    valid = cols < lengths[:, None]
+    nonzero = valid & (matrix != 0)
+
+    # Intermittency: average interval between demands and variability of demand sizes
+    demand_count = nonzero.sum(axis=1)
+    adi = np.divide(lengths, demand_count, out=np.full(len(lengths), np.inf), where=demand_count > 0)
+    size_mean, size_var, _ = _row_stats(matrix, nonzero)
+    cv2 = np.divide(size_var, size_mean ** 2, out=np.zeros_like(size_var), where=size_mean > 0)
+
+    # Trend strength: R² of a least-squares line
+    n = lengths.astype(np.float64)
+    x = np.where(valid, cols, 0.0)
+    x_mean = np.divide((n - 1) * n / 2, n, out=np.zeros_like(n), where=n > 0)
+    y_mean, y_var, _ = _row_stats(matrix, valid)
+    dx = np.where(valid, x - x_mean[:, None], 0.0)
+    dy = np.where(valid, matrix - y_mean[:, None], 0.0)
+    sxy = (dx * dy).sum(axis=1)
+    sxx = (dx * dx).sum(axis=1)
+    slope = np.divide(sxy, sxx, out=np.zeros_like(sxy), where=sxx > 0)
+    detrended = np.where(valid, dy - slope[:, None] * dx, 0.0)
+    resid_var = np.divide((detrended ** 2).sum(axis=1), n, out=np.zeros_like(n), where=n > 0)
+    trend_strength = np.divide(y_var - resid_var, y_var, out=np.zeros_like(y_var), where=y_var > 0)
+
+    # Seasonality strength: share of detrended variance explained by per-phase means
+    seasonal = np.zeros_like(matrix)
+    if period > 1:
+        phase = cols % period
+        for p in range(period):
+            in_phase = valid & (phase == p)
+            phase_count = in_phase.sum(axis=1)
+            phase_mean = np.divide(
+                np.where(in_phase, detrended, 0.0).sum(axis=1), phase_count,
+                out=np.zeros(len(lengths)), where=phase_count > 0
+            )
+            seasonal[:, phase == p] = phase_mean[:, None]
+    remainder = np.where(valid, detrended - seasonal, 0.0)
+    remainder_var = np.divide((remainder ** 2).sum(axis=1), n, out=np.zeros_like(n), where=n > 0)
+    seasonal_strength = np.divide(resid_var - remainder_var, resid_var, out=np.zeros_like(resid_var), where=resid_var > 0)
+    seasonal_strength = np.where(lengths >= 2 * period, np.clip(seasonal_strength, 0.0, 1.0), 0.0)
+
+    return {
+        "length": lengths,
+        "adi": adi,
+        "cv2": cv2,
+        "trend_strength": np.clip(trend_strength, 0.0, 1.0),
+        "seasonal_strength": seasonal_strength
+    }
+
+
+# --------------------------------------
+# ✅ Rule-based Selection
+# --------------------------------------
+# Method per demand class; later methods register here as they are added.
+
+CLASS_METHODS = {
+    "new": "moving_average",
+    "smooth": "exponential_smoothing",
+    "erratic": "moving_average",
+    "intermittent": "sba",
+    "lumpy": "tsb",
+    "trend": "linear_regression",
+    "seasonal": "holt_winters",
+}
+
+
+def classify_demand(features: Dict[str, np.ndarray], min_history: int = 6) -> np.ndarray:
+    adi, cv2 = features["adi"], features["cv2"]
+    classes = np.where(
+        adi < ADI_CUTOFF,
+        np.where(cv2 < CV2_CUTOFF, "smooth", "erratic"),
+        np.where(cv2 < CV2_CUTOFF, "intermittent", "lumpy")
+    ).astype(object)
+
+    regular = adi < ADI_CUTOFF
+    classes = np.where(regular & (features["trend_strength"] >= STRENGTH_CUTOFF), "trend", classes)
+    classes = np.where(regular & (features["seasonal_strength"] >= STRENGTH_CUTOFF), "seasonal", classes)
+    return np.where(features["length"] < min_history, "new", classes)
+
+
+def ambiguous_series(features: Dict[str, np.ndarray], min_history: int = 6) -> np.ndarray:
+    """
+    Series sitting close to a rule threshold, or showing both strong trend and
+    strong seasonality, where the rules alone are not trusted.
+    """
+    near = lambda value, cutoff: np.abs(value - cutoff) < AMBIGUITY_MARGIN * max(cutoff, 1.0)
+    both = (features["trend_strength"] >= STRENGTH_CUTOFF) & (features["seasonal_strength"] >= STRENGTH_CUTOFF)
+    borderline = (
+        near(features["adi"], ADI_CUTOFF)
+        | near(features["cv2"], CV2_CUTOFF)
+        | near(features["trend_strength"], STRENGTH_CUTOFF)
+        | near(features["seasonal_strength"], STRENGTH_CUTOFF)
+    )
+    return (both | borderline) & (features["length"] >= min_history)
+
+
+def holdout_errors(matrix: np.ndarray, lengths: np.ndarray, methods: List[str], holdout: int = 3, params: Optional[Dict[str, dict]] = None) -> np.ndarray:
+    """
+    Absolute error of each method over the last `holdout` periods of every
+    series, as a (series × methods) array. Series too short to hold out get inf.
+    """
+    params = params or {}
+    train = lengths - holdout
+    usable = train >= 2
+    steps = np.arange(holdout)
+    rows = np.arange(matrix.shape[0])[:, None]
+    actual = matrix[rows, np.clip(train[:, None] + steps, 0, max(matrix.shape[1] - 1, 0))] if matrix.shape[1] else np.zeros((len(lengths), holdout))
+
+    errors = np.full((len(lengths), len(methods)), np.inf)
+    for j, method in enumerate(methods):
+        forecast = run_batch_method(method, matrix, np.maximum(train, 0), params.get(method, {}), holdout)
+        errors[:, j] = np.where(usable, np.abs(forecast - actual).sum(axis=1), np.inf)
+    return errors
+
+
+def select_methods(
+    matrix: np.ndarray,
+    lengths: np.ndarray,
+    period: int = 12,
+    holdout: int = 3,
+    min_history: int = 6,
+    tie_tolerance: float = 0.05
+) -> Dict[str, np.ndarray]:
+    """
+    Pick a forecast method for every series. Rules decide clear cases; series
+    near a threshold get a short holdout backtest among the candidate methods.
+    Whatever the backtest cannot separate is flagged `needs_llm`.
+    """
+    features = demand_features(matrix, lengths, period)
+    classes = classify_demand(features, min_history)
+    methods = np.array([CLASS_METHODS[c] for c in classes], dtype=object)
+    needs_llm = np.zeros(len(lengths), dtype=bool)
+
+    ambiguous = ambiguous_series(features, min_history)
+    if ambiguous.any():
+        candidates = sorted(set(CLASS_METHODS.values()))
+        errors = holdout_errors(matrix[ambiguous], lengths[ambiguous], candidates, holdout)
+        ranked = np.sort(errors, axis=1)
+        best = np.array(candidates, dtype=object)[np.argmin(errors, axis=1)]
+        decided = np.isfinite(ranked[:, 0])
+        close = decided & (ranked[:, 1] - ranked[:, 0] <= tie_tolerance * np.maximum(ranked[:, 0], 1e-9))
+
+        idx = np.flatnonzero(ambiguous)
+        methods[idx[decided]] = best[decided]
+        needs_llm[idx] = ~decided | close
+
+    return {
+        "method": methods,
+        "demand_class": classes,
+        "ambiguous": ambiguous,
+        "needs_llm": needs_llm,
+        **features
+    }
@@ -1,13 +1,56 @@
-from openai import OpenAI
 from api.utils.json_parser import safe_json_parse
-from core.config import settings
-from typing import List, Dict
+from services.llm_cache import LLMResponseCache
+from services.llm_batching import BatchedPrompter
+from services.llm_client import AsyncLLMClient
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Optional
+import asyncio
+import json
+
+# Bump when the prompt below changes so cached recommendations are not reused
+PREFORECAST_PROMPT_VERSION = "preforecast-v3"
+
+FORECAST_METHODS = [
+    "moving_average", "linear_regression", "exponential_smoothing", "seasonal_decomposition",
+    "holt_winters", "croston", "sba", "tsb", "llm", "custom"
+]
+
+PREFORECAST_BATCH_PROMPT = """
+You are a forecasting strategy expert. For each item, analyze its monthly
+sales history and recommend the best forecasting method for a {horizon}-month horizon.
+
+Available methods: {methods}
+
+Each result is an object like:
+{{"recommended_method": "linear_regression", "reason": "Sales show a trend...", "recommended_params": {{"horizon": {horizon}, "frequency": "monthly"}}}}
+"""
+
+
+def valid_recommendation(result) -> Dict:
+    if isinstance(result, dict) and result.get("recommended_method") in FORECAST_METHODS:
+        return {"recommended_params": {}, "reason": "", **result}
+    return None
+
+
+def fallback_recommendation(user_horizon: int, reason: str) -> Dict:
+    return {
+        "recommended_method": "moving_average",
+        "reason": reason,
+        "recommended_params": {
+            "window": 3,
+            "horizon": user_horizon
+        }
+    }
 
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
 
 class PreForecastAgent:
-    def __init__(self):
+    def __init__(self, db: AsyncSession = None, cache: LLMResponseCache = None, llm: AsyncLLMClient = None):
         self.model = "gpt-4"
+        self.cache = cache or LLMResponseCache(db)
+        self.llm = llm
+
+    def cache_key(self, sales_history: List[float], user_horizon: int) -> str:
+        return LLMResponseCache.fingerprint(self.model, PREFORECAST_PROMPT_VERSION, sales_history, user_horizon, {})
 
     async def recommend_forecasting_policy(
         self,
@@ -16,6 +59,32 @@ class PreForecastAgent:
         sales_history: List[float],
         user_horizon: int = 12
     ) -> Dict:
+        cache_key = self.cache_key(sales_history, user_horizon)
+        await self.cache.prefetch([cache_key])
+
+        content = self.cache.get(cache_key)
+        if content is None:
+            content = await self.request_recommendation(product_id, location_id, sales_history, user_horizon)
+            if content is None:
+                return fallback_recommendation(user_horizon, "Unable to reach LLM. Fallback applied.")
+            self.cache.put(cache_key, content, self.model)
+            await self.cache.flush()
+
+        return safe_json_parse(content, fallback=fallback_recommendation(
+            user_horizon, "Could not parse LLM response. Fallback applied."
+        ))
+
+    async def request_recommendation(
+        self,
+        product_id: str,
+        location_id: str,
+        sales_history: List[float],
+        user_horizon: int
+    ) -> Optional[str]:
+        """
+        One LLM call for one series; returns the raw JSON answer, or None if
+        the call failed or the answer does not parse. Does not touch the cache.
+        """
         prompt = f"""
         You are a forecasting strategy expert.
 
@@ -31,6 +100,10 @@ class PreForecastAgent:
         - linear_regression
         - exponential_smoothing
         - seasonal_decomposition
+        - holt_winters
+        - croston
+        - sba
+        - tsb
         - llm
         - custom
 
@@ -45,21 +118,73 @@ class PreForecastAgent:
         }}
         """
 
+        self.llm = self.llm or AsyncLLMClient()
         try:
-            response = client.chat.completions.create(
+            content = await self.llm.complete(
                 model=self.model,
                 messages=[
                     { "role": "system", "content": "You are a forecasting strategy assistant." },
                     { "role": "user", "content": prompt }
                 ]
             )
+        except Exception as e:
+            print(f"❌ PreForecast LLM error: {e}")
+            return None
+
+        content = (content or "").strip()
+        print("🔍 LLM raw response:", content)
+        return content if safe_json_parse(content, verbose=False) is not None else None
 
-            content = response.choices[0].message.content.strip()
-            print("🔍 LLM raw response:", content)
+    async def recommend_forecasting_policies(self, items: List[Dict], user_horizon: int = 12) -> List[Dict]:
+        """
+        Batched recommend_forecasting_policy for many series. items carry
+        product_id, location_id and sales_history; results come back in the
+        same order. Series the batch cannot answer are asked on their own.
+        The cache is read once before and written once after the LLM calls.
+        """
+        keys = [self.cache_key(item["sales_history"], user_horizon) for item in items]
+        await self.cache.prefetch(keys)
+        results: List[Dict] = [None] * len(items)
+        pending = []
+        for i, (item, key) in enumerate(zip(items, keys)):
+            cached = self.cache.get(key)
+            results[i] = valid_recommendation(safe_json_parse(cached, verbose=False)) if cached else None
+            if results[i] is None:
+                pending.append({"id": str(i), **item})
+
+        if pending:
+            self.llm = self.llm or AsyncLLMClient()
+            prompter = BatchedPrompter(
+                self.llm, self.model,
+                system="You are a forecasting strategy assistant.",
+                instructions=PREFORECAST_BATCH_PROMPT.format(horizon=user_horizon, methods=", ".join(FORECAST_METHODS)),
+                output_tokens=80
+            )
+            answers = await prompter.run(pending, validate=valid_recommendation)
+            for item in pending:
+                if item["id"] in answers:
+                    results[int(item["id"])] = answers[item["id"]]
+                    self.cache.put(keys[int(item["id"])], json.dumps(answers[item["id"]]), self.model)
+            print(f"🧠 PreForecast batching: {prompter.stats}")
+
+        # Anything the batch could not answer is asked on its own; only the
+        # LLM calls run concurrently, the session is used once afterwards
+        missing = [i for i, result in enumerate(results) if result is None]
+        retried = await asyncio.gather(*[
+            self.request_recommendation(
+                product_id=items[i]["product_id"],
+                location_id=items[i]["location_id"],
+                sales_history=items[i]["sales_history"],
+                user_horizon=user_horizon
+            )
+            for i in missing
+        ])
+        for i, content in zip(missing, retried):
+            results[i] = valid_recommendation(safe_json_parse(content, verbose=False)) if content else None
+            if results[i] is None:
+                results[i] = fallback_recommendation(user_horizon, "Unable to get a recommendation from the LLM. Fallback applied.")
+            else:
+                self.cache.put(keys[i], content, self.model)
 
-            return safe_json_parse(content, fallback={
-                "recommended_method": "moving_average",
-                "reason": "Could not parse LLM response. Fallback applied.",
-                "recommended_params": {
-                    "window": 3,
-                    
\ No newline at end of file
+        await self.cache.flush()
+        return results
@@ -0,0 +1,138 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from array import array
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+import numpy as np
+
+from agents.forecast.demand_buckets import load_period_starts
+
+
+# --------------------------------------
+# ✅ Bulk Sales History
+# --------------------------------------
+
+class SalesHistory:
+    """
+    Bucketed demand for every product-location of a company, stored as one
+    contiguous float64 array. Series `i` lives in values[offsets[i]:offsets[i + 1]],
+    one value per calendar period from its first sale up to the last complete
+    period (`last_period`), with zeros for periods without sales.
+    """
+
+    def __init__(self, keys: List[Tuple[str, str]], offsets: np.ndarray, values: np.ndarray, last_period: date = None):
+        self.keys = keys
+        self.offsets = offsets
+        self.values = values
+        self.last_period = last_period
+        self.index: Dict[Tuple[str, str], int] = {key: i for i, key in enumerate(keys)}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @property
+    def lengths(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    def row(self, product_id, location_id) -> Optional[int]:
+        return self.index.get((str(product_id), str(location_id)))
+
+    def rows_for(self, products) -> np.ndarray:
+        """
+        History row of each product-location, -1 where it has no sales.
+        """
+        return np.array([
+            self.index.get((str(p["product_id"]), str(p["location_id"])), -1)
+            for p in products
+        ], dtype=np.int64)
+
+    def series_at(self, row: int) -> np.ndarray:
+        return self.values[self.offsets[row]:self.offsets[row + 1]]
+
+    def series(self, product_id, location_id) -> np.ndarray:
+        row = self.row(product_id, location_id)
+        if row is None:
+            return self.values[:0]
+        return self.series_at(row)
+
+
+async def load_sales_history(
+    db: AsyncSession,
+    company_id: UUID,
+    period_type: str = "month",
+    product_id: UUID = None,
+    location_id: UUID = None,
+    chunk_size: int = 10_000
+) -> SalesHistory:
+    """
+    Stream the company's demand buckets in one query, ordered by series, and
+    pack them into a gap-filled SalesHistory. The current (incomplete) period
+    and anything after it are left out.
+    """
+    period_starts = await load_period_starts(db, period_type)
+    today = date.today()
+    complete = [start for start in period_starts if start <= today][:-1]
+    if not complete:
+        return SalesHistory([], np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.float64))
+    period_index = {start: i for i, start in enumerate(complete)}
+    last_index = len(complete) - 1
+
+    filters = ""
+    params = {"company_id": str(company_id), "period_type": period_type, "before": complete[-1]}
+    if product_id is not None:
+        filters = "AND b.product_id = :product_id AND b.location_id IS NOT DISTINCT FROM CAST(:location_id AS uuid)"
+        params.update({"product_id": str(product_id), "location_id": None if location_id is None else str(location_id)})
+
+    stmt = text(f"""
+        SELECT b.product_id, b.location_id, b.period_start, b.quantity
+        FROM demand_buckets b
+        JOIN products p
+          ON p.product_id = b.product_id AND p.location_id IS NOT DISTINCT FROM b.location_id
+        WHERE b.company_id = :company_id
+          AND p.company_id = :company_id
+          AND b.period_type = :period_type
+          AND b.period_start <= :before
+          {filters}
+        ORDER BY b.product_id, b.location_id, b.period_start ASC
+    """).execution_options(yield_per=chunk_size)
+    result = await db.stream(stmt, params)
+
+    keys: List[Tuple[str, str]] = []
+    series_ids = array("q")
+    periods = array("q")
+    quantities = array("d")
+    current = None
+    unknown = 0
+
+    async for rows in result.partitions():
+        for product, location, period_start, quantity in rows:
+            period = period_index.get(period_start)
+            if period is None:
+                # Bucket of an earlier calendar; re-run a full bucket refresh
+                unknown += 1
+                continue
+            key = (str(product), str(location))
+            if key != current:
+                keys.append(key)
+                current = key
+            series_ids.append(len(keys) - 1)
+            periods.append(period)
+            quantities.append(float(quantity or 0))
+
+    if unknown:
+        print(f"⚠️ Skipped {unknown} {period_type} demand buckets that do not start a calendar period")
+
+    series_ids = np.frombuffer(series_ids, dtype=np.int64)
+    periods = np.frombuffer(periods, dtype=np.int64)
+
+    # Each series runs from its first bucket to the last complete period
+    first = np.full(len(keys), last_index, dtype=np.int64)
+    np.minimum.at(first, series_ids, periods)
+    offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+    np.cumsum(last_index - first + 1, out=offsets[1:])
+
+    values = np.zeros(int(offsets[-1]), dtype=np.float64)
+    values[offsets[series_ids] + (periods - first[series_ids])] = np.frombuffer(quantities, dtype=np.float64)
+
+    return SalesHistory(keys=keys, offsets=offsets, values=values, last_period=complete[-1])
@@ -0,0 +1,138 @@
+import asyncio
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import AsyncIterator, Dict, List, Tuple
+
+import numpy as np
+
+from agents.forecast.batch_kernels import pad_history, run_batch_method
+from agents.forecast.intervals import prediction_intervals
+
+
+# --------------------------------------
+# ✅ Worker side
+# --------------------------------------
+# Workers map the history arrays from disk instead of receiving pickled copies.
+# Each worker process opens a given history once and reuses it for later shards.
+
+_MAPPED: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+
+def _mapped_history(directory: str) -> Tuple[np.ndarray, np.ndarray]:
+    if directory not in _MAPPED:
+        _MAPPED.clear()
+        _MAPPED[directory] = (
+            np.load(os.path.join(directory, "offsets.npy"), mmap_mode="r"),
+            np.load(os.path.join(directory, "values.npy"), mmap_mode="r"),
+        )
+    return _MAPPED[directory]
+
+
+def forecast_shard(directory: str, shard_id: int, rows: np.ndarray, method: str, params: dict, horizon: int, intervals: tuple = None) -> dict:
+    """
+    intervals is None or (origins, interval_method); when set the shard also
+    returns its (p10, p50, p90) blocks.
+    """
+    started = time.perf_counter()
+    offsets, values = _mapped_history(directory)
+    matrix, lengths = pad_history(offsets, values, rows)
+    quantiles, error, interval_error = None, None, None
+    try:
+        block = run_batch_method(method, matrix, lengths, params, horizon)
+    except Exception as e:
+        block = np.zeros((len(rows), horizon))
+        error = str(e)
+    # Failed intervals leave the point forecasts as they are
+    if intervals and error is None:
+        try:
+            origins, interval_method = intervals
+            quantiles = prediction_intervals(method, matrix, lengths, params, block, origins, interval_method)
+        except Exception as e:
+            interval_error = str(e)
+    return {
+        "shard_id": shard_id,
+        "forecasts": block,
+        "quantiles": quantiles,
+        "error": error,
+        "interval_error": interval_error,
+        "pid": os.getpid(),
+        "seconds": time.perf_counter() - started
+    }
+
+
+# --------------------------------------
+# ✅ Engine
+# --------------------------------------
+
+class ShardedForecastEngine:
+    """
+    Runs batch-kernel forecasts across a process pool.
+
+    Shards are (method, params, horizon) groups cut into blocks of at most
+    `shard_size` series. Results are yielded as each shard finishes, so the
+    caller can feed a single writer while other shards are still running.
+    """
+
+    def __init__(self, workers: int = None, shard_size: int = 20000, intervals: tuple = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.shard_size = shard_size
+        self.intervals = intervals
+        self.timings: List[dict] = []
+
+    def plan_shards(self, groups: List[tuple], rows: np.ndarray) -> List[dict]:
+        shards = []
+        for method, params, horizon, indices in groups:
+            for start in range(0, len(indices), self.shard_size):
+                chunk = np.asarray(indices[start:start + self.shard_size], dtype=np.int64)
+                shards.append({
+                    "shard_id": len(shards),
+                    "indices": chunk,
+                    "rows": rows[chunk],
+                    "method": method,
+                    "params": params,
+                    "horizon": horizon
+                })
+        return shards
+
+    async def run(self, offsets: np.ndarray, values: np.ndarray, groups: List[tuple], rows: np.ndarray) -> AsyncIterator[tuple]:
+        """
+        groups is a list of (method, params, horizon, task indices); rows[i] is the
+        history row of task i. Yields (task indices, forecast block, quantiles)
+        per shard; quantiles is (p10, p50, p90) or None when intervals are off.
+        """
+        self.timings = []
+        shards = self.plan_shards(groups, rows)
+        if not shards:
+            return
+
+        loop = asyncio.get_running_loop()
+        with tempfile.TemporaryDirectory(prefix="siopx-forecast-") as directory:
+            np.save(os.path.join(directory, "offsets.npy"), offsets)
+            np.save(os.path.join(directory, "values.npy"), values)
+
+            with ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context("spawn")) as pool:
+                pending = [
+                    loop.run_in_executor(
+                        pool, forecast_shard, directory, shard["shard_id"], shard["rows"],
+                        shard["method"], shard["params"], shard["horizon"], self.intervals
+                    )
+                    for shard in shards
+                ]
+                for future in asyncio.as_completed(pending):
+                    result = await future
+                    shard = shards[result["shard_id"]]
+                    if result["error"]:
+                        print(f"⚠️ Method '{shard['method']}' failed in shard {shard['shard_id']}: {result['error']}")
+                    if result["interval_error"]:
+                        print(f"⚠️ Intervals for '{shard['method']}' failed in shard {shard['shard_id']}: {result['interval_error']}")
+                    self.timings.append({
+                        "shard_id": shard["shard_id"],
+                        "method": shard["method"],
+                        "series": len(shard["indices"]),
+                        "seconds": round(result["seconds"], 4),
+                        "pid": result["pid"]
+                    })
+                    yield shard["indices"], result["forecasts"], result["quantiles"]
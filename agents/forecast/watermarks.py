@@ -0,0 +1,81 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from datetime import datetime
+from typing import Dict, List, Tuple
+from uuid import UUID
+
+
+# --------------------------------------
+# ✅ Forecast Watermarks
+# --------------------------------------
+# A product-location needs re-forecasting when its sales watermark (latest
+# created_at / order_date and line count) or its fingerprint (policy, first
+# forecast period and last complete sales period) differs from what was
+# recorded at its last written forecast.
+
+async def load_sales_watermarks(db: AsyncSession, company_id: UUID) -> Dict[Tuple[str, str], tuple]:
+    result = await db.execute(text("""
+        SELECT
+            s.product_id,
+            s.location_id,
+            GREATEST(MAX(s.created_at), MAX(s.order_date)::timestamp) AS sales_watermark,
+            COUNT(*) AS sales_count
+        FROM sales_orders s
+        JOIN products p
+          ON p.product_id = s.product_id AND p.location_id = s.location_id
+        WHERE p.company_id = :company_id
+        GROUP BY s.product_id, s.location_id
+    """), {"company_id": str(company_id)})
+    return {
+        (str(r["product_id"]), str(r["location_id"])): (r["sales_watermark"], int(r["sales_count"]))
+        for r in result.mappings().all()
+    }
+
+
+async def load_forecast_watermarks(db: AsyncSession, company_id: UUID) -> Dict[Tuple[str, str], tuple]:
+    result = await db.execute(text("""
+        SELECT product_id, location_id, sales_watermark, sales_count, policy_fingerprint
+        FROM forecast_watermarks
+        WHERE company_id = :company_id
+    """), {"company_id": str(company_id)})
+    return {
+        (str(r["product_id"]), str(r["location_id"])): (r["sales_watermark"], r["sales_count"], r["policy_fingerprint"])
+        for r in result.mappings().all()
+    }
+
+
+async def save_forecast_watermarks(db: AsyncSession, company_id: UUID, rows: List[dict]):
+    if not rows:
+        return
+    now = datetime.utcnow()
+    await db.execute(text("""
+        INSERT INTO forecast_watermarks (
+            company_id, product_id, location_id,
+            sales_watermark, sales_count, policy_fingerprint, forecast_at
+        ) VALUES (
+            :company_id, :product_id, :location_id,
+            :sales_watermark, :sales_count, :policy_fingerprint, :forecast_at
+        )
+        ON CONFLICT (company_id, product_id, location_id) DO UPDATE SET
+            sales_watermark = EXCLUDED.sales_watermark,
+            sales_count = EXCLUDED.sales_count,
+            policy_fingerprint = EXCLUDED.policy_fingerprint,
+            forecast_at = EXCLUDED.forecast_at
+    """), [{**row, "company_id": str(company_id), "forecast_at": now} for row in rows])
+
+
+async def clear_forecast_watermark(db: AsyncSession, company_id: UUID, product_id, location_id):
+    """
+    Forget a series' watermark so the next incremental run re-forecasts it
+    instead of carrying forward rows written outside a run.
+    """
+    await db.execute(text("""
+        DELETE FROM forecast_watermarks
+        WHERE company_id = :company_id
+          AND product_id = :product_id
+          AND location_id IS NOT DISTINCT FROM CAST(:location_id AS uuid)
+    """), {
+        "company_id": str(company_id),
+        "product_id": str(product_id),
+        "location_id": None if location_id is None else str(location_id)
+    })
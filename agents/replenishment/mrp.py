@@ -0,0 +1,429 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from array import array
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+from uuid import UUID
+import math
+import time
+import uuid
+import numpy as np
+
+from agents.forecast.forecast_runs import current_forecast_run
+from agents.replenishment.planned_order_writer import PLANNED_ORDER_TYPE, order_key
+
+
+# --------------------------------------
+# ✅ Netting Kernel
+# --------------------------------------
+# Items are rows and time buckets are columns. The projection has to walk the
+# buckets in order (each bucket starts from the previous projected on-hand),
+# so the loop runs over buckets while every step is one vector operation
+# across all items.
+
+LOT_SIZING_RULES = ("lot_for_lot", "fixed_order_quantity", "periods_of_supply", "order_up_to")
+
+
+def _per_item(value, n: int, default: float) -> np.ndarray:
+    if value is None:
+        value = default
+    return np.broadcast_to(np.asarray(value, dtype=np.float64), (n,))
+
+
+def net_requirements(
+    gross: np.ndarray,
+    receipts: np.ndarray,
+    on_hand: np.ndarray,
+    safety_stock=None,
+    lead_time=None,
+    reorder_point=None,
+    max_stock=None,
+    lot_sizing: str = "lot_for_lot",
+    order_quantity=None,
+    periods: int = 1,
+    min_order=None,
+    multiple=None
+) -> dict:
+    """
+    Time-phased netting for a block of items.
+
+    gross, receipts: (items × buckets) gross requirements and scheduled receipts.
+    on_hand, safety_stock: per item. lead_time: per item, in buckets.
+    An item orders when projected on-hand drops below its safety stock, or
+    below its `reorder_point` if that is higher (NaN = not set).
+    Lot sizing: lot_for_lot orders the net requirement; fixed_order_quantity
+    orders multiples of `order_quantity`; periods_of_supply also covers the
+    next `periods - 1` buckets; order_up_to refills to `max_stock` (items
+    without one order lot-for-lot). `min_order` and `multiple` apply on top.
+
+    Returns projected on-hand, net requirements, planned receipts, planned
+    releases (offset by lead time) and the per-item count of releases that
+    fall before the first bucket (past due).
+    """
+    if lot_sizing not in LOT_SIZING_RULES:
+        raise ValueError(f"Unknown lot sizing rule '{lot_sizing}'. Available: {list(LOT_SIZING_RULES)}")
+    n, buckets = gross.shape
+    safety_stock = _per_item(safety_stock, n, 0.0)
+    reorder_level = np.fmax(safety_stock, _per_item(reorder_point, n, np.nan))
+    max_stock = _per_item(max_stock, n, np.nan)
+    order_quantity = _per_item(order_quantity, n, 1.0)
+    min_order = _per_item(min_order, n, 0.0)
+    multiple = _per_item(multiple, n, 0.0)
+    lead_time = _per_item(lead_time, n, 0.0).astype(np.int64)
+    if lot_sizing == "fixed_order_quantity" and (order_quantity <= 0).any():
+        raise ValueError("fixed_order_quantity needs a positive order_quantity")
+
+    projected = np.zeros((n, buckets))
+    net = np.zeros((n, buckets))
+    planned = np.zeros((n, buckets))
+
+    # Cumulative sums let periods_of_supply look ahead without another loop
+    zero = np.zeros((n, 1))
+    cum_gross = np.hstack([zero, np.cumsum(gross, axis=1)])
+    cum_receipts = np.hstack([zero, np.cumsum(receipts, axis=1)])
+
+    available = np.asarray(on_hand, dtype=np.float64).copy()
+    for t in range(buckets):
+        before = available + receipts[:, t] - gross[:, t]
+        shortfall = np.maximum(reorder_level - before, 0.0)
+        ordering = shortfall > 0
+
+        if lot_sizing == "periods_of_supply":
+            end = min(t + max(periods, 1), buckets)
+            later = (cum_gross[:, end] - cum_gross[:, t + 1]) - (cum_receipts[:, end] - cum_receipts[:, t + 1])
+            qty = shortfall + np.maximum(later, 0.0)
+        elif lot_sizing == "fixed_order_quantity":
+            qty = np.ceil(shortfall / order_quantity) * order_quantity
+        elif lot_sizing == "order_up_to":
+            qty = np.fmax(shortfall, max_stock - before)
+        else:
+            qty = shortfall
+
+        qty = np.maximum(qty, min_order)
+        qty = np.where(multiple > 0, np.ceil(qty / np.where(multiple > 0, multiple, 1.0)) * multiple, qty)
+        qty = np.where(ordering, qty, 0.0)
+
+        net[:, t] = shortfall
+        planned[:, t] = qty
+        available = before + qty
+        projected[:, t] = available
+
+    rows, cols = np.nonzero(planned)
+    release_cols = cols - lead_time[rows]
+    releases = np.zeros((n, buckets))
+    np.add.at(releases, (rows, np.maximum(release_cols, 0)), planned[rows, cols])
+    past_due = np.bincount(rows[release_cols < 0], minlength=n)
+
+    return {
+        "projected_on_hand": projected,
+        "net_requirements": net,
+        "planned_receipts": planned,
+        "planned_releases": releases,
+        "past_due": past_due
+    }
+
+
+# --------------------------------------
+# ✅ MRP Inputs
+# --------------------------------------
+# Buckets are the dates of the company's published forecast run. Receipts due
+# before the first bucket land in it; receipts beyond the horizon are ignored.
+
+DEFAULT_LEAD_TIME_DAYS = 7
+CLOSED_ORDER_STATUSES = ("received", "completed", "closed", "cancelled", "canceled")
+MRP_SUPPLY_TYPE = "mrp_planned_order"
+
+
+# Single-site: the company's product-locations. Network: also every site the
+# product is stocked at in product_location and every upstream location that
+# feeds one of those sites, so dependent demand always has a row to land on.
+SITE_ITEMS = """
+    WITH items AS (
+        SELECT product_id, location_id FROM products WHERE company_id = :company_id
+    )
+"""
+NETWORK_ITEMS = """
+    WITH RECURSIVE seeds AS (
+        SELECT product_id, location_id FROM products WHERE company_id = :company_id
+        UNION
+        SELECT pl.product_id, pl.location_id
+        FROM product_location pl
+        WHERE pl.product_id IN (SELECT product_id FROM products WHERE company_id = :company_id)
+    ),
+    items AS (
+        SELECT product_id, location_id FROM seeds
+        UNION
+        SELECT i.product_id, l.parent_location_id
+        FROM items i
+        JOIN locations l ON l.location_id = i.location_id
+        WHERE l.parent_location_id IS NOT NULL
+    )
+"""
+
+
+class MrpInputs:
+    def __init__(self, keys: List[Tuple[str, str]], buckets: List[date], gross: np.ndarray, receipts: np.ndarray, on_hand: np.ndarray, safety_stock: np.ndarray, lead_time_days: np.ndarray, reorder_point: np.ndarray = None, max_stock: np.ndarray = None, parents: List[Optional[str]] = None):
+        self.keys = keys
+        self.buckets = buckets
+        self.gross = gross
+        self.receipts = receipts
+        self.on_hand = on_hand
+        self.safety_stock = safety_stock
+        self.lead_time_days = lead_time_days
+        self.reorder_point = reorder_point
+        self.max_stock = max_stock
+        self.parents = parents or [None] * len(keys)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def lead_time_buckets(self) -> np.ndarray:
+        if len(self.buckets) < 2:
+            return np.zeros(len(self.keys), dtype=np.int64)
+        ordinals = np.array([d.toordinal() for d in self.buckets])
+        bucket_days = float(np.diff(ordinals).mean())
+        return np.ceil(self.lead_time_days / bucket_days).astype(np.int64)
+
+
+def bucket_index(bucket_ordinals: np.ndarray, dates: List[date]) -> np.ndarray:
+    """
+    Bucket of each date: the last bucket starting on or before it, 0 for
+    earlier dates and -1 past the end of the horizon.
+    """
+    ordinals = np.array([d.toordinal() for d in dates], dtype=np.int64)
+    index = np.searchsorted(bucket_ordinals, ordinals, side="right") - 1
+    horizon_end = bucket_ordinals[-1] + (bucket_ordinals[-1] - bucket_ordinals[-2] if len(bucket_ordinals) > 1 else 1)
+    index = np.maximum(index, 0)
+    index[ordinals >= horizon_end] = -1
+    return index
+
+
+async def load_mrp_inputs(db: AsyncSession, company_id: UUID, chunk_size: int = 10_000, network: bool = False) -> MrpInputs:
+    """
+    Planning inputs of every product-location (or, with `network`, every
+    product at every site of its location network), one grouped query per
+    source table.
+    """
+    run_id = await current_forecast_run(db, company_id)
+    if run_id is None:
+        raise ValueError("No published forecast run for this company")
+    params = {"company_id": str(company_id)}
+
+    result = await db.execute(text((NETWORK_ITEMS if network else SITE_ITEMS) + """,
+        on_hand AS (
+            SELECT oh.product_id, oh.location_id, SUM(oh.quantity) AS quantity
+            FROM on_hand_inventory oh
+            WHERE oh.company_id = :company_id
+            GROUP BY oh.product_id, oh.location_id
+        )
+        SELECT
+            i.product_id,
+            i.location_id,
+            l.parent_location_id,
+            COALESCE(oh.quantity, 0) AS on_hand,
+            COALESCE(pl.safety_stock, 0) AS safety_stock,
+            COALESCE(pl.lead_time_days, :default_lead_time) AS lead_time_days,
+            pl.reorder_point,
+            pl.max_stock
+        FROM items i
+        LEFT JOIN locations l
+          ON l.location_id = i.location_id
+        LEFT JOIN on_hand oh
+          ON oh.product_id = i.product_id AND oh.location_id = i.location_id
+        LEFT JOIN LATERAL (
+            SELECT safety_stock, lead_time_days, reorder_point, max_stock
+            FROM product_location
+            WHERE product_id = i.product_id AND location_id = i.location_id
+            ORDER BY created_at DESC NULLS LAST
+            LIMIT 1
+        ) pl ON TRUE
+        ORDER BY i.product_id, i.location_id
+    """), {**params, "default_lead_time": DEFAULT_LEAD_TIME_DAYS})
+    items = result.mappings().all()
+    keys = [order_key(r["product_id"], r["location_id"]) for r in items]
+    index = {key: i for i, key in enumerate(keys)}
+
+    result = await db.execute(text("""
+        SELECT DISTINCT forecast_date FROM forecast WHERE run_id = :run_id ORDER BY forecast_date
+    """), {"run_id": str(run_id)})
+    buckets = [r["forecast_date"] for r in result.mappings().all()]
+    bucket_ordinals = np.array([d.toordinal() for d in buckets], dtype=np.int64)
+    gross = np.zeros((len(keys), len(buckets)))
+    receipts = np.zeros((len(keys), len(buckets)))
+
+    async def accumulate(target: np.ndarray, stmt, stmt_params: dict):
+        rows, dates, quantities = array("q"), [], array("d")
+        stream = await db.stream(stmt.execution_options(yield_per=chunk_size), stmt_params)
+        async for partition in stream.partitions():
+            for product_id, location_id, due, quantity in partition:
+                row = index.get(order_key(product_id, location_id))
+                if row is None or due is None:
+                    continue
+                rows.append(row)
+                dates.append(due)
+                quantities.append(float(quantity or 0))
+        if not dates or not len(buckets):
+            return
+        cols = bucket_index(bucket_ordinals, dates)
+        rows = np.frombuffer(rows, dtype=np.int64)
+        keep = cols >= 0
+        np.add.at(target, (rows[keep], cols[keep]), np.frombuffer(quantities, dtype=np.float64)[keep])
+
+    await accumulate(gross, text("""
+        SELECT product_id, location_id, forecast_date, forecast_quantity
+        FROM forecast
+        WHERE run_id = :run_id
+    """), {"run_id": str(run_id)})
+
+    # Open purchase and production orders are scheduled receipts; planned
+    # orders (order_type 3) are not firm and get re-planned here.
+    await accumulate(receipts, text("""
+        SELECT product_id, location_id, COALESCE(expected_delivery, order_date), quantity
+        FROM purchase_orders
+        WHERE company_id = :company_id
+          AND COALESCE(order_type, 0) <> :planned_type
+          AND LOWER(COALESCE(status, '')) <> ALL(:closed)
+    """), {**params, "planned_type": PLANNED_ORDER_TYPE, "closed": list(CLOSED_ORDER_STATUSES)})
+    await accumulate(receipts, text("""
+        SELECT po.product_id, po.location_id, COALESCE(po.end_date, po.start_date), po.quantity
+        FROM production_orders po
+        WHERE po.product_id IN (SELECT product_id FROM products WHERE company_id = :company_id)
+          AND LOWER(COALESCE(po.status, '')) <> ALL(:closed)
+    """), {**params, "closed": list(CLOSED_ORDER_STATUSES)})
+
+    return MrpInputs(
+        keys=keys,
+        buckets=buckets,
+        gross=gross,
+        receipts=receipts,
+        on_hand=np.array([float(r["on_hand"]) for r in items]),
+        safety_stock=np.array([float(r["safety_stock"]) for r in items]),
+        lead_time_days=np.array([float(r["lead_time_days"]) for r in items]),
+        reorder_point=np.array([np.nan if r["reorder_point"] is None else float(r["reorder_point"]) for r in items]),
+        max_stock=np.array([np.nan if r["max_stock"] is None else float(r["max_stock"]) for r in items]),
+        parents=[None if r["parent_location_id"] is None else str(r["parent_location_id"]) for r in items]
+    )
+
+
+# --------------------------------------
+# ✅ MRP Run
+# --------------------------------------
+
+async def save_mrp_supply_plan(db: AsyncSession, company_id: UUID, keys: List[Tuple[str, str]], buckets: List[date], planned: np.ndarray) -> int:
+    """
+    Replace the company's previous MRP planned receipts in `supply_plan`
+    (regenerative run): one DELETE and one INSERT ... SELECT FROM unnest.
+    """
+    await db.execute(text("""
+        DELETE FROM supply_plan
+        WHERE product_id IN (SELECT product_id FROM products WHERE company_id = :company_id)
+          AND supply_type = :supply_type
+    """), {"company_id": str(company_id), "supply_type": MRP_SUPPLY_TYPE})
+
+    rows, cols = np.nonzero(planned)
+    if not len(rows):
+        return 0
+    await db.execute(text("""
+        INSERT INTO supply_plan (plan_id, product_id, location_id, supply_date, planned_qty, supply_type, created_by, created_at)
+        SELECT u.plan_id, u.product_id, u.location_id, u.supply_date, u.planned_qty, :supply_type, :created_by, :created_at
+        FROM unnest(
+            CAST(:plan_ids AS uuid[]), CAST(:product_ids AS uuid[]), CAST(:location_ids AS uuid[]),
+            CAST(:supply_dates AS date[]), CAST(:quantities AS integer[])
+        ) AS u(plan_id, product_id, location_id, supply_date, planned_qty)
+    """), {
+        "supply_type": MRP_SUPPLY_TYPE,
+        "created_by": "MRP Agent",
+        "created_at": datetime.utcnow(),
+        "plan_ids": [str(uuid.uuid4()) for _ in range(len(rows))],
+        "product_ids": [keys[r][0] for r in rows.tolist()],
+        "location_ids": [keys[r][1] for r in rows.tolist()],
+        "supply_dates": [buckets[c] for c in cols.tolist()],
+        "quantities": [int(math.ceil(q)) for q in planned[rows, cols].tolist()]
+    })
+    return len(rows)
+
+
+async def run_mrp(
+    db: AsyncSession,
+    company_id: UUID,
+    lot_sizing: str = "lot_for_lot",
+    order_quantity: Optional[float] = None,
+    periods: int = 1,
+    min_order: Optional[float] = None,
+    multiple: Optional[float] = None,
+    write: bool = False,
+    order_limit: int = 1000,
+    multi_echelon: bool = False
+) -> dict:
+    """
+    Regenerative MRP over the current forecast horizon for every
+    product-location of the company. With `multi_echelon`, the whole location
+    network is planned and store orders become demand at the feeding DCs.
+    """
+    from agents.replenishment.multi_echelon import plan_network
+
+    timings = {}
+    started = time.perf_counter()
+    inputs = await load_mrp_inputs(db, company_id, network=multi_echelon)
+    timings["load_seconds"] = round(time.perf_counter() - started, 3)
+
+    started = time.perf_counter()
+    lot_rules = {
+        "lot_sizing": lot_sizing,
+        "order_quantity": order_quantity,
+        "periods": periods,
+        "min_order": min_order,
+        "multiple": multiple
+    }
+    if multi_echelon:
+        plan = plan_network(inputs, **lot_rules)
+    else:
+        plan = net_requirements(
+            inputs.gross, inputs.receipts, inputs.on_hand,
+            safety_stock=inputs.safety_stock,
+            lead_time=inputs.lead_time_buckets(),
+            reorder_point=inputs.reorder_point,
+            max_stock=inputs.max_stock,
+            **lot_rules
+        )
+    timings["net_seconds"] = round(time.perf_counter() - started, 3)
+
+    written = 0
+    if write:
+        started = time.perf_counter()
+        written = await save_mrp_supply_plan(db, company_id, inputs.keys, inputs.buckets, plan["planned_receipts"])
+        await db.commit()
+        timings["write_seconds"] = round(time.perf_counter() - started, 3)
+
+    planned, releases = plan["planned_receipts"], plan["planned_releases"]
+    lead_time = inputs.lead_time_buckets()
+    levels = plan.get("levels")
+    rows, cols = np.nonzero(planned)
+    orders = [
+        {
+            **({"echelon": int(levels[r])} if levels is not None else {}),
+            "product_id": inputs.keys[r][0],
+            "location_id": inputs.keys[r][1],
+            "receipt_date": inputs.buckets[c],
+            "release_date": inputs.buckets[max(c - int(lead_time[r]), 0)],
+            "past_due": c - int(lead_time[r]) < 0,
+            "quantity": float(planned[r, c])
+        }
+        for r, c in zip(rows[:order_limit].tolist(), cols[:order_limit].tolist())
+    ]
+    print(f"🏭 MRP: {len(inputs)} items × {len(inputs.buckets)} buckets, {len(rows)} planned orders, {timings}")
+
+    return {
+        "items": len(inputs),
+        "buckets": inputs.buckets,
+        "lot_sizing": lot_sizing,
+        "planned_orders": int(len(rows)),
+        "planned_quantity": float(planned.sum()),
+        "items_with_orders": int((planned > 0).any(axis=1).sum()),
+        "past_due_orders": int(plan["past_due"].sum()),
+        "releases_by_bucket": releases.sum(axis=0).tolist(),
+        "echelons": plan.get("echelons"),
+        "supply_plan_rows_written": written,
+        "timings": timings,
+        "orders": orders
+    }
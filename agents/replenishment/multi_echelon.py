@@ -0,0 +1,100 @@
+from typing import Dict, List, Optional
+import numpy as np
+
+from agents.replenishment.mrp import MrpInputs, net_requirements
+
+
+# --------------------------------------
+# ✅ Location Network
+# --------------------------------------
+# locations.parent_location_id points at the site that replenishes a location
+# (store -> DC -> central DC). Echelon 0 is a site nothing draws from; every
+# parent sits at least one echelon above each of its children, so planning
+# echelons in ascending order always nets a site after all the sites it feeds.
+
+def echelon_levels(locations: List[str], parents: List[Optional[str]]) -> Dict[str, int]:
+    """
+    Echelon of every location, from (location, parent) pairs. Parents that
+    are not listed get a level too. Raises ValueError on a cycle.
+    """
+    names = list(dict.fromkeys(list(locations) + [p for p in parents if p is not None]))
+    index = {name: i for i, name in enumerate(names)}
+    child = np.array([index[l] for l, p in zip(locations, parents) if p is not None], dtype=np.int64)
+    parent = np.array([index[p] for p in parents if p is not None], dtype=np.int64)
+
+    levels = np.zeros(len(names), dtype=np.int64)
+    for _ in range(len(names) + 1):
+        raised = levels.copy()
+        np.maximum.at(raised, parent, levels[child] + 1)
+        if np.array_equal(raised, levels):
+            return dict(zip(names, levels.tolist()))
+        levels = raised
+    raise ValueError("The location network has a cycle (check locations.parent_location_id)")
+
+
+# --------------------------------------
+# ✅ Multi-Echelon Netting
+# --------------------------------------
+
+def plan_network(inputs: MrpInputs, **lot_sizing) -> dict:
+    """
+    Net every echelon in one batched call, lowest first. The planned releases
+    of an echelon become dependent demand of the same product at the parent
+    site, in the bucket the order is released, before the next echelon is
+    netted. `lot_sizing` is passed through to net_requirements.
+    """
+    n, buckets = inputs.gross.shape
+    locations = [location_id for _, location_id in inputs.keys]
+    site_levels = echelon_levels(locations, inputs.parents)
+    levels = np.array([site_levels[l] for l in locations], dtype=np.int64)
+
+    index = {key: i for i, key in enumerate(inputs.keys)}
+    parent_row = np.array([
+        index.get((product_id, parent), -1) if parent is not None else -1
+        for (product_id, _), parent in zip(inputs.keys, inputs.parents)
+    ], dtype=np.int64)
+
+    lead_time = inputs.lead_time_buckets()
+    dependent = np.zeros((n, buckets))
+    result = {
+        "projected_on_hand": np.zeros((n, buckets)),
+        "net_requirements": np.zeros((n, buckets)),
+        "planned_receipts": np.zeros((n, buckets)),
+        "planned_releases": np.zeros((n, buckets)),
+        "past_due": np.zeros(n, dtype=np.int64),
+    }
+    echelons = []
+
+    for level in range(int(levels.max()) + 1 if n else 0):
+        rows = np.flatnonzero(levels == level)
+        if not len(rows):
+            continue
+        plan = net_requirements(
+            inputs.gross[rows] + dependent[rows],
+            inputs.receipts[rows],
+            inputs.on_hand[rows],
+            safety_stock=inputs.safety_stock[rows],
+            lead_time=lead_time[rows],
+            reorder_point=None if inputs.reorder_point is None else inputs.reorder_point[rows],
+            max_stock=None if inputs.max_stock is None else inputs.max_stock[rows],
+            **lot_sizing
+        )
+        for name, values in plan.items():
+            result[name][rows] = values
+
+        upstream = parent_row[rows] >= 0
+        np.add.at(dependent, parent_row[rows][upstream], plan["planned_releases"][upstream])
+        echelons.append({
+            "echelon": level,
+            "items": int(len(rows)),
+            "locations": len({locations[r] for r in rows.tolist()}),
+            "dependent_demand": float(dependent[rows].sum()),
+            "planned_orders": int(np.count_nonzero(plan["planned_receipts"])),
+            "planned_quantity": float(plan["planned_receipts"].sum())
+        })
+        print(f"🏬 Echelon {level}: {len(rows)} items, {echelons[-1]['planned_orders']} planned orders")
+
+    result["dependent_demand"] = dependent
+    result["levels"] = levels
+    result["echelons"] = echelons
+    return result
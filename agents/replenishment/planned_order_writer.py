@@ -0,0 +1,160 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+import uuid
+
+
+PLANNED_ORDER_TYPE = 3
+PLANNED_STATUS = "planned"
+QUANTITY_DECIMALS = 0  # purchase_orders.quantity is an integer column
+
+
+def order_key(product_id, location_id) -> Tuple[str, Optional[str]]:
+    # A NULL location stays None so it binds as NULL in the uuid[] arrays
+    return str(product_id), None if location_id is None else str(location_id)
+
+
+# --------------------------------------
+# ✅ Planned Order Writer
+# --------------------------------------
+
+class PlannedOrderWriter:
+    """
+    Stages the planned orders of one replenishment run and reconciles them
+    with the company's open planned orders (order_type 3) in one pass:
+
+    - staged product-locations without an open planned order are inserted
+    - open planned orders whose quantity or dates changed are updated in place
+    - open planned orders of covered product-locations that were not staged
+      are deleted, along with duplicates left by earlier runs
+
+    Only product-locations passed to cover() are reconciled, so a segment whose
+    policy failed keeps its existing orders. Each change type is one statement
+    and nothing is committed here; re-running with the same plan writes nothing.
+    """
+
+    def __init__(self, company_id: UUID, db: AsyncSession):
+        self.company_id = company_id
+        self.db = db
+        self.staged: Dict[Tuple[str, str], dict] = {}
+        self.covered: set = set()
+        self.counts = {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": 0}
+
+    def cover(self, keys: Iterable[tuple]):
+        self.covered.update(order_key(p, l) for p, l in keys)
+
+    def add(self, product_id, location_id, quantity: float, order_date: date, delivery_date: date):
+        key = order_key(product_id, location_id)
+        self.covered.add(key)
+        quantity = round(float(quantity), QUANTITY_DECIMALS)
+        if quantity <= 0:
+            self.staged.pop(key, None)
+            return
+        self.staged[key] = {
+            "quantity": quantity,
+            "order_date": order_date,
+            "delivery_date": delivery_date
+        }
+
+    async def load_open_orders(self) -> Dict[Tuple[str, str], List[dict]]:
+        result = await self.db.execute(text("""
+            SELECT po_id, product_id, location_id, quantity, order_date, expected_delivery
+            FROM purchase_orders
+            WHERE company_id = :company_id
+              AND order_type = :order_type
+              AND status = :status
+            ORDER BY product_id, location_id, created_at DESC
+        """), {"company_id": str(self.company_id), "order_type": PLANNED_ORDER_TYPE, "status": PLANNED_STATUS})
+        existing: Dict[Tuple[str, str], List[dict]] = {}
+        for row in result.mappings().all():
+            existing.setdefault(order_key(row["product_id"], row["location_id"]), []).append(dict(row))
+        return existing
+
+    async def apply(self) -> dict:
+        # Concurrent runs for the same company reconcile one after the other
+        await self.db.execute(text("SELECT pg_advisory_xact_lock(hashtext(:lock_key))"), {
+            "lock_key": f"planned_orders:{self.company_id}"
+        })
+        existing = await self.load_open_orders()
+
+        inserts, updates, deletes = [], [], []
+        for key in self.covered:
+            orders = existing.get(key, [])
+            staged = self.staged.get(key)
+            if staged is None:
+                deletes.extend(order["po_id"] for order in orders)
+                continue
+            if not orders:
+                inserts.append((key, staged))
+                continue
+
+            current, duplicates = orders[0], orders[1:]
+            deletes.extend(order["po_id"] for order in duplicates)
+            if (
+                round(float(current["quantity"] or 0), QUANTITY_DECIMALS) == staged["quantity"]
+                and current["order_date"] == staged["order_date"]
+                and current["expected_delivery"] == staged["delivery_date"]
+            ):
+                self.counts["unchanged"] += 1
+            else:
+                updates.append((current["po_id"], staged))
+
+        if deletes:
+            await self.db.execute(text("""
+                DELETE FROM purchase_orders WHERE po_id = ANY(CAST(:po_ids AS uuid[]))
+            """), {"po_ids": [str(po_id) for po_id in deletes]})
+
+        if updates:
+            await self.db.execute(text("""
+                UPDATE purchase_orders p
+                SET quantity = u.quantity,
+                    order_date = u.order_date,
+                    expected_delivery = u.expected_delivery
+                FROM unnest(
+                    CAST(:po_ids AS uuid[]), CAST(:quantities AS numeric[]),
+                    CAST(:order_dates AS date[]), CAST(:delivery_dates AS date[])
+                ) AS u(po_id, quantity, order_date, expected_delivery)
+                WHERE p.po_id = u.po_id
+            """), {
+                "po_ids": [str(po_id) for po_id, _ in updates],
+                "quantities": [staged["quantity"] for _, staged in updates],
+                "order_dates": [staged["order_date"] for _, staged in updates],
+                "delivery_dates": [staged["delivery_date"] for _, staged in updates]
+            })
+
+        if inserts:
+            now = datetime.utcnow()
+            await self.db.execute(text("""
+                INSERT INTO purchase_orders (
+                    po_id, company_id, product_id, location_id, order_type,
+                    quantity, status, created_at, order_date, expected_delivery
+                )
+                SELECT
+                    u.po_id, CAST(:company_id AS uuid), u.product_id, u.location_id, :order_type,
+                    u.quantity, :status, :created_at, u.order_date, u.expected_delivery
+                FROM unnest(
+                    CAST(:po_ids AS uuid[]), CAST(:product_ids AS uuid[]), CAST(:location_ids AS uuid[]),
+                    CAST(:quantities AS numeric[]), CAST(:order_dates AS date[]), CAST(:delivery_dates AS date[])
+                ) AS u(po_id, product_id, location_id, quantity, order_date, expected_delivery)
+            """), {
+                "company_id": str(self.company_id),
+                "order_type": PLANNED_ORDER_TYPE,
+                "status": PLANNED_STATUS,
+                "created_at": now,
+                "po_ids": [str(uuid.uuid4()) for _ in inserts],
+                "product_ids": [product_id for (product_id, _), _ in inserts],
+                "location_ids": [location_id for (_, location_id), _ in inserts],
+                "quantities": [staged["quantity"] for _, staged in inserts],
+                "order_dates": [staged["order_date"] for _, staged in inserts],
+                "delivery_dates": [staged["delivery_date"] for _, staged in inserts]
+            })
+
+        self.counts["inserted"] += len(inserts)
+        self.counts["updated"] += len(updates)
+        self.counts["deleted"] += len(deletes)
+        return dict(self.counts)
+
+    def stats(self) -> dict:
+        return {"staged": len(self.staged), "covered": len(self.covered), **self.counts}
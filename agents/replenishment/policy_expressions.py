@@ -0,0 +1,224 @@
+import ast
+import re
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+
+# --------------------------------------
+# ✅ Policy Expressions
+# --------------------------------------
+# Blueprint triggers and action logic are parsed once per policy into a small
+# AST whitelist (numbers, variables, arithmetic, comparisons, and/or/not,
+# if-else and math functions), rewritten to NumPy calls and compiled to a code
+# object. Evaluating it with column arrays scores every product of a segment
+# in one pass.
+
+class PolicyExpressionError(ValueError):
+    pass
+
+
+FUNCTIONS = {
+    "sqrt": np.sqrt,
+    "exp": np.exp,
+    "log": np.log,
+    "log10": np.log10,
+    "ceil": np.ceil,
+    "floor": np.floor,
+    "abs": np.abs,
+    "fabs": np.abs,
+    "round": np.round,
+    "min": np.minimum,
+    "max": np.maximum,
+    "pow": np.power,
+}
+
+ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Compare, ast.BoolOp, ast.IfExp,
+    ast.Call, ast.Name, ast.Load, ast.Constant, ast.Attribute,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow,
+    ast.USub, ast.UAdd, ast.Not, ast.And, ast.Or,
+    ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Eq, ast.NotEq,
+)
+
+# Internal helpers the rewritten tree calls; not usable from policy text
+_AND, _OR, _NOT, _WHERE, _SCHEDULE = "__and", "__or", "__not", "__where", "__schedule_due"
+
+# Schedule phrases a planner writes in a trigger, and the interval they use.
+# "run on schedule every interval_days" -> interval_days;
+# "periodic review" -> review_period_days (DEFAULT_REVIEW_DAYS if not set).
+SCHEDULE_PATTERNS = [
+    (re.compile(r"\b(?:run\s+)?on\s+schedule\s+every\s+([A-Za-z_][A-Za-z0-9_]*|\d+(?:\.\d+)?)(?:\s+days?)?\b", re.I), r"{fn}(\1)"),
+    (re.compile(r"\bperiodic(?:al)?\s+review\b", re.I), r"{fn}()"),
+]
+DEFAULT_REVIEW_DAYS = 7.0
+
+
+def _rewrite_schedule(source: str) -> str:
+    for pattern, template in SCHEDULE_PATTERNS:
+        source = pattern.sub(template.format(fn=_SCHEDULE), source)
+    return source
+
+
+class _Vectorize(ast.NodeTransformer):
+    """
+    Turns Python boolean syntax into element-wise NumPy calls: `and`/`or`/`not`,
+    chained comparisons and `a if cond else b`.
+    """
+
+    def _call(self, name: str, args: list) -> ast.Call:
+        return ast.Call(func=ast.Name(id=name, ctx=ast.Load()), args=args, keywords=[])
+
+    def visit_BoolOp(self, node):
+        self.generic_visit(node)
+        name = _AND if isinstance(node.op, ast.And) else _OR
+        result = node.values[0]
+        for value in node.values[1:]:
+            result = self._call(name, [result, value])
+        return result
+
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Not):
+            return self._call(_NOT, [node.operand])
+        return node
+
+    def visit_Compare(self, node):
+        self.generic_visit(node)
+        parts, left = [], node.left
+        for op, right in zip(node.ops, node.comparators):
+            parts.append(ast.Compare(left=left, ops=[op], comparators=[right]))
+            left = right
+        result = parts[0]
+        for part in parts[1:]:
+            result = self._call(_AND, [result, part])
+        return result
+
+    def visit_IfExp(self, node):
+        self.generic_visit(node)
+        return self._call(_WHERE, [node.test, node.body, node.orelse])
+
+    def visit_Attribute(self, node):
+        # math.sqrt(...) -> sqrt(...)
+        return ast.Name(id=node.attr, ctx=ast.Load())
+
+
+class CompiledExpression:
+    def __init__(self, source: str):
+        self.source = source
+        text = _rewrite_schedule(source.strip())
+        try:
+            tree = ast.parse(text, mode="eval")
+        except SyntaxError as e:
+            raise PolicyExpressionError(f"Cannot parse '{source}': {e.msg}")
+
+        self.names: Set[str] = set()
+        for node in ast.walk(tree):
+            if not isinstance(node, ALLOWED_NODES):
+                raise PolicyExpressionError(f"'{type(node).__name__}' is not allowed in '{source}'")
+            if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float, bool)):
+                raise PolicyExpressionError(f"Only numeric constants are allowed in '{source}'")
+            if isinstance(node, ast.Attribute) and not (isinstance(node.value, ast.Name) and node.value.id == "math" and node.attr in FUNCTIONS):
+                raise PolicyExpressionError(f"Unknown function '{ast.unparse(node)}' in '{source}'")
+            if isinstance(node, ast.Call):
+                if node.keywords:
+                    raise PolicyExpressionError(f"Keyword arguments are not allowed in '{source}'")
+                func = node.func.attr if isinstance(node.func, ast.Attribute) else getattr(node.func, "id", None)
+                if func not in FUNCTIONS and func != _SCHEDULE:
+                    raise PolicyExpressionError(f"Unknown function '{func}' in '{source}'")
+            if isinstance(node, ast.Name) and node.id not in FUNCTIONS and node.id not in ("math", _SCHEDULE):
+                if node.id.startswith("__"):
+                    raise PolicyExpressionError(f"Name '{node.id}' is not allowed in '{source}'")
+                self.names.add(node.id)
+
+        self.schedule = any(isinstance(n, ast.Name) and n.id == _SCHEDULE for n in ast.walk(tree))
+        tree = ast.fix_missing_locations(_Vectorize().visit(tree))
+        self.code = compile(tree, "<policy>", "eval")
+
+    def evaluate(self, env: Dict[str, object]):
+        missing = sorted(self.names - env.keys())
+        if missing:
+            raise PolicyExpressionError(f"Unknown variable(s) {missing} in '{self.source}'")
+
+        def schedule_due(interval=None):
+            if interval is None:
+                interval = env.get("review_period_days", DEFAULT_REVIEW_DAYS)
+            # Never ordered before (NaN) counts as due
+            elapsed = np.asarray(env.get("days_since_last_order", np.nan), dtype=float)
+            return np.isnan(elapsed) | (elapsed >= interval)
+
+        namespace = {
+            "__builtins__": {},
+            **FUNCTIONS,
+            _AND: np.logical_and,
+            _OR: np.logical_or,
+            _NOT: np.logical_not,
+            _WHERE: np.where,
+            _SCHEDULE: schedule_due,
+        }
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            try:
+                return eval(self.code, namespace, env)
+            except Exception as e:  # e.g. min() of one column, comparing text to numbers
+                raise PolicyExpressionError(f"Cannot evaluate '{self.source}': {e}") from e
+
+
+class PolicyProgram:
+    """
+    One or more statements separated by ";" or new lines, each either
+    `name = expression` or a bare expression. Assigned names are visible to
+    later statements; the program's result is `result_name` if it is
+    assigned, otherwise the last bare expression.
+    """
+
+    ASSIGNMENT = re.compile(r"^\s*([A-Za-z_][A-Za-z0-9_]*)\s*=(?!=)\s*(.+)$", re.S)
+
+    def __init__(self, source: str, result_name: Optional[str] = None):
+        self.source = source
+        self.result_name = result_name
+        self.statements: List[Tuple[Optional[str], CompiledExpression]] = []
+        for statement in re.split(r"[;\n]", source or ""):
+            if not statement.strip():
+                continue
+            match = self.ASSIGNMENT.match(statement)
+            if match:
+                self.statements.append((match.group(1), CompiledExpression(match.group(2))))
+            else:
+                self.statements.append((None, CompiledExpression(statement)))
+        if not self.statements:
+            raise PolicyExpressionError("Empty policy expression")
+
+        assigned = {name for name, _ in self.statements if name}
+        if result_name and result_name not in assigned and self.statements[-1][0] is not None:
+            raise PolicyExpressionError(f"'{source}' does not assign '{result_name}'")
+        self.names = set().union(*(expr.names for _, expr in self.statements)) - assigned
+
+    def evaluate(self, env: Dict[str, object]) -> Tuple[object, Dict[str, object]]:
+        """
+        Returns (result, env extended with every assigned name).
+        """
+        env = dict(env)
+        result = None
+        for name, expression in self.statements:
+            value = expression.evaluate(env)
+            if name:
+                env[name] = value
+            result = value
+        if self.result_name and self.result_name in env:
+            result = env[self.result_name]
+        return result, env
+
+
+def compile_trigger(source: str) -> CompiledExpression:
+    return CompiledExpression(source)
+
+
+def compile_action(source: str) -> PolicyProgram:
+    return PolicyProgram(source, result_name="order_quantity")
+
+
+def as_column(value, n: int, dtype=float) -> np.ndarray:
+    """
+    Broadcast a scalar or column result to one value per product.
+    """
+    return np.broadcast_to(np.asarray(value, dtype=dtype), (n,))
@@ -2,27 +2,20 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 from uuid import UUID
 from datetime import datetime, timedelta
-import uuid
-import math
+from typing import Dict
+import numpy as np
+from agents.utility.policy_cache import PolicyCache
+from agents.replenishment.policy_expressions import as_column, compile_action, compile_trigger
+from agents.replenishment.replenishment_inputs import load_replenishment_inputs
+from agents.replenishment.planned_order_writer import PlannedOrderWriter
+from agents.replenishment.mrp import load_mrp_inputs
+from agents.replenishment.multi_echelon import plan_network
 
 
 # ----------------------------
 # ✅ Utilities
 # ----------------------------
 
-def safe_eval(expr: str, variables: dict):
-    """
-    Evaluate simple math expression safely.
-    Supports +, -, *, /, (), variables.
-    """
-    allowed_names = {k: v for k, v in variables.items() if isinstance(v, (int, float))}
-    try:
-        return eval(expr, {"__builtins__": None, "math": math}, allowed_names)
-    except Exception as e:
-        print(f"❌ Eval error: {e} in expression: {expr}")
-        return None
-
-
 def merge_policy_with_blueprint(method_name: str, blueprint: dict, user_policy: dict) -> dict:
     """
     Merge standard blueprint method with user customizations
@@ -49,72 +42,126 @@ class ReplenishmentAgent:
         self.company_id = company_id
         self.db = db
         self.blueprint = blueprint
+        self.policy_cache = PolicyCache(company_id, db, merge=self.merge_segment_policy)
+        self.policy_errors: Dict[str, str] = {}
+        self.writer = PlannedOrderWriter(company_id, db)
+        self.echelons = []
 
     async def run(self):
-        products = await self.fetch_product_data()
+        inputs = await load_replenishment_inputs(self.db, self.company_id)
+        await self.policy_cache.load()
         planned_orders = []
-
-        for product in products:
-            policy = await self.get_segment_policy(product["segment"])
-            if not policy:
+        self.policy_errors = {}
+        self.writer = PlannedOrderWriter(self.company_id, self.db)
+
+        for segment, rows in inputs.segment_slices().items():
+            try:
+                entry = self.policy_cache.get(segment)
+            except ValueError as e:  # unknown method or a PolicyExpressionError
+                self.policy_errors[segment] = str(e)
+                print(f"❌ Policy for segment '{segment}' skipped: {e}")
+                continue
+            if not entry:
                 continue
 
-            merged_policy = merge_policy_with_blueprint(
-                method_name=policy["replenishment_policy"],
-                blueprint=self.blueprint,
-                user_policy=policy["policy_parameters"]
-            )
-
-            variables = self.extract_variables(product, merged_policy["parameters"])
-
-            # Check trigger
-            if not safe_eval(merged_policy["trigger_condition"], variables):
+            policy, merged_policy = entry["policy"], entry["merged_policy"]
+            count = rows.stop - rows.start
+            try:
+                quantities, triggered = self.evaluate_policy(entry, inputs.columns(rows), count)
+            except Exception as e:  # one bad policy must not stop the other segments
+                self.policy_errors[segment] = str(e)
+                print(f"❌ Policy for segment '{segment}' skipped: {e}")
                 continue
 
-            # Evaluate action logic (supports "order_quantity = ..." too)
-            expression = merged_policy["action_logic"]
-            if "=" in expression:
-                _, rhs = expression.split("=", 1)
-                expression = rhs.strip()
-
-            qty = safe_eval(expression, variables)
-            if qty and qty > 0:
-                await self.create_planned_order(
-                    product["product_id"],
-                    product.get("location_id"),
+            self.writer.cover(inputs.keys[rows])
+            for i, qty in zip((rows.start + np.flatnonzero(triggered)).tolist(), quantities[triggered].tolist()):
+                product_id, location_id = inputs.keys[i]
+                self.create_planned_order(
+                    product_id,
+                    location_id,
                     qty,
                     policy["replenishment_policy"],
                     policy["policy_parameters"]
                 )
                 planned_orders.append({
-                    "product_id": str(product["product_id"]),
+                    "product_id": str(product_id),
                     "order_quantity": qty,
                     "reason": merged_policy["trigger_condition"]
                 })
 
-                print(f"✅ Created planned order for {product['product_id']} — Qty: {qty}")
+            print(f"✅ Segment '{segment}': {int(triggered.sum())} planned orders from {count} products")
+
+        await self.writer.apply()
+        await self.db.commit()
+        print(f"🧾 Planned orders: {self.writer.stats()}")
+        print(f"📦 Policy cache: {self.policy_cache.stats()}")
+        return planned_orders
+
+    async def run_multi_echelon(self, lot_sizing: str = "order_up_to"):
+        """
+        Plan the whole location network from product_location (reorder point,
+        safety stock, max stock, lead time) over the forecast horizon, one
+        batched netting per echelon. The next planned order of every
+        product-location, stores and DCs alike, is reconciled as a planned
+        purchase order.
+        """
+        inputs = await load_mrp_inputs(self.db, self.company_id, network=True)
+        plan = plan_network(inputs, lot_sizing=lot_sizing)
+        self.echelons = plan["echelons"]
+        self.writer = PlannedOrderWriter(self.company_id, self.db)
+        self.writer.cover(inputs.keys)
+
+        planned = plan["planned_receipts"]
+        lead_time = inputs.lead_time_buckets()
+        first = np.argmax(planned > 0, axis=1)
+        today = datetime.utcnow().date()
+        planned_orders = []
 
+        for i in np.flatnonzero(planned.any(axis=1)).tolist():
+            product_id, location_id = inputs.keys[i]
+            bucket = int(first[i])
+            quantity = float(planned[i, bucket])
+            order_date = max(inputs.buckets[max(bucket - int(lead_time[i]), 0)], today)
+            delivery_date = max(inputs.buckets[bucket], order_date + timedelta(days=int(inputs.lead_time_days[i])))
+            self.writer.add(product_id, location_id, quantity, order_date, delivery_date)
+            planned_orders.append({
+                "product_id": product_id,
+                "location_id": location_id,
+                "echelon": int(plan["levels"][i]),
+                "order_quantity": quantity,
+                "reason": f"Projected on-hand below reorder level in {inputs.buckets[bucket]}"
+            })
+
+        await self.writer.apply()
         await self.db.commit()
+        print(f"🧾 Planned orders: {self.writer.stats()}")
         return planned_orders
 
-    async def fetch_product_data(self):
-        query = text("""
-            SELECT 
-                p.product_id AS product_id,
-                p.segment,
-                p.location_id,
-                COALESCE(oh.quantity, 0) AS inventory,
-                COALESCE((
-                    SELECT SUM(s.quantity)
-                    FROM sales_orders s
-                    WHERE s.product_id = p.product_id AND s.order_date > CURRENT_DATE
-                ), 0) AS forecast_quantity
-            FROM products p
-            LEFT JOIN on_hand_inventory oh ON oh.product_id = p.product_id
-            WHERE p.company_id = :company_id
-        """)
-        result = await self.db.execute(query, {"company_id": str(self.company_id)})
-        return result.mappings().all()
+    def evaluate_policy(self, entry: dict, columns: Dict[str, np.ndarray], n: int):
+        """
+        Order quantity of every product of a segment and the mask of those that
+        get an order. The action runs first so the trigger can use the values
+        it defines (e.g. "inventory < ROP").
+        """
+        env = self.extract_variables(columns, entry["merged_policy"]["parameters"])
+        quantity, env = entry["action"].evaluate(env)
+        trigger = as_column(entry["trigger"].evaluate(env), n, dtype=bool)
+        quantity = as_column(quantity, n)
+        return quantity, trigger & np.isfinite(quantity) & (quantity > 0)
+
+    def merge_segment_policy(self, row: dict) -> dict:
+        merged_policy = merge_policy_with_blueprint(
+            method_name=row["replenishment_policy"],
+            blueprint=self.blueprint,
+            user_policy=row["policy_parameters"]
+        )
+        # Compiled once per segment; a bad expression is raised when the segment is used
+        return {
+            "policy": row,
+            "merged_policy": merged_policy,
+            "trigger": compile_trigger(merged_policy["trigger_condition"]),
+            "action": compile_action(merged_policy["action_logic"])
+        }
 
     async def get_segment_policy(self, segment_name: str):
         result = await self.db.execute(text("""
@@ -125,8 +172,12 @@ class ReplenishmentAgent:
         row = result.mappings().first()
         return row if row else None
 
-    def extract_variables(self, product_row, parameters_config):
-        values = {}
+    def extract_variables(self, columns: Dict[str, np.ndarray], parameters_config) -> dict:
+        """
+        Expression variables for a block of products: inventory / forecast
+        sourced parameters are columns, everything else a scalar default.
+        """
+        values = dict(columns)
 
         for key, param in parameters_config.items():
             if key in ["custom_trigger", "custom_action"]:
@@ -140,9 +191,9 @@ class ReplenishmentAgent:
                 default = param
 
             if source == "inventory":
-                values[key] = float(product_row.get("inventory", default))
+                values[key] = columns["inventory"]
             elif source == "forecast":
-                values[key] = float(product_row.get("forecast_quantity", default))
+                values[key] = columns["forecast_quantity"]
             else:
                 try:
                     values[key] = float(default)
@@ -152,7 +203,7 @@ class ReplenishmentAgent:
 
         return values
 
-    async def create_planned_order(self, product_id, location_id, quantity, method, policy_params):
+    def create_planned_order(self, product_id, location_id, quantity, method, policy_params):
         today = datetime.utcnow().date()
         offset_days = int(policy_params.get("lead_time_offset_days", 0))
         lead_time = int(policy_params.get("lead_time", 7))
@@ -160,23 +211,5 @@ class ReplenishmentAgent:
         order_date = today + timedelta(days=offset_days)
         delivery_date = order_date + timedelta(days=lead_time)
 
-        await self.db.execute(text("""
-            INSERT INTO purchase_orders (
-                po_id, company_id, product_id, location_id, order_type, 
-                quantity, status, created_at, order_date, expected_delivery
-            ) VALUES (
-                :id, :company_id, :product_id, :location_id, :order_type, 
-                :order_quantity, :order_status, :created_at, :order_date, :delivery_date
-            )
-        """), {
-            "id": str(uuid.uuid4()),
-            "company_id": str(self.company_id),
-            "product_id": str(product_id),
-            "location_id": str(location_id) if location_id else None,
-            "order_type": 3,
-            "order_quantity": quantity,
-            "order_status": "planned",
-            "created_at": datetime.utcnow(),
-            "order_date": order_date,
-            "delivery_date": delivery_date
-        })
+        # Staged; written when the run's writer reconciles with open planned orders
+        self.writer.add(product_id, location_id, quantity, order_date, delivery_date)
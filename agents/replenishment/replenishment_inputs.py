@@ -0,0 +1,127 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from array import array
+from typing import Dict, List
+from uuid import UUID
+import numpy as np
+
+from agents.replenishment.planned_order_writer import PLANNED_ORDER_TYPE, PLANNED_STATUS
+
+
+# --------------------------------------
+# ✅ Replenishment Inputs
+# --------------------------------------
+# One grouped pass per source table, each aggregated by (product, location)
+# before it is joined to the product master on both keys, so the cost is
+# linear in the rows scanned and stock or demand at one site never leaks into
+# another. Products without a location match rows without one (IS NOT
+# DISTINCT FROM), the same way the planned order writer keys them.
+
+class ReplenishmentInputs:
+    """
+    Policy inputs of every product-location of a company as column arrays,
+    ordered by segment so each segment is one contiguous slice.
+    """
+
+    def __init__(self, keys: List[tuple], segments: List[str], inventory: np.ndarray, forecast_quantity: np.ndarray, days_since_last_order: np.ndarray):
+        self.keys = keys
+        self.segments = segments
+        self.inventory = inventory
+        self.forecast_quantity = forecast_quantity
+        self.days_since_last_order = days_since_last_order
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def columns(self, rows=slice(None)) -> Dict[str, np.ndarray]:
+        return {
+            "inventory": self.inventory[rows],
+            "forecast_quantity": self.forecast_quantity[rows],
+            "days_since_last_order": self.days_since_last_order[rows],
+        }
+
+    def segment_slices(self) -> Dict[str, slice]:
+        slices, start = {}, 0
+        for i in range(1, len(self.segments) + 1):
+            if i == len(self.segments) or self.segments[i] != self.segments[start]:
+                slices[self.segments[start]] = slice(start, i)
+                start = i
+        return slices
+
+
+async def load_replenishment_inputs(db: AsyncSession, company_id: UUID, chunk_size: int = 10_000) -> ReplenishmentInputs:
+    """
+    On-hand stock, future order demand and days since the last purchase order
+    per product-location, streamed into a ReplenishmentInputs.
+    """
+    stmt = text("""
+        WITH items AS (
+            SELECT product_id, location_id, segment
+            FROM products
+            WHERE company_id = :company_id
+        ),
+        on_hand AS (
+            SELECT oh.product_id, oh.location_id, SUM(oh.quantity) AS quantity
+            FROM on_hand_inventory oh
+            WHERE oh.company_id = :company_id
+            GROUP BY oh.product_id, oh.location_id
+        ),
+        future_demand AS (
+            SELECT s.product_id, s.location_id, SUM(s.quantity) AS quantity
+            FROM sales_orders s
+            JOIN items i
+              ON i.product_id = s.product_id AND i.location_id IS NOT DISTINCT FROM s.location_id
+            WHERE s.order_date > CURRENT_DATE
+            GROUP BY s.product_id, s.location_id
+        ),
+        last_orders AS (
+            -- The run's own open planned orders are not placed orders
+            SELECT po.product_id, po.location_id, MAX(po.order_date) AS order_date
+            FROM purchase_orders po
+            WHERE po.company_id = :company_id
+              AND NOT (COALESCE(po.order_type, 0) = :planned_type AND po.status = :planned_status)
+            GROUP BY po.product_id, po.location_id
+        )
+        SELECT
+            i.product_id,
+            i.location_id,
+            i.segment,
+            COALESCE(oh.quantity, 0) AS inventory,
+            COALESCE(fd.quantity, 0) AS forecast_quantity,
+            CURRENT_DATE - lo.order_date AS days_since_last_order
+        FROM items i
+        LEFT JOIN on_hand oh
+          ON oh.product_id = i.product_id AND oh.location_id IS NOT DISTINCT FROM i.location_id
+        LEFT JOIN future_demand fd
+          ON fd.product_id = i.product_id AND fd.location_id IS NOT DISTINCT FROM i.location_id
+        LEFT JOIN last_orders lo
+          ON lo.product_id = i.product_id AND lo.location_id IS NOT DISTINCT FROM i.location_id
+        ORDER BY i.segment, i.product_id, i.location_id
+    """).execution_options(yield_per=chunk_size)
+    result = await db.stream(stmt, {
+        "company_id": str(company_id),
+        "planned_type": PLANNED_ORDER_TYPE,
+        "planned_status": PLANNED_STATUS
+    })
+
+    keys: List[tuple] = []
+    segments: List[str] = []
+    inventory = array("d")
+    forecast_quantity = array("d")
+    days_since_last_order = array("d")
+
+    async for rows in result.partitions():
+        for product_id, location_id, segment, on_hand, demand, days in rows:
+            keys.append((product_id, location_id))
+            segments.append(segment)
+            inventory.append(float(on_hand))
+            forecast_quantity.append(float(demand))
+            days_since_last_order.append(float("nan") if days is None else float(days))
+
+    return ReplenishmentInputs(
+        keys=keys,
+        segments=segments,
+        inventory=np.frombuffer(inventory, dtype=np.float64),
+        forecast_quantity=np.frombuffer(forecast_quantity, dtype=np.float64),
+        days_since_last_order=np.frombuffer(days_since_last_order, dtype=np.float64)
+    )
@@ -0,0 +1,73 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from typing import Any, Callable, Dict, Optional
+from uuid import UUID
+
+
+class PolicyCache:
+    """
+    Run-scoped cache of a company's segment policies.
+
+    All rows of `segment_policies` are loaded with one query and passed through
+    `merge` once per segment, so per-product lookups are plain dict reads.
+    """
+
+    def __init__(self, company_id: UUID, db: AsyncSession, merge: Callable[[dict], Any]):
+        self.company_id = company_id
+        self.db = db
+        self.merge = merge
+        self.policies: Dict[str, dict] = {}
+        self.entries: Dict[str, Any] = {}
+        self.errors: Dict[str, Exception] = {}
+        self.loaded = False
+        self.hits = 0
+        self.misses = 0
+
+    async def load(self):
+        result = await self.db.execute(text("""
+            SELECT segment_name, replenishment_policy, policy_parameters
+            FROM segment_policies
+            WHERE company_id = :company_id
+        """), {"company_id": str(self.company_id)})
+
+        for row in result.mappings().all():
+            policy = dict(row)
+            policy["policy_parameters"] = policy.get("policy_parameters") or {}
+            self.policies[policy["segment_name"]] = policy
+            try:
+                self.entries[policy["segment_name"]] = self.merge(policy)
+            except Exception as e:
+                # Surface the merge error only when a product actually uses the segment
+                self.errors[policy["segment_name"]] = e
+
+        self.loaded = True
+        return self
+
+    def get(self, segment_name: str) -> Optional[Any]:
+        if segment_name in self.errors:
+            self.misses += 1
+            raise self.errors[segment_name]
+        entry = self.entries.get(segment_name)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def get_raw(self, segment_name: str) -> dict:
+        """
+        Raw `policy_parameters` of a segment, for callers that must merge with
+        product-level overrides themselves. Counted as a miss.
+        """
+        self.misses += 1
+        policy = self.policies.get(segment_name)
+        return policy["policy_parameters"] if policy else {}
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "segments": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
@@ -0,0 +1,37 @@
+"""Add forecast_watermarks
+
+Revision ID: 7e2b4d6a8c31
+Revises: 5c1e7a9d3f20
+Create Date: 2026-10-18 10:03:17.502116
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '7e2b4d6a8c31'
+down_revision: Union[str, None] = '5c1e7a9d3f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('forecast_watermarks',
+    sa.Column('company_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('product_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('location_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('sales_watermark', sa.DateTime(), nullable=True),
+    sa.Column('sales_count', sa.Integer(), nullable=False),
+    sa.Column('policy_fingerprint', sa.String(), nullable=False),
+    sa.Column('forecast_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('company_id', 'product_id', 'location_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('forecast_watermarks')
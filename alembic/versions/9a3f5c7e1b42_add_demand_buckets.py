@@ -0,0 +1,51 @@
+"""Add demand_buckets and demand_bucket_refresh
+
+Revision ID: 9a3f5c7e1b42
+Revises: 7e2b4d6a8c31
+Create Date: 2026-10-18 10:47:52.114930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '9a3f5c7e1b42'
+down_revision: Union[str, None] = '7e2b4d6a8c31'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('demand_buckets',
+    sa.Column('company_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('product_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('location_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('period_type', sa.String(), nullable=False),
+    sa.Column('period_key', sa.String(), nullable=False),
+    sa.Column('period_start', sa.Date(), nullable=False),
+    sa.Column('quantity', sa.Numeric(), nullable=False),
+    sa.Column('order_lines', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('company_id', 'product_id', 'location_id', 'period_type', 'period_key')
+    )
+    op.create_index('idx_demand_buckets_series', 'demand_buckets', ['company_id', 'period_type', 'product_id', 'location_id', 'period_start'], unique=False)
+    op.create_table('demand_bucket_refresh',
+    sa.Column('company_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('period_type', sa.String(), nullable=False),
+    sa.Column('source_watermark', sa.DateTime(), nullable=True),
+    sa.Column('refreshed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('company_id', 'period_type')
+    )
+    op.create_index('idx_sales_orders_created_at', 'sales_orders', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_sales_orders_created_at', table_name='sales_orders')
+    op.drop_table('demand_bucket_refresh')
+    op.drop_index('idx_demand_buckets_series', table_name='demand_buckets')
+    op.drop_table('demand_buckets')
@@ -0,0 +1,29 @@
+"""Add open planned orders index
+
+Revision ID: a3c5e7f9b132
+Revises: f1b3d5e7a920
+Create Date: 2026-10-18 17:41:26.118530
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c5e7f9b132'
+down_revision: Union[str, None] = 'f1b3d5e7a920'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The planned-order writer diffs a run against the company's open planned orders
+    op.create_index('idx_purchase_orders_open_planned', 'purchase_orders', ['company_id', 'product_id', 'location_id'], unique=False, postgresql_where=sa.text("order_type = 3 AND status = 'planned'"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_purchase_orders_open_planned', table_name='purchase_orders')
@@ -0,0 +1,48 @@
+"""Add agent_jobs
+
+Revision ID: b2d4f6a8c053
+Revises: 9a3f5c7e1b42
+Create Date: 2026-10-18 13:02:41.508317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2d4f6a8c053'
+down_revision: Union[str, None] = '9a3f5c7e1b42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('agent_jobs',
+    sa.Column('job_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('company_id', postgresql.UUID(as_uuid=True), nullable=True),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('params', sa.JSON(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('progress', sa.JSON(), nullable=True),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('cancel_requested', sa.Boolean(), server_default=sa.false(), nullable=False),
+    sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('job_id')
+    )
+    op.create_index(op.f('ix_agent_jobs_company_id'), 'agent_jobs', ['company_id'], unique=False)
+    op.create_index('idx_agent_jobs_status', 'agent_jobs', ['status', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_agent_jobs_status', table_name='agent_jobs')
+    op.drop_index(op.f('ix_agent_jobs_company_id'), table_name='agent_jobs')
+    op.drop_table('agent_jobs')
@@ -0,0 +1,34 @@
+"""Add location network
+
+Revision ID: b5d7f9a1c364
+Revises: a3c5e7f9b132
+Create Date: 2026-10-18 19:02:13.640271
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5d7f9a1c364'
+down_revision: Union[str, None] = 'a3c5e7f9b132'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The location that replenishes this one (e.g. the DC feeding a store); NULL for top-level sites
+    op.add_column('locations', sa.Column('parent_location_id', postgresql.UUID(as_uuid=True), nullable=True))
+    op.create_index('idx_locations_parent_location', 'locations', ['parent_location_id'], unique=False)
+    op.create_index('idx_product_location_product_location', 'product_location', ['product_id', 'location_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_product_location_product_location', table_name='product_location')
+    op.drop_index('idx_locations_parent_location', table_name='locations')
+    op.drop_column('locations', 'parent_location_id')
@@ -0,0 +1,76 @@
+"""Add forecast_run, forecast_current and forecast.run_id
+
+Revision ID: c4e6a8b0d274
+Revises: b2d4f6a8c053
+Create Date: 2026-10-18 14:21:09.663042
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e6a8b0d274'
+down_revision: Union[str, None] = 'b2d4f6a8c053'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('forecast_run',
+    sa.Column('run_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('company_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('mode', sa.String(), nullable=False),
+    sa.Column('parent_run_id', postgresql.UUID(as_uuid=True), nullable=True),
+    sa.Column('series_forecast', sa.Integer(), nullable=True),
+    sa.Column('series_carried', sa.Integer(), nullable=True),
+    sa.Column('rows_written', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('published_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('run_id')
+    )
+    op.create_index('idx_forecast_run_company', 'forecast_run', ['company_id', 'published_at'], unique=False)
+    op.create_table('forecast_current',
+    sa.Column('company_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('run_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('published_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('company_id')
+    )
+    op.add_column('forecast', sa.Column('run_id', postgresql.UUID(as_uuid=True), nullable=True))
+
+    # Publish the latest pre-versioning row of every key as one 'legacy' run
+    # per company. Older duplicates keep run_id NULL and are never read again.
+    op.execute("""
+        INSERT INTO forecast_run (run_id, company_id, mode, created_at, published_at)
+        SELECT gen_random_uuid(), company_id, 'legacy', now(), now()
+        FROM forecast
+        GROUP BY company_id
+    """)
+    op.execute("""
+        UPDATE forecast f
+        SET run_id = r.run_id
+        FROM forecast_run r,
+             (
+                 SELECT DISTINCT ON (company_id, product_id, location_id, forecast_date) id
+                 FROM forecast
+                 ORDER BY company_id, product_id, location_id, forecast_date, created_at DESC
+             ) latest
+        WHERE r.company_id = f.company_id AND r.mode = 'legacy' AND latest.id = f.id
+    """)
+    op.execute("""
+        INSERT INTO forecast_current (company_id, run_id, published_at)
+        SELECT company_id, run_id, published_at FROM forecast_run WHERE mode = 'legacy'
+    """)
+    op.create_index('uq_forecast_run_key', 'forecast', ['run_id', 'product_id', 'location_id', 'forecast_date'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_forecast_run_key', table_name='forecast')
+    op.drop_column('forecast', 'run_id')
+    op.drop_table('forecast_current')
+    op.drop_index('idx_forecast_run_company', table_name='forecast_run')
+    op.drop_table('forecast_run')
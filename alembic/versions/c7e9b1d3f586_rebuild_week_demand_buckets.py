@@ -0,0 +1,30 @@
+"""Rebuild week demand buckets
+
+Revision ID: c7e9b1d3f586
+Revises: b5d7f9a1c364
+Create Date: 2026-10-18 21:14:52.307419
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e9b1d3f586'
+down_revision: Union[str, None] = 'b5d7f9a1c364'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Week keys now use the ISO year; drop the old buckets so the next refresh rebuilds them in full
+    op.execute("DELETE FROM demand_buckets WHERE period_type = 'week'")
+    op.execute("DELETE FROM demand_bucket_refresh WHERE period_type = 'week'")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DELETE FROM demand_buckets WHERE period_type = 'week'")
+    op.execute("DELETE FROM demand_bucket_refresh WHERE period_type = 'week'")
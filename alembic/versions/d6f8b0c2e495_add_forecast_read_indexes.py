@@ -0,0 +1,33 @@
+"""Add forecast read indexes
+
+Revision ID: d6f8b0c2e495
+Revises: c4e6a8b0d274
+Create Date: 2026-10-18 15:08:30.218774
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd6f8b0c2e495'
+down_revision: Union[str, None] = 'c4e6a8b0d274'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Keyset pages of the default projection are served by an index-only scan
+    op.create_index('idx_forecast_run_page', 'forecast', ['run_id', 'product_id', 'location_id', 'forecast_date'], unique=False, postgresql_include=['forecast_quantity', 'method'])
+    # Segment / category filters join from the product master
+    op.create_index('idx_products_company_segment', 'products', ['company_id', 'segment', 'product_id', 'location_id'], unique=False)
+    op.create_index('idx_products_company_category', 'products', ['company_id', 'category', 'product_id', 'location_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_products_company_category', table_name='products')
+    op.drop_index('idx_products_company_segment', table_name='products')
+    op.drop_index('idx_forecast_run_page', table_name='forecast')
@@ -0,0 +1,29 @@
+"""Add forecast run updated_at
+
+Revision ID: d8f0a2c4e697
+Revises: c7e9b1d3f586
+Create Date: 2026-10-18 21:32:08.914625
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8f0a2c4e697'
+down_revision: Union[str, None] = 'c7e9b1d3f586'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Bumped whenever a run's rows change after it is published (single-product rewrites)
+    op.add_column('forecast_run', sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('forecast_run', 'updated_at')
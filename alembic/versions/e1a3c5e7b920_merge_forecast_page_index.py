@@ -0,0 +1,36 @@
+"""Merge forecast page index into run key
+
+Revision ID: e1a3c5e7b920
+Revises: d8f0a2c4e697
+Create Date: 2026-10-18 21:47:36.502184
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1a3c5e7b920'
+down_revision: Union[str, None] = 'd8f0a2c4e697'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # idx_forecast_run_page had the same keys as uq_forecast_run_key; one unique
+    # index carrying the page columns serves both the upserts and index-only pages.
+    # The new index is built before the old ones go, so uniqueness always holds.
+    op.create_index('uq_forecast_run_key_covering', 'forecast', ['run_id', 'product_id', 'location_id', 'forecast_date'], unique=True, postgresql_include=['forecast_quantity', 'method'])
+    op.drop_index('idx_forecast_run_page', table_name='forecast')
+    op.drop_index('uq_forecast_run_key', table_name='forecast')
+    op.execute("ALTER INDEX uq_forecast_run_key_covering RENAME TO uq_forecast_run_key")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER INDEX uq_forecast_run_key RENAME TO uq_forecast_run_key_covering")
+    op.create_index('uq_forecast_run_key', 'forecast', ['run_id', 'product_id', 'location_id', 'forecast_date'], unique=True)
+    op.create_index('idx_forecast_run_page', 'forecast', ['run_id', 'product_id', 'location_id', 'forecast_date'], unique=False, postgresql_include=['forecast_quantity', 'method'])
+    op.drop_index('uq_forecast_run_key_covering', table_name='forecast')
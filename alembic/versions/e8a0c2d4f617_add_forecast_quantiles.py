@@ -0,0 +1,33 @@
+"""Add forecast quantiles
+
+Revision ID: e8a0c2d4f617
+Revises: d6f8b0c2e495
+Create Date: 2026-10-18 16:21:47.503118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8a0c2d4f617'
+down_revision: Union[str, None] = 'd6f8b0c2e495'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # NULL when the run was made without intervals
+    op.add_column('forecast', sa.Column('forecast_p10', sa.Numeric(), nullable=True))
+    op.add_column('forecast', sa.Column('forecast_p50', sa.Numeric(), nullable=True))
+    op.add_column('forecast', sa.Column('forecast_p90', sa.Numeric(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('forecast', 'forecast_p90')
+    op.drop_column('forecast', 'forecast_p50')
+    op.drop_column('forecast', 'forecast_p10')
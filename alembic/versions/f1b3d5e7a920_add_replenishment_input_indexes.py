@@ -0,0 +1,32 @@
+"""Add replenishment input indexes
+
+Revision ID: f1b3d5e7a920
+Revises: e8a0c2d4f617
+Create Date: 2026-10-18 17:02:11.640295
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1b3d5e7a920'
+down_revision: Union[str, None] = 'e8a0c2d4f617'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Each input of the replenishment pass is grouped by (product, location)
+    op.create_index('idx_on_hand_inventory_company_item', 'on_hand_inventory', ['company_id', 'product_id', 'location_id'], unique=False, postgresql_include=['quantity'])
+    op.create_index('idx_sales_orders_item_date', 'sales_orders', ['product_id', 'location_id', 'order_date'], unique=False, postgresql_include=['quantity'])
+    op.create_index('idx_purchase_orders_company_item', 'purchase_orders', ['company_id', 'product_id', 'location_id', 'order_date'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_purchase_orders_company_item', table_name='purchase_orders')
+    op.drop_index('idx_sales_orders_item_date', table_name='sales_orders')
+    op.drop_index('idx_on_hand_inventory_company_item', table_name='on_hand_inventory')
@@ -0,0 +1,29 @@
+"""Add demand bucket refresh source count
+
+Revision ID: f3c5e7a9b142
+Revises: e1a3c5e7b920
+Create Date: 2026-10-18 23:05:41.218930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3c5e7a9b142'
+down_revision: Union[str, None] = 'e1a3c5e7b920'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # NULL on existing rows makes the next refresh of each company a full one
+    op.add_column('demand_bucket_refresh', sa.Column('source_count', sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('demand_bucket_refresh', 'source_count')
@@ -6,6 +6,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
 from sqlalchemy import false, select, true
 from agents.replenishment.replenishment_agent import ReplenishmentAgent
+from agents.replenishment.mrp import run_mrp
 from agents.segmentation.generate_rule import parse_segmentation_prompt
 from agents.segmentation.run_segmentation import run_segmentation_rules
 from api.utils.json_parser import safe_json_parse
@@ -428,15 +429,62 @@ async def apply_segmentation_rules(
 @router.post("/replenishment/plan")
 async def run_replenishment_plan(
     company_id: UUID = Query(..., description="Company ID"),
+    mode: str = Query("policy", description="policy (segment policies) or multi_echelon (location network)"),
+    lot_sizing: str = Query("order_up_to", description="Lot sizing for multi_echelon mode"),
     db: AsyncSession = Depends(get_async_session)
 ):
     """
-    Run the replenishment agent using segmentation and policy logic.
-    Stores planned orders directly in the `po` table (order_type = 3).
+    Run the replenishment agent using segmentation and policy logic, or with
+    mode=multi_echelon plan the whole DC -> store network from product_location.
+    Reconciles the company's open planned orders (order_type = 3) in the
+    `purchase_orders` table with the new plan, so re-running is idempotent.
     """
     agent = ReplenishmentAgent(company_id=company_id, db=db, blueprint=STANDARD_REPLENISHMENT_BLUEPRINT)
-    result = await agent.run()
+    if mode == "multi_echelon":
+        try:
+            result = await agent.run_multi_echelon(lot_sizing=lot_sizing)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    elif mode == "policy":
+        result = await agent.run()
+    else:
+        raise HTTPException(status_code=400, detail=f"Unknown mode '{mode}'")
     return {
-        "message": f"{len(result)} planned orders created.",
-        "orders": result
-    }
\ No newline at end of file
+        "message": f"{len(result)} planned orders in plan.",
+        "orders": result,
+        "echelons": agent.echelons,
+        "policy_cache": agent.policy_cache.stats(),
+        "policy_errors": agent.policy_errors,
+        "planned_order_changes": agent.writer.stats()
+    }
+
+@router.post("/replenishment/mrp")
+async def run_mrp_plan(
+    company_id: UUID = Query(..., description="Company ID"),
+    lot_sizing: str = Query("lot_for_lot", description="lot_for_lot, fixed_order_quantity or periods_of_supply"),
+    order_quantity: Optional[float] = Query(None, description="Lot size for fixed_order_quantity"),
+    periods: int = Query(1, ge=1, description="Buckets covered per order for periods_of_supply"),
+    min_order: Optional[float] = Query(None, description="Minimum order quantity"),
+    multiple: Optional[float] = Query(None, description="Round order quantities up to this multiple"),
+    write: bool = Query(False, description="Replace the company's MRP rows in supply_plan"),
+    multi_echelon: bool = Query(False, description="Plan the whole location network, passing store orders up to their DCs"),
+    db: AsyncSession = Depends(get_async_session)
+):
+    """
+    Time-phased MRP netting over the current forecast horizon: gross
+    requirements, scheduled receipts and projected on-hand per bucket, with
+    lot-sized planned orders offset by lead time.
+    """
+    try:
+        return await run_mrp(
+            db, company_id,
+            lot_sizing=lot_sizing,
+            order_quantity=order_quantity,
+            periods=periods,
+            min_order=min_order,
+            multiple=multiple,
+            write=write,
+            multi_echelon=multi_echelon
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
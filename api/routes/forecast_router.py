@@ -1,12 +1,20 @@
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict
+from typing import List, Dict, Optional
+from datetime import date
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from agents.forecast.forecast_agent import ForecastingAgent, get_forecast_data
-from core.database import get_async_session
+from core.database import AsyncSessionLocal, get_async_session
+from models.standard_blueprint import StandardBlueprint
 from uuid import UUID
+import json
 
+from agents.forecast.demand_buckets import refresh_demand_buckets
+from agents.forecast import forecast_reader
+from agents.forecast.hierarchy import HIERARCHY_ATTRIBUTES, hierarchy_forecast
 from agents.forecast.forecastplanningchain import ForecastPlanningChain
 from agents.forecast.forecast_diagnostic import ForecastDiagnosticAgent
 
@@ -30,6 +38,186 @@ class ForecastDiagnosticInput(BaseModel):
     params_used: Dict
 
 
+async def load_forecasting_blueprint(agent_type: str, db: AsyncSession) -> dict:
+    result = await db.execute(
+        select(StandardBlueprint).where(StandardBlueprint.agent_type == agent_type)
+    )
+    blueprint_row = result.scalars().first()
+    return blueprint_row.blueprint_json if blueprint_row else {"methods": []}
+
+
+@router.post("/run")
+async def run_forecast(
+    company_id: UUID = Query(..., description="Company ID"),
+    mode: str = Query("inline", description="inline or sharded"),
+    workers: Optional[int] = Query(None, description="Process pool size for sharded mode"),
+    shard_size: Optional[int] = Query(None, description="Series per shard for sharded mode"),
+    incremental: bool = Query(False, description="Only re-forecast series whose sales or policy changed"),
+    intervals: Optional[bool] = Query(None, description="Also store P10 / P50 / P90 (defaults to FORECAST_INTERVALS)"),
+    db: AsyncSession = Depends(get_async_session)
+):
+    """
+    Run the forecasting agent for every product-location of the company.
+    """
+    blueprint = await load_forecasting_blueprint("forecast", db)
+    agent = ForecastingAgent(company_id=company_id, db=db, blueprint=blueprint, intervals=intervals)
+    if mode == "sharded":
+        results = await agent.run_sharded(workers=workers, shard_size=shard_size, incremental=incremental)
+    elif mode == "inline":
+        results = await agent.run(incremental=incremental)
+    else:
+        raise HTTPException(status_code=400, detail=f"Unknown forecast mode '{mode}'")
+    return {
+        "message": f"{len(results)} forecast rows created.",
+        "summary": agent.run_summary,
+        "forecasts": results,
+        "policy_cache": agent.policy_cache.stats(),
+        "shard_timings": agent.shard_timings
+    }
+
+
+@router.post("/run/stream")
+async def run_forecast_stream(
+    company_id: UUID = Query(..., description="Company ID"),
+    format: str = Query("ndjson", description="ndjson or sse"),
+    incremental: bool = Query(False, description="Only re-forecast series whose sales or policy changed"),
+    intervals: Optional[bool] = Query(None, description="Also store P10 / P50 / P90 (defaults to FORECAST_INTERVALS)")
+):
+    """
+    Run the forecasting agent and stream one record per product as it is
+    forecast, followed by a final summary record.
+    """
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail=f"Unknown stream format '{format}'")
+
+    def encode(record: dict) -> str:
+        line = json.dumps(record, default=str)
+        return f"data: {line}\n\n" if format == "sse" else line + "\n"
+
+    async def stream():
+        # The request-scoped session is closed before a streaming body runs,
+        # so the run owns its session for the whole stream.
+        async with AsyncSessionLocal() as db:
+            blueprint = await load_forecasting_blueprint("forecast", db)
+            agent = ForecastingAgent(company_id=company_id, db=db, blueprint=blueprint, intervals=intervals)
+            count = 0
+            async for record in agent.iter_run(incremental=incremental):
+                count += 1
+                yield encode(record)
+            yield encode({
+                "done": True,
+                "products": count,
+                "summary": agent.run_summary,
+                "writer": agent.writer.stats(),
+                "policy_cache": agent.policy_cache.stats()
+            })
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(stream(), media_type=media_type)
+
+
+@router.get("/forecasts")
+async def read_forecasts(
+    company_id: UUID = Query(..., description="Company ID"),
+    run_id: Optional[UUID] = Query(None, description="Forecast run; defaults to the current one"),
+    segment: Optional[str] = Query(None),
+    product_id: Optional[List[UUID]] = Query(None),
+    location_id: Optional[UUID] = Query(None),
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None),
+    columns: Optional[str] = Query(None, description="Comma-separated columns to return"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(1000, ge=1, le=forecast_reader.MAX_PAGE_SIZE),
+    format: str = Query("json", description="json (one page), csv or arrow (every page, streamed)"),
+    db: AsyncSession = Depends(get_async_session)
+):
+    """
+    Page through a company's forecast with keyset pagination, or stream the
+    whole selection as CSV / Arrow.
+    """
+    if format not in ("json", "csv", "arrow"):
+        raise HTTPException(status_code=400, detail=f"Unknown format '{format}'")
+    if format == "arrow" and forecast_reader.pa is None:
+        raise HTTPException(status_code=501, detail="Arrow output needs pyarrow installed")
+    try:
+        selected = forecast_reader.resolve_columns(columns.split(",") if columns else None)
+        resolved_run = await forecast_reader.resolve_forecast_run(db, company_id, run_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    filters = {
+        "segment": segment,
+        "product_ids": product_id,
+        "location_id": location_id,
+        "date_from": date_from,
+        "date_to": date_to
+    }
+    if resolved_run is None and format == "json":
+        return {"run_id": None, "items": [], "next_cursor": None}
+
+    if format == "json":
+        try:
+            items, next_cursor = await forecast_reader.read_forecast_page(
+                db, resolved_run, selected, cursor=cursor, limit=limit, **filters
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return {"run_id": resolved_run, "items": items, "next_cursor": next_cursor}
+
+    async def stream():
+        # Streamed bodies outlive the request-scoped session
+        async with AsyncSessionLocal() as stream_db:
+            if resolved_run is None:
+                return
+            pages = forecast_reader.iter_forecast_pages(stream_db, resolved_run, selected, page_size=limit, **filters)
+            encoder = forecast_reader.stream_csv if format == "csv" else forecast_reader.stream_arrow
+            async for chunk in encoder(pages, selected):
+                yield chunk
+
+    media_type = "text/csv" if format == "csv" else "application/vnd.apache.arrow.stream"
+    return StreamingResponse(stream(), media_type=media_type, headers={
+        "Content-Disposition": f"attachment; filename=forecast.{'csv' if format == 'csv' else 'arrows'}"
+    })
+
+
+@router.get("/hierarchy")
+async def read_hierarchy_forecast(
+    company_id: UUID = Query(..., description="Company ID"),
+    levels: str = Query(",".join(HIERARCHY_ATTRIBUTES), description="Comma-separated levels, e.g. segment,category,segment+location"),
+    reconcile: str = Query("bottom_up", description="bottom_up, top_down or ols"),
+    method: str = Query("exponential_smoothing", description="Batch method for aggregate base forecasts (top_down / ols)"),
+    db: AsyncSession = Depends(get_async_session)
+):
+    """
+    Current forecast rolled up by segment, category and location, reconciled
+    so every level adds up. Cached per forecast run.
+    """
+    try:
+        return await hierarchy_forecast(
+            db, company_id,
+            levels=[level.strip() for level in levels.split(",") if level.strip()],
+            reconcile=reconcile,
+            method=method
+        )
+    except (ValueError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/demand-buckets/refresh")
+async def refresh_buckets(
+    company_id: UUID = Query(..., description="Company ID"),
+    period_type: str = Query("month", description="week, month or fiscal"),
+    full: bool = Query(False, description="Rebuild every bucket instead of only touched ones"),
+    db: AsyncSession = Depends(get_async_session)
+):
+    try:
+        summary = await refresh_demand_buckets(db, company_id, period_type, full=full)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    await db.commit()
+    return summary
+
+
 @router.post("/planning-chain")
 async def run_forecast_planning_chain(payload: ForecastPlanningInput, db: AsyncSession = Depends(get_async_session)):
     blueprint = await load_forecasting_blueprint("forecast", db)
@@ -45,10 +233,24 @@ async def run_forecast_planning_chain(payload: ForecastPlanningInput, db: AsyncS
     return await planner.run_chain(
         product_id=payload.product_id,
         location_id=payload.location_id,
-        sales_history=sales_history,  # ✅ Now comes from DB
+        sales_history=sales_history.tolist(),  # ✅ Now comes from DB
         user_horizon=payload.forecast_horizon
     )
 
+@router.post("/classify")
+async def classify_catalog(
+    company_id: UUID = Query(..., description="Company ID"),
+    period_type: str = Query("month", description="week, month or fiscal"),
+    llm_fallback_limit: int = Query(0, description="Max ambiguous series sent to the LLM"),
+    db: AsyncSession = Depends(get_async_session)
+):
+    """
+    Recommend a forecasting method for every product-location of the company.
+    """
+    blueprint = await load_forecasting_blueprint("forecast", db)
+    planner = ForecastPlanningChain(company_id, db, blueprint)
+    return await planner.classify_catalog(period_type=period_type, llm_fallback_limit=llm_fallback_limit)
+
 @router.post("/diagnose")
 async def run_forecast_diagnosis(payload: ForecastDiagnosticInput, db: AsyncSession = Depends(get_async_session)):
     agent = ForecastDiagnosticAgent()
@@ -64,4 +266,26 @@ async def run_forecast_diagnosis(payload: ForecastDiagnosticInput, db: AsyncSess
     forecast_result = await get_forecast_data(
         db=db,
         product_id=payload.product_id,
-        location_id=pay
\ No newline at end of file
+        location_id=payload.location_id
+    )
+
+    return await agent.explain_forecast(
+        product_id=payload.product_id,
+        location_id=payload.location_id,
+        sales_history=sales_history.tolist(),
+        forecast_result=forecast_result or payload.forecast_result,
+        method_used=payload.method_used,
+        params_used=payload.params_used
+    )
+
+@router.post("/diagnose/batch")
+async def run_forecast_diagnosis_batch(payload: List[ForecastDiagnosticInput]):
+    """
+    Explain many forecasts at once, several products per LLM prompt.
+    """
+    agent = ForecastDiagnosticAgent()
+    diagnoses = await agent.explain_forecasts([item.model_dump() for item in payload])
+    return [
+        {"product_id": item.product_id, "location_id": item.location_id, **(diagnosis or {})}
+        for item, diagnosis in zip(payload, diagnoses)
+    ]
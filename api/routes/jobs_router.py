@@ -0,0 +1,55 @@
+# api/routes/jobs_router.py
+
+from typing import Any, Dict, Optional
+from uuid import UUID
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel
+
+from services.jobs import JOB_HANDLERS, JOB_STATUSES, cancel_job, create_job, get_job, list_jobs
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+class JobSubmit(BaseModel):
+    kind: str                          # e.g. "forecast.run", "replenishment.plan"
+    company_id: Optional[UUID] = None
+    params: Dict[str, Any] = {}
+
+
+@router.post("")
+async def submit_job(payload: JobSubmit):
+    """
+    Queue a long-running agent run. Poll GET /jobs/{job_id} for progress and results.
+    """
+    if payload.kind not in JOB_HANDLERS:
+        raise HTTPException(status_code=400, detail=f"Unknown job kind '{payload.kind}'. Available: {sorted(JOB_HANDLERS)}")
+    if payload.company_id is None and payload.kind != "documents.embed":
+        raise HTTPException(status_code=400, detail="company_id is required for this job kind")
+    return await create_job(payload.kind, payload.company_id, payload.params)
+
+
+@router.get("")
+async def get_jobs(
+    company_id: Optional[UUID] = Query(None, description="Company ID"),
+    status: Optional[str] = Query(None, description="queued, running, succeeded, failed or cancelled"),
+    limit: int = Query(50, le=500)
+):
+    if status and status not in JOB_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Unknown job status '{status}'")
+    return await list_jobs(company_id, status, limit)
+
+
+@router.get("/{job_id}")
+async def get_job_status(job_id: UUID):
+    job = await get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post("/{job_id}/cancel")
+async def cancel_job_run(job_id: UUID):
+    job = await cancel_job(job_id)
+    if not job:
+        raise HTTPException(status_code=409, detail="Job not found or already finished")
+    return job
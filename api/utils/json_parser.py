@@ -40,4 +40,5 @@ def safe_json_parse(raw: str, *, fallback: Any = None, verbose: bool = True) ->
     except json.JSONDecodeError as e:
         if verbose:
             print(f"[JSON Parse Error] Original failed: {e}")
-            print(f"[JSON Parse Error] Ra
\ No newline at end of file
+            print(f"[JSON Parse Error] Raw input: {raw}")
+        return fallback
@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -10,6 +11,28 @@ class Settings(BaseSettings):
     SUPABASE_API_KEY: str
     SUPABASE_SERVICE_ROLE: str
 
+    FORECAST_WRITE_BATCH_SIZE: int = 5000
+    FORECAST_WRITE_MODE: str = "insert"  # "insert" or "copy"
+    FORECAST_WORKERS: int = 0  # 0 = one per CPU
+    FORECAST_SHARD_SIZE: int = 20000
+    FORECAST_RUNS_RETAINED: int = 5  # published runs kept per company, besides the current one
+    FORECAST_INTERVALS: bool = False  # store P10 / P50 / P90 with every forecast
+    FORECAST_INTERVAL_METHOD: str = "normal"  # "normal" or "bootstrap"
+    FORECAST_INTERVAL_ORIGINS: int = 3  # holdout origins used for residuals
+
+    OPENAI_BASE_URL: Optional[str] = None  # e.g. a local fake completion server
+    LLM_MAX_CONCURRENCY: int = 16
+    LLM_TIMEOUT_SECONDS: float = 60.0
+    LLM_MAX_RETRIES: int = 3
+    LLM_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    LLM_CACHE_MAX_ENTRIES: int = 50000
+    LLM_BATCHING: bool = True  # pack many products into one prompt where supported
+    LLM_BATCH_TOKEN_BUDGET: int = 6000  # prompt + expected response tokens per batched call
+    LLM_BATCH_MAX_ITEMS: int = 25
+
+    JOB_WORKERS: int = 2
+    JOB_PROGRESS_INTERVAL_SECONDS: float = 2.0
+
 
 settings = Settings()
 
@@ -4,9 +4,11 @@ from core.database import Base, engine
 from api.routes.document_upload import router as embedding_router
 from api.routes.chat_router import router as chat_router
 from api.routes.forecast_router import router as forecast
+from api.routes.jobs_router import router as jobs_router
 from api.routes import document_upload
 from api.routes.chat_router import router as embed_router
 from models import forecasts, segmentation_rule
+from services.jobs import job_runner
 
 
 
@@ -22,6 +24,15 @@ async def startup_event():
             print("✅ Connected to async DB.")
     except Exception as e:
         print("❌ Could not connect to DB at startup:", str(e))
+        return
+
+    # Background agent jobs (also requeues jobs left running by a dead process)
+    await job_runner.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await job_runner.stop()
 
 
 
@@ -43,5 +54,6 @@ app.include_router(embedding_router, prefix="/api/v1/embeddings")
 app.include_router(chat_router)
 app.include_router(embed_router, prefix="/api/v1", tags=["Embeddings"])
 app.include_router(forecast, prefix="/forecast", tags=["Forecasting"])
+app.include_router(jobs_router)
 
 
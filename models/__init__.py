@@ -21,3 +21,8 @@ from .supply_plan import SupplyPlan
 from .table_dictionary import TableDictionary
 from .users import Users
 from .standard_blueprint import StandardBlueprint
+from .llm_response_cache import LLMResponseCacheEntry
+from .forecast_watermarks import ForecastWatermarks
+from .demand_buckets import DemandBuckets, DemandBucketRefresh
+from .agent_jobs import AgentJobs
+from .forecast_runs import ForecastRun, ForecastCurrent
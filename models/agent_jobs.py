@@ -0,0 +1,23 @@
+from sqlalchemy import Column, String, Integer, DateTime, Text, Boolean, JSON
+from sqlalchemy.dialects.postgresql import UUID
+from datetime import datetime
+import uuid
+from core.database import Base
+
+class AgentJobs(Base):
+    __tablename__ = "agent_jobs"
+
+    job_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    company_id = Column(UUID(as_uuid=True), nullable=True, index=True)
+    kind = Column(String, nullable=False)                        # e.g. "forecast.run", "replenishment.plan"
+    params = Column(JSON, nullable=False, default=dict)
+    status = Column(String, nullable=False, default="queued")    # queued, running, succeeded, failed, cancelled
+    progress = Column(JSON, nullable=True)                       # handler-defined counters
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    attempts = Column(Integer, nullable=False, default=0)         # times a worker has started the job
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, nullable=True)
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, String, Integer, BigInteger, Date, DateTime, Numeric
+from sqlalchemy.dialects.postgresql import UUID
+from core.database import Base
+
+class DemandBuckets(Base):
+    __tablename__ = "demand_buckets"
+
+    company_id = Column(UUID(as_uuid=True), primary_key=True)
+    product_id = Column(UUID(as_uuid=True), primary_key=True)
+    location_id = Column(UUID(as_uuid=True), primary_key=True)
+    period_type = Column(String, primary_key=True)  # week, month, fiscal
+    period_key = Column(String, primary_key=True)   # e.g. 2025-03, 2025-W11, FY25-P03
+    period_start = Column(Date, nullable=False)
+    quantity = Column(Numeric, nullable=False, default=0)
+    order_lines = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=True)
+
+
+class DemandBucketRefresh(Base):
+    __tablename__ = "demand_bucket_refresh"
+
+    company_id = Column(UUID(as_uuid=True), primary_key=True)
+    period_type = Column(String, primary_key=True)
+    source_watermark = Column(DateTime, nullable=True)  # max sales_orders.created_at (or order_date) already aggregated
+    source_count = Column(BigInteger, nullable=True)  # sales lines aggregated, to spot lines behind the watermark
+    refreshed_at = Column(DateTime, nullable=True)
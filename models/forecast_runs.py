@@ -0,0 +1,27 @@
+from sqlalchemy import Column, String, Integer, DateTime
+from sqlalchemy.dialects.postgresql import UUID
+from datetime import datetime
+import uuid
+from core.database import Base
+
+class ForecastRun(Base):
+    __tablename__ = "forecast_run"
+
+    run_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    company_id = Column(UUID(as_uuid=True), nullable=False)
+    mode = Column(String, nullable=False)                        # full, incremental, single, legacy
+    parent_run_id = Column(UUID(as_uuid=True), nullable=True)    # run an incremental run carried rows from
+    series_forecast = Column(Integer, nullable=True)
+    series_carried = Column(Integer, nullable=True)
+    rows_written = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    published_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, nullable=True)                 # last change to the run's rows
+
+
+class ForecastCurrent(Base):
+    __tablename__ = "forecast_current"
+
+    company_id = Column(UUID(as_uuid=True), primary_key=True)
+    run_id = Column(UUID(as_uuid=True), nullable=False)
+    published_at = Column(DateTime, nullable=False)
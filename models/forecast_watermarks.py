@@ -0,0 +1,14 @@
+from sqlalchemy import Column, String, Integer, DateTime
+from sqlalchemy.dialects.postgresql import UUID
+from core.database import Base
+
+class ForecastWatermarks(Base):
+    __tablename__ = "forecast_watermarks"
+
+    company_id = Column(UUID(as_uuid=True), primary_key=True)
+    product_id = Column(UUID(as_uuid=True), primary_key=True)
+    location_id = Column(UUID(as_uuid=True), primary_key=True)
+    sales_watermark = Column(DateTime, nullable=True)  # latest sales_orders created_at / order_date at last forecast
+    sales_count = Column(Integer, nullable=False, default=0)
+    policy_fingerprint = Column(String, nullable=False)
+    forecast_at = Column(DateTime, nullable=False)
@@ -28,10 +28,14 @@ class Forecast(Base):
     __tablename__ = "forecast"
 
     id = Column(UUID(as_uuid=True), primary_key=True)
+    run_id = Column(UUID(as_uuid=True), nullable=True)  # forecast_run; NULL for rows written before versioning
     company_id = Column(UUID(as_uuid=True), nullable=False)
     product_id = Column(UUID(as_uuid=True), nullable=False)
     location_id = Column(UUID(as_uuid=True), nullable=False)
     forecast_date = Column(Date, nullable=False)
     forecast_quantity = Column(Numeric, nullable=False)
+    forecast_p10 = Column(Numeric, nullable=True)  # prediction interval; NULL when the run had none
+    forecast_p50 = Column(Numeric, nullable=True)
+    forecast_p90 = Column(Numeric, nullable=True)
     method = Column(String, nullable=False)
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
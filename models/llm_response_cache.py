@@ -0,0 +1,12 @@
+from sqlalchemy import Column, String, DateTime, Text
+from datetime import datetime
+from core.database import Base
+
+class LLMResponseCacheEntry(Base):
+    __tablename__ = "llm_response_cache"
+
+    cache_key = Column(String(64), primary_key=True)  # sha256 of model, prompt version, history, horizon, params
+    model = Column(String, nullable=False)
+    response = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
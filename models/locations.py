@@ -10,4 +10,5 @@ class Locations(Base):
     name = Column(String, nullable=False)
     type = Column(String, nullable=True)
     region = Column(String, nullable=True)
+    parent_location_id = Column(UUID(as_uuid=True), nullable=True)
     created_at = Column(DateTime, nullable=True)
\ No newline at end of file
@@ -0,0 +1,425 @@
+# services/jobs.py
+
+import asyncio
+import json
+import time
+import traceback
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from core.database import AsyncSessionLocal
+
+
+JOB_STATUSES = ("queued", "running", "succeeded", "failed", "cancelled")
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def to_json(value) -> str:
+    # Results carry dates, UUIDs and numpy scalars; store them as plain JSON
+    return json.dumps(value, default=str)
+
+
+# --------------------------------------
+# ✅ Job Context
+# --------------------------------------
+
+class JobContext:
+    """
+    Handed to a running handler. report() records progress counters at most
+    every JOB_PROGRESS_INTERVAL_SECONDS and raises JobCancelled once a cancel
+    has been requested, from this process or any other.
+    """
+
+    def __init__(self, job_id: UUID, company_id: Optional[UUID], params: dict):
+        self.job_id = job_id
+        self.company_id = company_id
+        self.params = params
+        self.progress: dict = {}
+        self.started = time.perf_counter()
+        self.last_report = 0.0
+        self.cancel_requested = False
+
+    async def report(self, force: bool = False, **counters):
+        self.progress.update(counters)
+        now = time.perf_counter()
+        if not force and now - self.last_report < settings.JOB_PROGRESS_INTERVAL_SECONDS:
+            return
+        self.last_report = now
+        self.progress["elapsed_seconds"] = round(now - self.started, 2)
+
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(text("""
+                UPDATE agent_jobs
+                SET progress = CAST(:progress AS json), updated_at = :now
+                WHERE job_id = :job_id
+                RETURNING cancel_requested
+            """), {"job_id": str(self.job_id), "progress": to_json(self.progress), "now": datetime.utcnow()})
+            row = result.mappings().first()
+            await db.commit()
+        if row and row["cancel_requested"]:
+            self.cancel_requested = True
+            raise JobCancelled()
+
+
+# --------------------------------------
+# ✅ Handlers
+# --------------------------------------
+# Each handler gets its own session and returns a JSON-serialisable result.
+# Agent and route imports are deferred so this module stays importable from
+# the API routers without a cycle.
+
+JobHandler = Callable[[AsyncSession, JobContext], Awaitable[dict]]
+JOB_HANDLERS: Dict[str, JobHandler] = {}
+
+
+def job_handler(kind: str):
+    def register(fn: JobHandler) -> JobHandler:
+        JOB_HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+@job_handler("forecast.run")
+async def run_forecast_job(db: AsyncSession, job: JobContext) -> dict:
+    from agents.forecast.forecast_agent import ForecastingAgent
+    from api.routes.forecast_router import load_forecasting_blueprint
+
+    blueprint = await load_forecasting_blueprint("forecast", db)
+    agent = ForecastingAgent(company_id=job.company_id, db=db, blueprint=blueprint, intervals=job.params.get("intervals"))
+
+    if job.params.get("mode") == "sharded":
+        results = await agent.run_sharded(
+            workers=job.params.get("workers"),
+            shard_size=job.params.get("shard_size"),
+            incremental=job.params.get("incremental", False)
+        )
+        products = len({r["product_id"] for r in results})
+    else:
+        products = 0
+        async for _ in agent.iter_run(incremental=job.params.get("incremental", False)):
+            products += 1
+            await job.report(products_done=products, products_total=agent.run_summary.get("series_forecast"))
+
+    return {
+        "products": products,
+        "summary": agent.run_summary,
+        "writer": agent.writer.stats(),
+        "policy_cache": agent.policy_cache.stats(),
+        "shard_timings": agent.shard_timings
+    }
+
+
+@job_handler("replenishment.plan")
+async def run_replenishment_job(db: AsyncSession, job: JobContext) -> dict:
+    from agents.replenishment.replenishment_agent import ReplenishmentAgent
+    from api.routes.chat_router import STANDARD_REPLENISHMENT_BLUEPRINT
+
+    agent = ReplenishmentAgent(company_id=job.company_id, db=db, blueprint=STANDARD_REPLENISHMENT_BLUEPRINT)
+    if job.params.get("mode") == "multi_echelon":
+        orders = await agent.run_multi_echelon(lot_sizing=job.params.get("lot_sizing", "order_up_to"))
+    else:
+        orders = await agent.run()
+    return {
+        "planned_orders": len(orders),
+        "orders": orders,
+        "echelons": agent.echelons,
+        "policy_cache": agent.policy_cache.stats(),
+        "policy_errors": agent.policy_errors,
+        "planned_order_changes": agent.writer.stats()
+    }
+
+
+@job_handler("replenishment.mrp")
+async def run_mrp_job(db: AsyncSession, job: JobContext) -> dict:
+    from agents.replenishment.mrp import run_mrp
+
+    return await run_mrp(
+        db, job.company_id,
+        lot_sizing=job.params.get("lot_sizing", "lot_for_lot"),
+        order_quantity=job.params.get("order_quantity"),
+        periods=job.params.get("periods", 1),
+        min_order=job.params.get("min_order"),
+        multiple=job.params.get("multiple"),
+        write=job.params.get("write", False),
+        multi_echelon=job.params.get("multi_echelon", False)
+    )
+
+
+@job_handler("segments.refresh")
+async def run_segmentation_job(db: AsyncSession, job: JobContext) -> dict:
+    from agents.segmentation.run_segmentation import run_segmentation_rules
+
+    return {"summary": await run_segmentation_rules(job.company_id, db)}
+
+
+@job_handler("documents.embed")
+async def run_embedding_job(db: AsyncSession, job: JobContext) -> dict:
+    from services.rag.embedder import embed_all_documents_from_supabase
+
+    await embed_all_documents_from_supabase(db)
+    return {"message": "Document embeddings completed and stored."}
+
+
+# --------------------------------------
+# ✅ Job Store
+# --------------------------------------
+
+async def create_job(kind: str, company_id: Optional[UUID], params: dict) -> dict:
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind '{kind}'")
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(text("""
+            INSERT INTO agent_jobs (job_id, company_id, kind, params, status, cancel_requested, attempts, created_at, updated_at)
+            VALUES (:job_id, :company_id, :kind, CAST(:params AS json), 'queued', false, 0, :now, :now)
+            RETURNING job_id, company_id, kind, status, created_at
+        """), {
+            "job_id": str(uuid.uuid4()),
+            "company_id": str(company_id) if company_id else None,
+            "kind": kind,
+            "params": to_json(params or {}),
+            "now": datetime.utcnow()
+        })
+        job = dict(result.mappings().first())
+        await db.commit()
+    job_runner.wake()
+    return job
+
+
+async def get_job(job_id: UUID) -> Optional[dict]:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(text("""
+            SELECT job_id, company_id, kind, params, status, progress, result, error,
+                   cancel_requested, attempts, created_at, started_at, finished_at, updated_at
+            FROM agent_jobs
+            WHERE job_id = :job_id
+        """), {"job_id": str(job_id)})
+        row = result.mappings().first()
+    return dict(row) if row else None
+
+
+async def list_jobs(company_id: Optional[UUID] = None, status: Optional[str] = None, limit: int = 50) -> list:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(text("""
+            SELECT job_id, company_id, kind, status, progress, error, created_at, started_at, finished_at
+            FROM agent_jobs
+            WHERE (CAST(:company_id AS uuid) IS NULL OR company_id = CAST(:company_id AS uuid))
+              AND (CAST(:status AS text) IS NULL OR status = :status)
+            ORDER BY created_at DESC
+            LIMIT :limit
+        """), {"company_id": str(company_id) if company_id else None, "status": status, "limit": limit})
+        return [dict(r) for r in result.mappings().all()]
+
+
+async def cancel_job(job_id: UUID) -> Optional[dict]:
+    """
+    Queued jobs are cancelled immediately. Running jobs get cancel_requested;
+    the owning worker stops them at its next heartbeat or progress report, or
+    right away when they run in this process.
+    """
+    async with AsyncSessionLocal() as db:
+        now = datetime.utcnow()
+        result = await db.execute(text("""
+            UPDATE agent_jobs
+            SET cancel_requested = true,
+                status = CASE WHEN status = 'queued' THEN 'cancelled' ELSE status END,
+                finished_at = CASE WHEN status = 'queued' THEN :now ELSE finished_at END,
+                updated_at = :now
+            WHERE job_id = :job_id AND status IN ('queued', 'running')
+            RETURNING job_id, status
+        """), {"job_id": str(job_id), "now": now})
+        row = result.mappings().first()
+        await db.commit()
+
+    task = job_runner.running.get(str(job_id))
+    if task and row:
+        job_runner.cancelled.add(str(job_id))
+        task.cancel()
+    return dict(row) if row else None
+
+
+# --------------------------------------
+# ✅ Job Runner
+# --------------------------------------
+
+class JobRunner:
+    """
+    Pool of asyncio workers in the API process. Workers claim queued jobs
+    from Postgres with FOR UPDATE SKIP LOCKED, so several API instances can
+    share one queue, and run each job on its own session. Jobs interrupted
+    by stop() go back to the queue instead of being cancelled.
+    """
+
+    def __init__(self, workers: int = None, poll_seconds: float = 5.0, stale_seconds: float = 300.0):
+        self.workers = workers or settings.JOB_WORKERS
+        self.poll_seconds = poll_seconds
+        self.stale_seconds = stale_seconds
+        self.tasks: list = []
+        self.running: Dict[str, asyncio.Task] = {}
+        self.cancelled: set = set()
+        self.stopping = False
+        self.event = asyncio.Event()
+
+    def wake(self):
+        self.event.set()
+
+    async def start(self):
+        self.stopping = False
+        requeued = await self.requeue_stale_jobs()
+        if requeued:
+            print(f"🔁 Requeued {requeued} unfinished jobs")
+        self.tasks = [asyncio.create_task(self.worker(i)) for i in range(self.workers)]
+        print(f"🧵 Job runner started with {self.workers} workers")
+
+    async def stop(self):
+        self.stopping = True
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    async def requeue_stale_jobs(self) -> int:
+        """
+        Jobs left 'running' by a process that died (no heartbeat for
+        stale_seconds) go back to the queue.
+        """
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(text("""
+                UPDATE agent_jobs
+                SET status = 'queued', updated_at = :now
+                WHERE status = 'running' AND updated_at < :stale_before
+            """), {"now": datetime.utcnow(), "stale_before": datetime.utcnow() - timedelta(seconds=self.stale_seconds)})
+            await db.commit()
+        return result.rowcount
+
+    async def claim_next(self) -> Optional[dict]:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(text("""
+                UPDATE agent_jobs
+                SET status = 'running', started_at = :now, updated_at = :now, attempts = attempts + 1
+                WHERE job_id = (
+                    SELECT job_id FROM agent_jobs
+                    WHERE status = 'queued'
+                    ORDER BY created_at
+                    FOR UPDATE SKIP LOCKED
+                    LIMIT 1
+                )
+                RETURNING job_id, company_id, kind, params
+            """), {"now": datetime.utcnow()})
+            row = result.mappings().first()
+            await db.commit()
+        return dict(row) if row else None
+
+    async def worker(self, worker_id: int):
+        while True:
+            try:
+                job = await self.claim_next()
+            except Exception as e:
+                print(f"❌ Job worker {worker_id} could not claim a job: {e}")
+                job = None
+
+            if job is None:
+                self.event.clear()
+                try:
+                    await asyncio.wait_for(self.event.wait(), timeout=self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            task = asyncio.create_task(self.execute(job))
+            self.running[str(job["job_id"])] = task
+            try:
+                await asyncio.shield(task)
+            except asyncio.CancelledError:
+                if not task.done():
+                    # The worker itself is being stopped; let the job finish its cleanup
+                    task.cancel()
+                    await asyncio.gather(task, return_exceptions=True)
+                    raise
+            finally:
+                self.running.pop(str(job["job_id"]), None)
+
+    async def heartbeat(self, job_id: UUID, context: JobContext, task: asyncio.Task):
+        """
+        Keeps the job from looking stale and stops it once a cancel was
+        requested from any process, whether or not its handler reports progress.
+        """
+        while True:
+            await asyncio.sleep(min(self.stale_seconds / 3, self.poll_seconds))
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(text("""
+                    UPDATE agent_jobs SET updated_at = :now
+                    WHERE job_id = :job_id AND status = 'running'
+                    RETURNING cancel_requested
+                """), {"job_id": str(job_id), "now": datetime.utcnow()})
+                row = result.mappings().first()
+                await db.commit()
+            if row and row["cancel_requested"]:
+                context.cancel_requested = True
+                task.cancel()
+                return
+
+    async def execute(self, job: dict):
+        params = job["params"] if isinstance(job["params"], dict) else json.loads(job["params"] or "{}")
+        context = JobContext(job["job_id"], job["company_id"], params)
+        handler = JOB_HANDLERS.get(job["kind"])
+        heartbeat = asyncio.create_task(self.heartbeat(job["job_id"], context, asyncio.current_task()))
+        print(f"🚀 Job {job['job_id']} ({job['kind']}) started")
+
+        status, result, error = "succeeded", None, None
+        try:
+            if handler is None:
+                raise ValueError(f"Unknown job kind '{job['kind']}'")
+            async with AsyncSessionLocal() as db:
+                result = await handler(db, context)
+        except JobCancelled:
+            status = "cancelled"
+        except asyncio.CancelledError:
+            user_cancel = context.cancel_requested or str(job["job_id"]) in self.cancelled
+            # Shutdown: leave the job for the next worker instead of losing it
+            status = "cancelled" if user_cancel or not self.stopping else "queued"
+        except Exception as e:
+            status, error = "failed", f"{e}\n{traceback.format_exc()}"
+        finally:
+            heartbeat.cancel()
+            self.cancelled.discard(str(job["job_id"]))
+
+        context.progress["elapsed_seconds"] = round(time.perf_counter() - context.started, 2)
+        if status == "queued":
+            async with AsyncSessionLocal() as db:
+                await db.execute(text("""
+                    UPDATE agent_jobs
+                    SET status = 'queued', progress = CAST(:progress AS json), updated_at = :now
+                    WHERE job_id = :job_id AND status = 'running'
+                """), {"job_id": str(job["job_id"]), "progress": to_json(context.progress), "now": datetime.utcnow()})
+                await db.commit()
+            print(f"🔁 Job {job['job_id']} ({job['kind']}) requeued on shutdown")
+            return
+
+        async with AsyncSessionLocal() as db:
+            await db.execute(text("""
+                UPDATE agent_jobs
+                SET status = :status, result = CAST(:result AS json), error = :error,
+                    progress = CAST(:progress AS json), finished_at = :now, updated_at = :now
+                WHERE job_id = :job_id
+            """), {
+                "job_id": str(job["job_id"]),
+                "status": status,
+                "result": to_json(result) if result is not None else None,
+                "error": error,
+                "progress": to_json(context.progress),
+                "now": datetime.utcnow()
+            })
+            await db.commit()
+        print(f"🏁 Job {job['job_id']} ({job['kind']}) {status} in {context.progress['elapsed_seconds']}s")
+
+
+job_runner = JobRunner()
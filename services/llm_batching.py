@@ -0,0 +1,155 @@
+# services/llm_batching.py
+
+import asyncio
+import json
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from openai import BadRequestError
+
+from api.utils.json_parser import safe_json_parse
+from core.config import settings
+from services.llm_client import AsyncLLMClient
+
+
+# --------------------------------------
+# ✅ Token Budget
+# --------------------------------------
+# Token counts are estimated at ~4 characters per token, which is close enough
+# for packing and avoids a tokenizer dependency. Each item also reserves room
+# for its share of the response.
+
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def render_item(item: dict) -> str:
+    return json.dumps(item, separators=(",", ":"), default=str)
+
+
+def pack_batches(items: List[dict], base_tokens: int, output_tokens: int, token_budget: int = None, max_items: int = None) -> List[List[dict]]:
+    """
+    Greedily pack items into batches whose prompt plus expected output stays
+    within `token_budget`. An item too large for any batch goes out alone.
+    """
+    token_budget = token_budget or settings.LLM_BATCH_TOKEN_BUDGET
+    max_items = max_items or settings.LLM_BATCH_MAX_ITEMS
+    batches, current, used = [], [], base_tokens
+    for item in items:
+        cost = estimate_tokens(render_item(item)) + output_tokens
+        if current and (used + cost > token_budget or len(current) >= max_items):
+            batches.append(current)
+            current, used = [], base_tokens
+        current.append(item)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+# --------------------------------------
+# ✅ Batched Completions
+# --------------------------------------
+
+BATCH_INSTRUCTIONS = """
+The items are given below, one JSON object per line, each with an "id".
+Answer every item independently and return only a valid JSON array (no
+comments, no markdown) with one object per item: {{"id": <item id>, "result": <answer for that item>}}.
+
+Items:
+{items}
+"""
+
+
+def is_context_overflow(error: Exception) -> bool:
+    return isinstance(error, BadRequestError) and "context_length" in str(error)
+
+
+class BatchedPrompter:
+    """
+    Packs many items into one chat completion that repeats the instructions
+    once, and maps the returned JSON array back to the items by id.
+
+    A batch that overflows the context, or whose response cannot be parsed at
+    all (usually a truncated answer), is split in half and retried. Items
+    missing from an otherwise valid response, or whose result fails
+    `validate`, are retried on their own through `single`.
+    """
+
+    def __init__(self, llm: AsyncLLMClient, model: str, system: str, instructions: str, output_tokens: int, token_budget: int = None, max_items: int = None):
+        self.llm = llm
+        self.model = model
+        self.system = system
+        self.instructions = instructions
+        self.output_tokens = output_tokens
+        self.token_budget = token_budget
+        self.max_items = max_items
+        self.stats = {"items": 0, "calls": 0, "splits": 0, "single_retries": 0}
+
+    def build_prompt(self, batch: List[dict]) -> str:
+        return self.instructions + BATCH_INSTRUCTIONS.format(items="\n".join(render_item(item) for item in batch))
+
+    async def run(
+        self,
+        items: List[dict],
+        validate: Callable[[Any], Optional[Any]],
+        single: Optional[Callable[[dict], Awaitable[Any]]] = None
+    ) -> Dict[str, Any]:
+        """
+        items need a unique "id"; returns id -> validated result. Items that
+        still fail after their single retry (or with no `single`) are left out.
+        """
+        self.stats["items"] += len(items)
+        base_tokens = estimate_tokens(self.system + self.build_prompt([]))
+        batches = pack_batches(items, base_tokens, self.output_tokens, self.token_budget, self.max_items)
+        results: Dict[str, Any] = {}
+        failed: List[dict] = []
+        await asyncio.gather(*[self._run_batch(batch, validate, results, failed) for batch in batches])
+
+        if single is not None and failed:
+            self.stats["single_retries"] += len(failed)
+            retried = await asyncio.gather(*[single(item) for item in failed], return_exceptions=True)
+            for item, result in zip(failed, retried):
+                if not isinstance(result, Exception) and result is not None:
+                    results[str(item["id"])] = result
+        return results
+
+    async def _run_batch(self, batch: List[dict], validate, results: dict, failed: list):
+        self.stats["calls"] += 1
+        try:
+            content = await self.llm.complete(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": self.system},
+                    {"role": "user", "content": self.build_prompt(batch)}
+                ]
+            )
+            parsed = safe_json_parse(content, verbose=False)
+        except Exception as e:
+            if not is_context_overflow(e):
+                print(f"❌ Batched LLM call failed: {e}")
+                failed.extend(batch)
+                return
+            parsed = None
+
+        if not isinstance(parsed, list):
+            if len(batch) > 1:
+                self.stats["splits"] += 1
+                middle = len(batch) // 2
+                await asyncio.gather(
+                    self._run_batch(batch[:middle], validate, results, failed),
+                    self._run_batch(batch[middle:], validate, results, failed)
+                )
+            else:
+                failed.extend(batch)
+            return
+
+        answers = {str(entry.get("id")): entry.get("result") for entry in parsed if isinstance(entry, dict)}
+        for item in batch:
+            result = validate(answers.get(str(item["id"])))
+            if result is None:
+                failed.append(item)
+            else:
+                results[str(item["id"])] = result
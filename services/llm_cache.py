@@ -0,0 +1,132 @@
+# services/llm_cache.py
+
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+
+
+class LRUStore:
+    """
+    In-process LRU of cache_key -> (expires_at epoch seconds, response).
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.time():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: str, response: str, expires_at: float):
+        self.entries[key] = (expires_at, response)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+# Shared by every cache instance in this process
+memory_tier = LRUStore(settings.LLM_CACHE_MAX_ENTRIES)
+
+
+class LLMResponseCache:
+    """
+    Two-tier cache of raw LLM completions: the process-wide LRU above, backed
+    by the `llm_response_cache` table when a session is given.
+
+    The Postgres tier is only touched through prefetch() and flush(), so many
+    concurrent lookups during a fan-out never share the session.
+    """
+
+    def __init__(self, db: AsyncSession = None, ttl_seconds: int = None):
+        self.db = db
+        self.ttl_seconds = ttl_seconds or settings.LLM_CACHE_TTL_SECONDS
+        self.pending: List[dict] = []
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.from_db = set()
+
+    @staticmethod
+    def fingerprint(model: str, template_version: str, history, horizon: int, params) -> str:
+        payload = json.dumps(
+            [model, template_version, [float(x) for x in history], horizon, params],
+            sort_keys=True, default=str
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    async def prefetch(self, keys: Iterable[str]):
+        """
+        Pull unexpired rows for the given keys into the memory tier in one query.
+        """
+        missing = [key for key in set(keys) if memory_tier.get(key) is None]
+        if self.db is None or not missing:
+            return
+        result = await self.db.execute(text("""
+            SELECT cache_key, response, expires_at
+            FROM llm_response_cache
+            WHERE cache_key = ANY(:keys) AND expires_at > :now
+        """), {"keys": missing, "now": datetime.utcnow()})
+        for row in result.mappings().all():
+            expires_at = (row["expires_at"] - datetime.utcnow()).total_seconds() + time.time()
+            memory_tier.put(row["cache_key"], row["response"], expires_at)
+            self.from_db.add(row["cache_key"])
+
+    def get(self, key: str) -> Optional[str]:
+        response = memory_tier.get(key)
+        if response is None:
+            self.misses += 1
+        elif key in self.from_db:
+            self.from_db.discard(key)
+            self.db_hits += 1
+        else:
+            self.memory_hits += 1
+        return response
+
+    def put(self, key: str, response: str, model: str):
+        memory_tier.put(key, response, time.time() + self.ttl_seconds)
+        if self.db is not None:
+            now = datetime.utcnow()
+            self.pending.append({
+                "cache_key": key,
+                "model": model,
+                "response": response,
+                "created_at": now,
+                "expires_at": now + timedelta(seconds=self.ttl_seconds)
+            })
+
+    async def flush(self):
+        if self.db is None or not self.pending:
+            return
+        rows, self.pending = self.pending, []
+        await self.db.execute(text("""
+            INSERT INTO llm_response_cache (cache_key, model, response, created_at, expires_at)
+            VALUES (:cache_key, :model, :response, :created_at, :expires_at)
+            ON CONFLICT (cache_key) DO UPDATE SET
+                response = EXCLUDED.response,
+                created_at = EXCLUDED.created_at,
+                expires_at = EXCLUDED.expires_at
+        """), rows)
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.db_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.db_hits) / lookups, 4) if lookups else 0.0
+        }
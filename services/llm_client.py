@@ -0,0 +1,76 @@
+# services/llm_client.py
+
+import asyncio
+import random
+from typing import Dict, List, Optional
+
+from openai import (
+    AsyncOpenAI,
+    APIConnectionError,
+    APITimeoutError,
+    InternalServerError,
+    RateLimitError,
+)
+from core.config import settings
+
+
+RETRYABLE_ERRORS = (
+    asyncio.TimeoutError,
+    APIConnectionError,
+    APITimeoutError,
+    InternalServerError,
+    RateLimitError,
+)
+
+
+class AsyncLLMClient:
+    """
+    Async chat-completion client with bounded fan-out.
+
+    At most `max_concurrency` calls are in flight, each call is cut off after
+    `timeout` seconds, and transient failures are retried with full-jitter
+    exponential backoff. Point OPENAI_BASE_URL at a local fake server to test.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        timeout: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        base_url: Optional[str] = None,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 20.0
+    ):
+        self.client = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            base_url=base_url or settings.OPENAI_BASE_URL,
+            max_retries=0  # retries are handled here, with jitter
+        )
+        self.semaphore = asyncio.Semaphore(max_concurrency or settings.LLM_MAX_CONCURRENCY)
+        self.timeout = timeout or settings.LLM_TIMEOUT_SECONDS
+        self.max_retries = settings.LLM_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.calls = 0
+        self.retries = 0
+
+    async def complete(self, messages: List[Dict[str, str]], model: str = "gpt-4") -> str:
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self.semaphore:
+                    self.calls += 1
+                    response = await asyncio.wait_for(
+                        self.client.chat.completions.create(model=model, messages=messages),
+                        timeout=self.timeout
+                    )
+                return response.choices[0].message.content
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                self.retries += 1
+                delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+                print(f"🔁 LLM call failed ({type(e).__name__}), retry {attempt + 1} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "retries": self.retries}
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Unit tests run without a .env; settings only need placeholder values
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+for name in ("DATABASE_URL", "DATABASE_URL_ASYNC", "OPENAI_API_KEY", "SUPABASE_URL", "SUPABASE_API_KEY", "SUPABASE_SERVICE_ROLE"):
+    os.environ.setdefault(name, "test")
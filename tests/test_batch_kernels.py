@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from agents.forecast.batch_kernels import pad_series, run_batch_method
+
+
+# Per-series methods as they were before the batch kernels (ForecastingAgent.run_*)
+
+def baseline_moving_average(sales, params, horizon):
+    window = params.get("window", 4)
+    if len(sales) < window:
+        return [sum(sales) / len(sales)] * horizon
+    avg = sum(sales[-window:]) / window
+    return [avg] * horizon
+
+
+def baseline_linear_regression(sales, horizon):
+    if len(sales) < 2:
+        return [sales[-1] if sales else 0.0] * horizon
+    slope, intercept = np.polyfit(np.arange(len(sales)), np.array(sales), 1)
+    return (intercept + slope * np.arange(len(sales), len(sales) + horizon)).tolist()
+
+
+def baseline_exponential_smoothing(sales, params, horizon):
+    alpha = params.get("alpha", 0.3)
+    if not sales:
+        return [0.0] * horizon
+    forecast = sales[0]
+    for val in sales[1:]:
+        forecast = alpha * val + (1 - alpha) * forecast
+    return [forecast] * horizon
+
+
+def baseline_seasonal_decomposition(sales, params, horizon):
+    period = params.get("period", 12)
+    if len(sales) < period * 2:
+        return [sum(sales) / len(sales)] * horizon
+    seasonal_component = np.mean(sales[-period:])
+    trend = np.mean(sales[-2 * period:-period])
+    return [(trend + seasonal_component) for _ in range(horizon)]
+
+
+@pytest.fixture
+def catalog():
+    rng = np.random.default_rng(7)
+    return [rng.poisson(20, size=n).astype(float).tolist() for n in rng.integers(1, 40, size=300)]
+
+
+def batch(method, catalog, params, horizon=6):
+    matrix, lengths = pad_series([np.asarray(s) for s in catalog])
+    return run_batch_method(method, matrix, lengths, params, horizon)
+
+
+@pytest.mark.parametrize("window", [1, 3, 4, 12])
+def test_moving_average_matches_baseline(catalog, window):
+    block = batch("moving_average", catalog, {"window": window})
+    expected = [baseline_moving_average(s, {"window": window}, 6) for s in catalog]
+    np.testing.assert_allclose(block, expected)
+
+
+def test_linear_regression_matches_baseline(catalog):
+    block = batch("linear_regression", catalog, {})
+    expected = [baseline_linear_regression(s, 6) for s in catalog]
+    np.testing.assert_allclose(block, expected, rtol=1e-7, atol=1e-7)
+
+
+@pytest.mark.parametrize("alpha", [0.1, 0.3, 0.9])
+def test_exponential_smoothing_matches_baseline(catalog, alpha):
+    block = batch("exponential_smoothing", catalog, {"alpha": alpha})
+    expected = [baseline_exponential_smoothing(s, {"alpha": alpha}, 6) for s in catalog]
+    np.testing.assert_allclose(block, expected)
+
+
+@pytest.mark.parametrize("period", [3, 12])
+def test_seasonal_decomposition_matches_baseline(catalog, period):
+    block = batch("seasonal_decomposition", catalog, {"period": period})
+    expected = [baseline_seasonal_decomposition(s, {"period": period}, 6) for s in catalog]
+    np.testing.assert_allclose(block, expected)
+
+
+def test_padding_does_not_leak_between_series():
+    short, long = [5.0, 7.0], [100.0] * 30
+    block = batch("exponential_smoothing", [short, long], {"alpha": 0.5}, horizon=1)
+    assert block[0, 0] == pytest.approx(baseline_exponential_smoothing(short, {"alpha": 0.5}, 1)[0])
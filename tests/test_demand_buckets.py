@@ -0,0 +1,80 @@
+import asyncio
+import uuid
+from datetime import datetime
+
+import pytest
+
+from agents.forecast.demand_buckets import period_key_sql, refresh_demand_buckets
+
+COMPANY = uuid.uuid4()
+LAST_REFRESH = datetime(2025, 1, 1)
+
+
+class FakeResult:
+    rowcount = 3
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def mappings(self):
+        return self
+
+    def first(self):
+        return self.rows[0] if self.rows else None
+
+
+class FakeSession:
+    """Serves the stored refresh watermark and the current sales line counts."""
+
+    def __init__(self, stored_count, source_count, new_lines):
+        self.stored = {"source_watermark": LAST_REFRESH, "source_count": stored_count}
+        self.source = {"source_watermark": datetime(2025, 2, 1), "source_count": source_count, "new_lines": new_lines}
+        self.statements = []
+
+    async def execute(self, statement, params=None):
+        sql = " ".join(str(statement).split())
+        self.statements.append((sql, params))
+        if sql.startswith("SELECT source_watermark, source_count"):
+            return FakeResult([self.stored])
+        if "AS new_lines" in sql:
+            return FakeResult([self.source])
+        return FakeResult([])
+
+    def ran(self, fragment):
+        return [params for sql, params in self.statements if fragment in sql]
+
+
+def refresh(db):
+    return asyncio.run(refresh_demand_buckets(db, COMPANY))
+
+
+def test_nothing_new_is_a_no_op():
+    db = FakeSession(stored_count=10, source_count=10, new_lines=0)
+    assert refresh(db) == {"period_type": "month", "mode": "incremental", "buckets_refreshed": 0}
+    assert not db.ran("INSERT INTO demand_buckets")
+
+
+def test_new_lines_refresh_only_touched_buckets():
+    db = FakeSession(stored_count=10, source_count=12, new_lines=2)
+    assert refresh(db)["mode"] == "incremental"
+    [upsert] = db.ran("INSERT INTO demand_buckets")
+    assert upsert["since"] == LAST_REFRESH
+    assert not db.ran("DELETE FROM demand_buckets")
+    assert db.ran("INSERT INTO demand_bucket_refresh")[0]["source_count"] == 12
+
+
+@pytest.mark.parametrize("stored_count, source_count, new_lines", [
+    (10, 11, 0),   # a backdated or unstamped line behind the watermark
+    (10, 9, 0),    # a deleted line
+    (None, 10, 0), # refreshed before line counts were stored
+])
+def test_lines_behind_the_watermark_force_a_full_refresh(stored_count, source_count, new_lines):
+    db = FakeSession(stored_count, source_count, new_lines)
+    assert refresh(db)["mode"] == "full"
+    assert db.ran("DELETE FROM demand_buckets")
+    assert "since" not in db.ran("INSERT INTO demand_buckets")[0]
+
+
+def test_unknown_period_type():
+    with pytest.raises(ValueError):
+        period_key_sql("quarter")
@@ -0,0 +1,50 @@
+import asyncio
+import uuid
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+from agents.forecast.forecast_reader import decode_cursor, encode_cursor, stream_arrow
+
+COLUMNS = ["product_id", "location_id", "forecast_date", "forecast_quantity", "forecast_p10", "forecast_p90", "method"]
+
+
+def row(p10=None, p90=None):
+    return {
+        "product_id": uuid.uuid4(), "location_id": uuid.uuid4(), "forecast_date": date(2025, 1, 1),
+        "forecast_quantity": Decimal("4.5"), "forecast_p10": p10, "forecast_p90": p90, "method": "ma"
+    }
+
+
+def read_stream(pages):
+    async def source():
+        for page in pages:
+            yield page
+
+    async def collect():
+        return b"".join([chunk async for chunk in stream_arrow(source(), COLUMNS)])
+
+    return pa.ipc.open_stream(asyncio.run(collect())).read_all()
+
+
+def test_arrow_pages_keep_one_schema_when_a_page_is_all_null():
+    table = read_stream([[row(), row()], [row(Decimal("1"), Decimal("9"))]])
+    assert table.num_rows == 3
+    assert table.schema.field("forecast_p10").type == pa.float64()
+    assert table.column("forecast_p90").to_pylist() == [None, None, 9.0]
+
+
+def test_empty_arrow_result_is_a_valid_stream():
+    table = read_stream([])
+    assert table.num_rows == 0
+    assert table.schema.names == COLUMNS
+
+
+def test_cursor_round_trip():
+    r = row()
+    assert decode_cursor(encode_cursor(r)) == (str(r["product_id"]), str(r["location_id"]), r["forecast_date"])
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
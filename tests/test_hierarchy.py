@@ -0,0 +1,83 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from agents.forecast.hierarchy import Hierarchy, forecast_steps, left_align, right_align
+
+
+@pytest.fixture
+def hierarchy():
+    keys = [(f"p{i}", f"l{i % 2}") for i in range(6)]
+    attributes = {
+        "segment": np.array(["A", "A", "B", "B", "B", "C"]),
+        "category": np.array(["x", "y", "x", "y", "x", "y"]),
+        "location": np.array([location for _, location in keys]),
+    }
+    return Hierarchy(keys, attributes, ["segment", "category+location"])
+
+
+def base_forecasts(hierarchy, horizon=3, seed=11):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(1, 50, size=(hierarchy.S.shape[0], horizon))
+
+
+def test_nodes_and_aggregation(hierarchy):
+    assert hierarchy.nodes[:4] == [("total", "total"), ("segment", "A"), ("segment", "B"), ("segment", "C")]
+    assert ("category+location", "x / l0") in hierarchy.nodes
+    bottom = np.arange(1.0, 7.0)[:, None]
+    values = hierarchy.aggregate(bottom)[:, 0]
+    assert values[0] == 21.0 and values[1:4].tolist() == [3.0, 12.0, 6.0]
+    assert values[-6:].tolist() == bottom[:, 0].tolist()
+
+
+@pytest.mark.parametrize("method", ["bottom_up", "top_down", "ols"])
+def test_reconciled_forecasts_are_coherent(hierarchy, method):
+    shares = np.full(6, 1 / 6)
+    reconciled = hierarchy.reconcile(base_forecasts(hierarchy), method, shares=shares)
+    bottom = reconciled[hierarchy.n_aggregate:]
+    np.testing.assert_allclose(hierarchy.S @ bottom, reconciled)
+
+
+def test_ols_matches_the_dense_projection(hierarchy):
+    base = base_forecasts(hierarchy)
+    S = hierarchy.S.toarray()
+    expected = S @ np.linalg.solve(S.T @ S, S.T @ base)
+    np.testing.assert_allclose(hierarchy.reconcile(base, "ols"), expected)
+
+
+def test_ols_keeps_coherent_forecasts(hierarchy):
+    coherent = hierarchy.aggregate(np.random.default_rng(2).uniform(0, 9, size=(6, 2)))
+    np.testing.assert_allclose(hierarchy.reconcile(coherent, "ols"), coherent)
+
+
+def test_top_down_splits_the_total_by_shares(hierarchy):
+    base = base_forecasts(hierarchy)
+    shares = np.array([0.1, 0.2, 0.3, 0.1, 0.2, 0.1])
+    reconciled = hierarchy.reconcile(base, "top_down", shares=shares)
+    np.testing.assert_allclose(reconciled[0], base[0])
+    np.testing.assert_allclose(reconciled[hierarchy.n_aggregate:], shares[:, None] * base[0])
+    with pytest.raises(ValueError):
+        hierarchy.reconcile(base, "top_down")
+
+
+def test_unknown_attribute_and_method(hierarchy):
+    with pytest.raises(ValueError):
+        Hierarchy(hierarchy.keys, {"segment": np.array(["A"] * 6)}, ["brand"])
+    with pytest.raises(ValueError):
+        hierarchy.reconcile(base_forecasts(hierarchy), "mint")
+
+
+def test_alignment_round_trip():
+    offsets = np.array([0, 2, 5])
+    values = np.array([1.0, 2.0, 3.0, 4.0, 5.0])
+    right = right_align(offsets, values, np.array([0, 1, -1]), 4)
+    assert right.tolist() == [[0, 0, 1, 2], [0, 3, 4, 5], [0, 0, 0, 0]]
+    assert left_align(right, np.array([2, 3, 0])).tolist() == [[1, 2, 0, 0], [3, 4, 5, 0], [0, 0, 0, 0]]
+
+
+def test_forecast_steps_follow_the_run_dates():
+    starts = [date(2025, m, 1) for m in range(1, 13)]
+    dates = [date(2025, 3, 1), date(2025, 4, 1), date(2025, 5, 1), date(2025, 8, 1)]
+    assert forecast_steps(starts, date(2025, 3, 1), dates).tolist() == [0, 1, 2, 5]
+    assert forecast_steps(starts, None, dates).tolist() == [0, 0, 0, 0]
@@ -0,0 +1,70 @@
+import numpy as np
+
+from agents.forecast.batch_kernels import (
+    HOLT_WINTERS_GRID,
+    _holt_winters_fit,
+    batch_exponential_smoothing,
+    batch_holt_winters,
+    pad_series,
+)
+
+
+def reference_additive(series, period, alpha, beta, gamma, horizon):
+    """Textbook additive Holt-Winters on one series, same initialisation as the kernel."""
+    y = list(series)
+    level = sum(y[:period]) / period
+    trend = (sum(y[period:2 * period]) / period - level) / period
+    season = [v - level for v in y[:period]]
+    for t in range(period, len(y)):
+        s = season[t % period]
+        new_level = alpha * (y[t] - s) + (1 - alpha) * (level + trend)
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        season[t % period] = gamma * (y[t] - new_level) + (1 - gamma) * s
+        level = new_level
+    return [max(level + trend * h + season[(len(y) + h - 1) % period], 0.0) for h in range(1, horizon + 1)]
+
+
+def seasonal_series(n, lengths, period=4, seed=5):
+    rng = np.random.default_rng(seed)
+    pattern = np.array([10.0, 30.0, 20.0, 5.0])[:period]
+    return [
+        (50 + 0.5 * np.arange(length) + np.resize(pattern, length) + rng.normal(0, 2, size=length)).tolist()
+        for length in rng.choice(lengths, size=n)
+    ]
+
+
+def test_additive_matches_scalar_reference():
+    series = seasonal_series(40, [8, 11, 16, 23])
+    matrix, lengths = pad_series(series)
+    block = batch_holt_winters(matrix, lengths, 4, 6, alpha=0.4, beta=0.1, gamma=0.3)
+    expected = [reference_additive(s, 4, 0.4, 0.1, 0.3, 6) for s in series]
+    np.testing.assert_allclose(block, expected, rtol=1e-9, atol=1e-9)
+
+
+def test_grid_search_picks_the_lowest_in_sample_error_per_series():
+    series = seasonal_series(25, [12, 20])
+    matrix, lengths = pad_series(series)
+    block = batch_holt_winters(matrix, lengths, 4, 3, optimize=True)
+
+    for i in range(len(series)):
+        row, length = matrix[i:i + 1].copy(), lengths[i:i + 1]
+        fits = [
+            _holt_winters_fit(row.copy(), length, 4, a, b, g, 3, False)
+            for a in HOLT_WINTERS_GRID["alpha"] for b in HOLT_WINTERS_GRID["beta"] for g in HOLT_WINTERS_GRID["gamma"]
+        ]
+        best = min(fits, key=lambda fit: fit[1][0])
+        np.testing.assert_allclose(block[i], best[0][0])
+
+
+def test_repeating_pattern_is_forecast_exactly():
+    pattern = [10.0, 40.0, 25.0, 5.0]
+    matrix, lengths = pad_series([pattern * 4])
+    for seasonal in ("additive", "multiplicative"):
+        block = batch_holt_winters(matrix, lengths, 4, 8, seasonal=seasonal, optimize=True)
+        np.testing.assert_allclose(block[0], pattern * 2, atol=1e-9)
+
+
+def test_short_series_fall_back_to_exponential_smoothing():
+    matrix, lengths = pad_series([[3.0, 5.0, 4.0], [1.0] * 7])
+    block = batch_holt_winters(matrix, lengths, 4, 2, alpha=0.3)
+    np.testing.assert_allclose(block, batch_exponential_smoothing(matrix, lengths, 0.3, 2))
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from agents.forecast.batch_kernels import pad_series, run_batch_method
+
+
+def forecast(method, series, horizon=3, **params):
+    matrix, lengths = pad_series([np.asarray(s, dtype=float) for s in series])
+    return run_batch_method(method, matrix, lengths, params, horizon)
+
+
+def test_croston_is_demand_size_over_interval():
+    block = forecast("croston", [[0, 0, 6, 0, 0, 6, 0, 0, 6]], alpha=0.2)
+    np.testing.assert_allclose(block[0], [2.0] * 3)
+
+
+def test_sba_applies_the_bias_correction():
+    series = [[0, 4, 0, 0, 9, 0, 2, 0, 0, 0, 7]]
+    croston = forecast("croston", series, alpha=0.3)
+    np.testing.assert_allclose(forecast("sba", series, alpha=0.3), croston * (1 - 0.3 / 2))
+
+
+def test_croston_ignores_trailing_zeros_but_tsb_decays_to_zero():
+    selling = [5, 0, 5, 0, 5, 0]
+    stopped = selling + [0] * 60
+    assert forecast("croston", [stopped])[0, 0] == pytest.approx(forecast("croston", [selling])[0, 0])
+    tsb_selling, tsb_stopped = forecast("tsb", [selling, stopped], alpha=0.2, beta=0.2)[:, 0]
+    assert tsb_selling > 1.0
+    assert tsb_stopped < 1e-4
+
+
+@pytest.mark.parametrize("method", ["croston", "sba", "tsb"])
+def test_no_demand_forecasts_zero_and_rows_are_independent(method):
+    block = forecast(method, [[0, 0, 0, 0], [3, 0, 3], [0] * 12])
+    assert block[0].tolist() == block[2].tolist() == [0.0] * 3
+    alone = forecast(method, [[3, 0, 3]])
+    np.testing.assert_allclose(block[1], alone[0])
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from agents.forecast.batch_kernels import pad_series, run_batch_method
+from agents.forecast.intervals import Z_90, holdout_residuals, prediction_intervals
+
+
+@pytest.fixture
+def batch():
+    rng = np.random.default_rng(9)
+    series = [rng.poisson(30, size=n).astype(float) for n in rng.integers(1, 25, size=80)]
+    matrix, lengths = pad_series(series)
+    return matrix, lengths, run_batch_method("moving_average", matrix, lengths, {"window": 3}, 5)
+
+
+@pytest.mark.parametrize("interval_method", ["normal", "bootstrap"])
+def test_quantiles_are_ordered(batch, interval_method):
+    matrix, lengths, point = batch
+    p10, p50, p90 = prediction_intervals("moving_average", matrix, lengths, {"window": 3}, point, interval_method=interval_method)
+    assert p10.shape == p50.shape == p90.shape == point.shape
+    assert (p10 <= p50).all() and (p50 <= p90).all() and (p10 >= 0).all()
+
+
+def test_normal_p50_is_the_point_forecast_and_spread_grows_with_sqrt_h(batch):
+    matrix, lengths, point = batch
+    p10, p50, p90 = prediction_intervals("moving_average", matrix, lengths, {"window": 3}, point)
+    np.testing.assert_allclose(p50, point)
+    wide = p10[:, -1] > 0  # not clipped at zero
+    upper = p90 - point
+    np.testing.assert_allclose(upper[wide, 4], upper[wide, 0] * np.sqrt(5))
+
+
+def test_residuals_come_from_one_step_holdout_forecasts():
+    matrix, lengths = pad_series([[10.0, 20.0, 30.0, 40.0, 50.0], [5.0, 6.0]])
+    residuals = holdout_residuals("moving_average", matrix, lengths, {"window": 2}, origins=2)
+    assert residuals[0].tolist() == [50 - 35, 40 - 25]
+    assert np.isnan(residuals[1]).all()
+
+
+def test_series_without_residuals_use_their_history_spread():
+    matrix, lengths = pad_series([[4.0, 8.0]])
+    point = np.array([[6.0]])
+    p10, _, p90 = prediction_intervals("moving_average", matrix, lengths, {"window": 2}, point)
+    assert p90[0, 0] == pytest.approx(6.0 + Z_90 * 2.0)
+    assert p10[0, 0] == pytest.approx(6.0 - Z_90 * 2.0)
+
+
+def test_unknown_interval_method(batch):
+    matrix, lengths, point = batch
+    with pytest.raises(ValueError):
+        prediction_intervals("moving_average", matrix, lengths, {}, point, interval_method="quantile_forest")
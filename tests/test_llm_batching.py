@@ -0,0 +1,79 @@
+import asyncio
+import json
+import uuid
+
+from agents.forecast.forecast_agent import ForecastingAgent
+from services.llm_batching import BatchedPrompter, estimate_tokens, pack_batches, render_item
+
+
+class FakeLLM:
+    """Answers every item with its id doubled; truncates replies over `max_items`."""
+
+    def __init__(self, max_items=4, drop=(), invalid=()):
+        self.max_items = max_items
+        self.drop = set(drop)
+        self.invalid = set(invalid)
+        self.batch_sizes = []
+
+    async def complete(self, model, messages):
+        items = [json.loads(line) for line in messages[-1]["content"].split("Items:\n")[1].strip().splitlines()]
+        self.batch_sizes.append(len(items))
+        if len(items) > self.max_items:
+            return '[{"id": "0", "result": [1,'
+        return json.dumps([
+            {"id": item["id"], "result": "oops" if item["id"] in self.invalid else [int(item["id"]) * 2]}
+            for item in items if item["id"] not in self.drop
+        ])
+
+
+def valid(result):
+    return result if isinstance(result, list) else None
+
+
+def run(llm, items, single=None, max_items=100):
+    prompter = BatchedPrompter(llm, "gpt-4", system="s", instructions="Forecast.", output_tokens=8, max_items=max_items)
+    return asyncio.run(prompter.run(items, validate=valid, single=single)), prompter.stats
+
+
+def items(n):
+    return [{"id": str(i), "sales_history": [i, i + 1]} for i in range(n)]
+
+
+def test_pack_batches_respects_budget_and_item_limit():
+    batch_items = items(10)
+    cost = estimate_tokens(render_item(batch_items[0])) + 5
+    batches = pack_batches(batch_items, base_tokens=10, output_tokens=5, token_budget=10 + 3 * cost, max_items=100)
+    assert [len(b) for b in batches] == [3, 3, 3, 1]
+    assert [len(b) for b in pack_batches(batch_items, 10, 5, token_budget=10_000, max_items=4)] == [4, 4, 2]
+
+
+def test_malformed_reply_is_split_and_retried():
+    llm = FakeLLM(max_items=4)
+    results, stats = run(llm, items(10))
+    assert results == {str(i): [i * 2] for i in range(10)}
+    assert llm.batch_sizes[0] == 10 and max(llm.batch_sizes[1:]) <= 5
+    assert stats["splits"] >= 1
+
+
+def test_missing_or_invalid_items_are_retried_alone():
+    retried = []
+
+    async def single(item):
+        retried.append(item["id"])
+        return ["single"]
+
+    results, stats = run(FakeLLM(max_items=10, drop={"1"}, invalid={"3"}), items(5), single=single)
+    assert sorted(retried) == ["1", "3"]
+    assert results["1"] == results["3"] == ["single"] and results["4"] == [8]
+    assert stats == {"items": 5, "calls": 1, "splits": 0, "single_retries": 2}
+
+
+def test_items_left_out_without_a_single_retry():
+    results, _ = run(FakeLLM(drop={"2"}), items(3))
+    assert set(results) == {"0", "1"}
+
+
+def test_batched_answers_have_their_own_cache_key():
+    agent = ForecastingAgent(uuid.uuid4(), None, {}, llm=FakeLLM())
+    single = agent.llm_cache_key("llm", [1.0, 2.0], {}, 3)
+    assert agent.llm_cache_key("llm", [1.0, 2.0], {}, 3, batched=True) != single
@@ -0,0 +1,101 @@
+import asyncio
+import uuid
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+import services.llm_cache as llm_cache
+from agents.forecast.forecast_agent import ForecastingAgent
+from services.llm_cache import LLMResponseCache, LRUStore
+
+
+@pytest.fixture(autouse=True)
+def empty_memory_tier():
+    llm_cache.memory_tier.entries.clear()
+    yield
+    llm_cache.memory_tier.entries.clear()
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def mappings(self):
+        return self
+
+    def all(self):
+        return self.rows
+
+
+class FakeSession:
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+        self.queries = 0
+        self.written = []
+
+    async def execute(self, statement, params=None):
+        if str(statement).strip().startswith("INSERT"):
+            self.written.extend(params)
+            return FakeResult([])
+        self.queries += 1
+        return FakeResult([row for row in self.rows if row["cache_key"] in params["keys"]])
+
+
+class FakeLLM:
+    def __init__(self):
+        self.calls = 0
+
+    async def complete(self, model, messages):
+        self.calls += 1
+        return "[1, 2, 3]"
+
+    def stats(self):
+        return {"calls": self.calls}
+
+
+def test_lru_evicts_least_recently_used_and_expired():
+    store = LRUStore(max_entries=2)
+    store.put("a", "1", time.time() + 60)
+    store.put("b", "2", time.time() + 60)
+    store.get("a")
+    store.put("c", "3", time.time() + 60)
+    assert store.get("b") is None and store.get("a") == "1"
+    store.put("old", "4", time.time() - 1)
+    assert store.get("old") is None
+
+
+def test_fingerprint_depends_on_history_and_version():
+    key = LLMResponseCache.fingerprint("gpt-4", "v1", [1, 2], 3, {"a": 1})
+    assert key == LLMResponseCache.fingerprint("gpt-4", "v1", [1.0, 2.0], 3, {"a": 1})
+    assert key != LLMResponseCache.fingerprint("gpt-4", "v2", [1, 2], 3, {"a": 1})
+    assert key != LLMResponseCache.fingerprint("gpt-4", "v1", [1, 3], 3, {"a": 1})
+
+
+def test_memory_hit_skips_the_client():
+    llm = FakeLLM()
+    agent = ForecastingAgent(uuid.uuid4(), None, {}, llm=llm, llm_cache=LLMResponseCache())
+    messages = [{"role": "user", "content": "forecast"}]
+
+    first = asyncio.run(agent.cached_completion("key", "gpt-4", messages))
+    second = asyncio.run(agent.cached_completion("key", "gpt-4", messages))
+
+    assert first == second == [1, 2, 3]
+    assert llm.calls == 1
+    assert agent.llm_cache.stats()["memory_hits"] == 1
+
+
+def test_postgres_tier_is_prefetched_once_and_written_on_flush():
+    db = FakeSession([{"cache_key": "stored", "response": "[4]", "expires_at": datetime.utcnow() + timedelta(hours=1)}])
+    cache = LLMResponseCache(db)
+
+    asyncio.run(cache.prefetch(["stored", "missing", "stored"]))
+    assert db.queries == 1
+    assert cache.get("stored") == "[4]" and cache.get("missing") is None
+    assert cache.stats()["db_hits"] == 1 and cache.stats()["misses"] == 1
+
+    cache.put("missing", "[5]", "gpt-4")
+    asyncio.run(cache.flush())
+    assert [row["cache_key"] for row in db.written] == ["missing"]
+    asyncio.run(cache.prefetch(["stored", "missing"]))
+    assert db.queries == 1  # both now served by the memory tier
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from agents.replenishment.mrp import net_requirements
+
+
+def one(gross, receipts=None, on_hand=0.0, **kwargs):
+    gross = np.array([gross], dtype=float)
+    receipts = np.zeros_like(gross) if receipts is None else np.array([receipts], dtype=float)
+    plan = net_requirements(gross, receipts, np.array([on_hand]), **kwargs)
+    return {name: values[0] for name, values in plan.items()}
+
+
+def test_lot_for_lot_covers_net_requirements():
+    plan = one([10, 10, 10, 10], receipts=[0, 5, 0, 0], on_hand=15)
+    assert plan["planned_receipts"].tolist() == [0, 0, 10, 10]
+    assert plan["projected_on_hand"].tolist() == [5, 0, 0, 0]
+
+
+def test_safety_stock_and_lead_time_offset():
+    plan = one([10, 10, 10], on_hand=20, safety_stock=5, lead_time=1)
+    assert plan["planned_receipts"].tolist() == [0, 5, 10]
+    assert plan["planned_releases"].tolist() == [5, 10, 0]
+    assert plan["past_due"] == 0
+
+
+def test_release_before_horizon_is_past_due():
+    plan = one([10, 10], lead_time=2)
+    assert plan["planned_releases"].tolist() == [20, 0]
+    assert plan["past_due"] == 2
+
+
+def test_fixed_order_quantity_and_multiple():
+    assert one([7, 7, 7], lot_sizing="fixed_order_quantity", order_quantity=10)["planned_receipts"].tolist() == [10, 10, 10]
+    assert one([7, 7, 7], multiple=5)["planned_receipts"].tolist() == [10, 5, 10]
+
+
+def test_periods_of_supply_covers_following_buckets():
+    plan = one([4, 4, 4, 4], lot_sizing="periods_of_supply", periods=2)
+    assert plan["planned_receipts"].tolist() == [8, 0, 8, 0]
+
+
+def test_order_up_to_refills_to_max_stock():
+    plan = one([10, 10, 10], on_hand=12, reorder_point=5, max_stock=20, lot_sizing="order_up_to")
+    assert plan["planned_receipts"].tolist() == [18, 0, 20]
+    assert plan["projected_on_hand"].tolist() == [20, 10, 20]
+
+
+def test_unknown_lot_sizing_rule():
+    with pytest.raises(ValueError):
+        one([1], lot_sizing="economic")
+
+
+def test_rows_are_netted_independently():
+    gross = np.array([[5, 5], [0, 8]], dtype=float)
+    plan = net_requirements(gross, np.zeros_like(gross), np.array([0.0, 10.0]))
+    assert plan["planned_receipts"].tolist() == [[5, 5], [0, 0]]
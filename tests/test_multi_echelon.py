@@ -0,0 +1,34 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from agents.replenishment.mrp import MrpInputs
+from agents.replenishment.multi_echelon import echelon_levels, plan_network
+
+
+def test_echelon_levels_and_cycle():
+    assert echelon_levels(["store", "dc"], ["dc", "central"]) == {"store": 0, "dc": 1, "central": 2}
+    with pytest.raises(ValueError):
+        echelon_levels(["a", "b"], ["b", "a"])
+
+
+def test_plan_network_passes_releases_up_as_dependent_demand():
+    buckets = [date(2025, 1, 1), date(2025, 1, 8), date(2025, 1, 15)]
+    inputs = MrpInputs(
+        keys=[("p", "store_a"), ("p", "store_b"), ("p", "dc")],
+        buckets=buckets,
+        gross=np.array([[0, 10, 0], [0, 0, 6], [0, 0, 0]], dtype=float),
+        receipts=np.zeros((3, 3)),
+        on_hand=np.zeros(3),
+        safety_stock=np.zeros(3),
+        lead_time_days=np.array([7.0, 7.0, 0.0]),
+        parents=["dc", "dc", None],
+    )
+
+    plan = plan_network(inputs)
+
+    assert plan["levels"].tolist() == [0, 0, 1]
+    assert plan["dependent_demand"][2].tolist() == [10, 6, 0]
+    assert plan["planned_receipts"][2].tolist() == [10, 6, 0]
+    assert [e["echelon"] for e in plan["echelons"]] == [0, 1]
@@ -0,0 +1,116 @@
+import asyncio
+import uuid
+from datetime import date
+
+from agents.replenishment.planned_order_writer import PlannedOrderWriter
+
+COMPANY = uuid.uuid4()
+JAN, FEB, MAR = date(2025, 1, 1), date(2025, 2, 1), date(2025, 3, 1)
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def mappings(self):
+        return self
+
+    def all(self):
+        return self.rows
+
+
+class FakeSession:
+    """Records the statements the writer runs; serves the open planned orders."""
+
+    def __init__(self, open_orders):
+        self.open_orders = open_orders
+        self.statements = []
+
+    async def execute(self, statement, params=None):
+        sql = " ".join(str(statement).split())
+        self.statements.append((sql, params))
+        if sql.startswith("SELECT po_id"):
+            return FakeResult(self.open_orders)
+        return FakeResult([])
+
+    def writes(self, verb):
+        return [params for sql, params in self.statements if sql.startswith(verb)]
+
+
+def order(product_id, location_id, quantity, order_date=JAN, delivery=FEB):
+    return {
+        "po_id": uuid.uuid4(), "product_id": product_id, "location_id": location_id,
+        "quantity": quantity, "order_date": order_date, "expected_delivery": delivery
+    }
+
+
+def apply(writer):
+    return asyncio.run(writer.apply())
+
+
+def test_inserts_updates_and_deletes_in_one_pass():
+    p1, p2, p3, loc = uuid.uuid4(), uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    changed, dropped = order(p2, loc, 10), order(p3, loc, 5)
+    db = FakeSession([changed, dropped])
+    writer = PlannedOrderWriter(COMPANY, db)
+    writer.add(p1, loc, 7, JAN, FEB)
+    writer.add(p2, loc, 12, JAN, MAR)
+    writer.cover([(p3, loc)])
+
+    counts = apply(writer)
+
+    assert counts == {"inserted": 1, "updated": 1, "deleted": 1, "unchanged": 0}
+    [insert] = db.writes("INSERT")
+    assert insert["product_ids"] == [str(p1)] and insert["quantities"] == [7]
+    [update] = db.writes("UPDATE")
+    assert update["po_ids"] == [str(changed["po_id"])] and update["delivery_dates"] == [MAR]
+    [delete] = db.writes("DELETE")
+    assert delete["po_ids"] == [str(dropped["po_id"])]
+
+
+def test_rerunning_the_same_plan_writes_nothing():
+    product, loc = uuid.uuid4(), uuid.uuid4()
+    db = FakeSession([order(product, loc, 7.0)])
+    writer = PlannedOrderWriter(COMPANY, db)
+    writer.add(product, loc, 7.2, JAN, FEB)
+
+    counts = apply(writer)
+
+    assert counts["unchanged"] == 1
+    assert not db.writes("INSERT") and not db.writes("UPDATE") and not db.writes("DELETE")
+
+
+def test_duplicates_are_deleted_and_latest_kept():
+    product, loc = uuid.uuid4(), uuid.uuid4()
+    latest, older = order(product, loc, 7), order(product, loc, 3)
+    db = FakeSession([latest, older])
+    writer = PlannedOrderWriter(COMPANY, db)
+    writer.add(product, loc, 7, JAN, FEB)
+
+    counts = apply(writer)
+
+    assert counts["unchanged"] == 1 and counts["deleted"] == 1
+    assert db.writes("DELETE")[0]["po_ids"] == [str(older["po_id"])]
+
+
+def test_uncovered_orders_are_left_alone():
+    covered, untouched, loc = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    db = FakeSession([order(covered, loc, 4), order(untouched, loc, 9)])
+    writer = PlannedOrderWriter(COMPANY, db)
+    writer.add(covered, loc, 0, JAN, FEB)
+
+    counts = apply(writer)
+
+    assert counts["deleted"] == 1
+    assert len(db.writes("DELETE")[0]["po_ids"]) == 1
+
+
+def test_null_location_matches_open_order():
+    product = uuid.uuid4()
+    db = FakeSession([order(product, None, 5)])
+    writer = PlannedOrderWriter(COMPANY, db)
+    writer.add(str(product), None, 5, JAN, FEB)
+
+    counts = apply(writer)
+
+    assert counts == {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": 1}
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from agents.replenishment.policy_expressions import (
+    PolicyExpressionError,
+    compile_action,
+    compile_trigger,
+)
+
+
+@pytest.mark.parametrize("source", [
+    "__import__('os').system('true')",
+    "open('/etc/passwd')",
+    "stock.__class__",
+    "().__class__.__bases__",
+    "[x for x in stock]",
+    "lambda: 1",
+    "'text' == 'text'",
+    "max(stock, initial=0)",
+    "math.system(1)",
+    "__and(stock, 1)",
+    "stock[0]",
+    "stock +",
+])
+def test_rejects_disallowed_expressions(source):
+    with pytest.raises(PolicyExpressionError):
+        compile_trigger(source)
+
+
+def test_evaluates_element_wise():
+    trigger = compile_trigger("stock < reorder_point and not blocked or math.sqrt(demand) > 3")
+    env = {
+        "stock": np.array([1.0, 10.0, 10.0]),
+        "reorder_point": np.array([5.0, 5.0, 5.0]),
+        "blocked": np.array([False, False, False]),
+        "demand": np.array([0.0, 4.0, 16.0]),
+    }
+    assert trigger.evaluate(env).tolist() == [True, False, True]
+    assert trigger.names == {"stock", "reorder_point", "blocked", "demand"}
+
+
+def test_missing_variable_is_reported():
+    with pytest.raises(PolicyExpressionError, match="stock"):
+        compile_trigger("stock < 5").evaluate({})
+
+
+def test_periodic_review_uses_days_since_last_order():
+    trigger = compile_trigger("periodic review")
+    due = trigger.evaluate({"days_since_last_order": np.array([np.nan, 2.0, 9.0])})
+    assert due.tolist() == [True, False, True]
+
+
+def test_action_program_assigns_order_quantity():
+    action = compile_action("gap = max_stock - stock; order_quantity = gap if gap > 0 else 0")
+    quantity, env = action.evaluate({"max_stock": np.array([10.0, 10.0]), "stock": np.array([4.0, 12.0])})
+    assert quantity.tolist() == [6.0, 0.0]
+    assert "gap" in env
+
+
+def test_action_without_result_is_rejected():
+    with pytest.raises(PolicyExpressionError):
+        compile_action("gap = max_stock - stock")
+
+
+def test_runtime_failure_is_a_policy_error():
+    trigger = compile_trigger("min(inventory) < 1")
+    with pytest.raises(PolicyExpressionError, match="Cannot evaluate"):
+        trigger.evaluate({"inventory": np.array([1.0, 2.0])})
@@ -0,0 +1,67 @@
+import asyncio
+import uuid
+
+import numpy as np
+
+import agents.replenishment.replenishment_agent as replenishment_agent
+from agents.replenishment.replenishment_agent import ReplenishmentAgent
+from agents.replenishment.replenishment_inputs import ReplenishmentInputs
+
+BLUEPRINT = {"methods": [
+    {"method_name": "min_max", "trigger_condition": "inventory < 5", "action_logic": "order_quantity = 10 - inventory", "parameters": {}},
+    {"method_name": "broken", "trigger_condition": "min(inventory) < 5", "action_logic": "order_quantity = 1", "parameters": {}},
+]}
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def mappings(self):
+        return self
+
+    def all(self):
+        return self.rows
+
+
+class FakeSession:
+    def __init__(self):
+        self.inserted = []
+
+    async def execute(self, statement, params=None):
+        sql = " ".join(str(statement).split())
+        if "FROM segment_policies" in sql:
+            return FakeResult([
+                {"segment_name": "A", "replenishment_policy": "broken", "policy_parameters": {}},
+                {"segment_name": "B", "replenishment_policy": "min_max", "policy_parameters": {}},
+            ])
+        if sql.startswith("INSERT INTO purchase_orders"):
+            self.inserted.append(params)
+        return FakeResult([])
+
+    async def commit(self):
+        pass
+
+
+def test_segment_failing_at_runtime_does_not_stop_the_run(monkeypatch):
+    products = [uuid.uuid4() for _ in range(3)]
+    inputs = ReplenishmentInputs(
+        keys=[(str(p), None) for p in products],
+        segments=["A", "B", "B"],
+        inventory=np.array([1.0, 2.0, 8.0]),
+        forecast_quantity=np.zeros(3),
+        days_since_last_order=np.full(3, np.nan),
+    )
+
+    async def load_inputs(db, company_id):
+        return inputs
+
+    monkeypatch.setattr(replenishment_agent, "load_replenishment_inputs", load_inputs)
+    db = FakeSession()
+    agent = ReplenishmentAgent(uuid.uuid4(), db, BLUEPRINT)
+
+    orders = asyncio.run(agent.run())
+
+    assert "A" in agent.policy_errors
+    assert [o["product_id"] for o in orders] == [str(products[1])]
+    assert db.inserted[0]["quantities"] == [8]
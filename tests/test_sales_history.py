@@ -0,0 +1,69 @@
+import asyncio
+import uuid
+from datetime import date
+
+import numpy as np
+
+from agents.forecast.demand_buckets import forecast_period_starts
+from agents.forecast.sales_history import load_sales_history
+
+COMPANY = uuid.uuid4()
+STARTS = [date(2024, m, 1) for m in range(1, 13)]
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def mappings(self):
+        return self
+
+    def all(self):
+        return self.rows
+
+    async def partitions(self):
+        yield self.rows
+
+
+class FakeSession:
+    def __init__(self, buckets):
+        self.buckets = buckets
+
+    async def execute(self, statement, params=None):
+        return FakeResult([{"period_start": start} for start in STARTS])
+
+    async def stream(self, statement, params=None):
+        return FakeResult(self.buckets)
+
+
+def test_gaps_are_zero_filled_and_unknown_buckets_skipped():
+    product, location = uuid.uuid4(), uuid.uuid4()
+    db = FakeSession([
+        (product, location, date(2024, 3, 1), 5),
+        (product, location, date(2024, 3, 15), 99),  # start of a period in an earlier calendar
+        (product, location, date(2024, 5, 1), 7),
+    ])
+
+    history = asyncio.run(load_sales_history(db, COMPANY))
+
+    series = history.series(product, location)
+    assert history.last_period == date(2024, 11, 1)
+    assert series[:3].tolist() == [5, 0, 7]
+    assert len(series) == 9 and series[3:].sum() == 0
+
+
+def test_series_without_known_buckets_is_left_out():
+    product = uuid.uuid4()
+    history = asyncio.run(load_sales_history(FakeSession([(product, None, date(2024, 2, 3), 1)]), COMPANY))
+    assert len(history) == 0
+    assert np.array_equal(history.series(product, None), [])
+
+
+def test_forecast_dates_follow_the_calendar_then_continue_by_period():
+    weeks = [date(2024, 12, 30), date(2025, 1, 6), date(2025, 1, 13)]
+    assert forecast_period_starts(weeks, 4, "week", today=date(2025, 1, 8)) == [
+        date(2025, 1, 6), date(2025, 1, 13), date(2025, 1, 20), date(2025, 1, 27)
+    ]
+    assert forecast_period_starts(STARTS, 3, "month", today=date(2024, 12, 20)) == [
+        date(2024, 12, 1), date(2025, 1, 1), date(2025, 2, 1)
+    ]
@@ -0,0 +1,52 @@
+import asyncio
+
+import numpy as np
+
+from agents.forecast.batch_kernels import pad_history, run_batch_method
+from agents.forecast.sharded_engine import ShardedForecastEngine, forecast_shard
+
+
+def history(n=60, seed=3):
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(1, 30, size=n)
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets, rng.poisson(12, size=int(offsets[-1])).astype(float)
+
+
+def test_sharded_run_matches_in_process_kernels():
+    offsets, values = history()
+    rows = np.arange(len(offsets) - 1)[::-1].copy()  # task i forecasts history row rows[i]
+    groups = [
+        ("moving_average", {"window": 3}, 4, list(range(0, 60, 2))),
+        ("exponential_smoothing", {"alpha": 0.5}, 6, list(range(1, 60, 2))),
+    ]
+    engine = ShardedForecastEngine(workers=2, shard_size=7)
+
+    async def collect():
+        return [shard async for shard in engine.run(offsets, values, groups, rows)]
+
+    shards = asyncio.run(collect())
+
+    assert len(shards) == len(engine.timings) == 10
+    seen = np.concatenate([indices for indices, _, _ in shards])
+    assert sorted(seen.tolist()) == list(range(60))
+    for method, params, horizon, indices in groups:
+        matrix, lengths = pad_history(offsets, values, rows[indices])
+        expected = dict(zip(indices, run_batch_method(method, matrix, lengths, params, horizon)))
+        for shard_indices, block, quantiles in shards:
+            assert quantiles is None
+            for i, forecast in zip(shard_indices.tolist(), block):
+                if i in expected:
+                    np.testing.assert_allclose(forecast, expected[i])
+
+
+def test_failed_shard_returns_zeros_and_the_error(tmp_path):
+    offsets, values = history(5)
+    np.save(tmp_path / "offsets.npy", offsets)
+    np.save(tmp_path / "values.npy", values)
+
+    result = forecast_shard(str(tmp_path), 0, np.arange(5), "no_such_method", {}, 3)
+
+    assert result["error"]
+    assert result["forecasts"].shape == (5, 3) and not result["forecasts"].any()